@@ -3,13 +3,32 @@ This is the single module of the framework. It contains the core files and some
 
 Core Files
 -----------
+* batches
+* cache
+* instrumentation
 * loader
 * mentions
+* outputs
+* packed
+* pipeline
+* ranking
+* sampling
 * saver
+* scorer
+* shared
+* shards
+* sources
 
 Examples
 -----------
 * mentions_custom
 * mock_trainer
 * features
+
+Tools
+-----------
+* benchmark
+* service
+* synthetic
+* testing
 """
@@ -0,0 +1,184 @@
+"""
+This module feeds training algorithms with mini-batches read from a packed dataset (see packed module).
+The dataset is memory mapped, so only the rows of the current batches are in memory. Batches can be built while the
+previous one is being used by the trainer (prefetch).
+
+Vectors saved in the text format ([name]_in/[name]_out files) can be converted with packed.pack_vectors_dir first
+
+"""
+import queue
+import threading
+
+import numpy as np
+
+
+class BatchLoader:
+    """
+    Iterates over a packed dataset in mini-batches of (X, y, pair_info). Each iteration is one epoch
+    """
+
+    def __init__(self, reader, batch_size=256, shuffle=True, positive_ratio=None, drop_last=False, seed=None,
+                 prefetch=2):
+        """
+        :param reader: packed.PackedReader (or any object with the arrays features, labels and pair_info)
+        :param batch_size: number of rows in each batch
+        :param shuffle: if True, the rows are visited in a different random order on each epoch
+        :param positive_ratio: if informed, each batch has this fraction of positive (coreferent) pairs. Positive pairs
+                are repeated as needed, and one epoch is one pass over the negative pairs
+        :param drop_last: if True, the last batch is dropped when it is smaller than batch_size
+        :param seed: seed of the random generator
+        :param prefetch: number of batches built in advance by a background thread. 0 disables the thread
+        """
+        if positive_ratio is not None and not 0 < positive_ratio < 1:
+            raise ValueError("positive_ratio must be in (0, 1), got {}".format(positive_ratio))
+        self.reader = reader
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.positive_ratio = positive_ratio
+        self.drop_last = drop_last
+        self.prefetch = prefetch
+        self.random = np.random.default_rng(seed)
+
+        labels = np.asarray(reader.labels).reshape(-1)
+        self.positives = np.flatnonzero(labels > 0)
+        self.negatives = np.flatnonzero(labels <= 0)
+
+    def __len__(self):
+        """
+        :return: number of batches in one epoch
+        """
+        if self.positive_ratio is None:
+            rows = len(self.positives) + len(self.negatives)
+            per_batch = self.batch_size
+        else:
+            rows = len(self.negatives)
+            per_batch = self.batch_size - self._positives_per_batch()
+        if self.drop_last:
+            return rows // per_batch
+        return -(-rows // per_batch)
+
+    def __iter__(self):
+        batches = (self._read(rows) for rows in self._epoch_indexes())
+        if self.prefetch <= 0:
+            return batches
+        return _prefetch(batches, self.prefetch)
+
+    def _positives_per_batch(self):
+        """
+        :return: number of positive rows in each balanced batch
+        """
+        return min(self.batch_size - 1, max(1, int(round(self.batch_size * self.positive_ratio))))
+
+    def _epoch_indexes(self):
+        """
+        Generator with the row indexes of each batch of one epoch
+        """
+        if self.positive_ratio is None:
+            rows = np.arange(len(self.positives) + len(self.negatives))
+            if self.shuffle:
+                self.random.shuffle(rows)
+            for batch in self._split(rows, self.batch_size):
+                yield batch
+            return
+
+        n_positives = self._positives_per_batch()
+        negatives = self.random.permutation(self.negatives) if self.shuffle else self.negatives
+        positives = _Cycle(self.positives, self.random if self.shuffle else None)
+        for batch in self._split(negatives, self.batch_size - n_positives):
+            batch = np.concatenate([batch, positives.take(n_positives)])
+            yield self.random.permutation(batch) if self.shuffle else batch
+
+    def _split(self, rows, size):
+        """
+        Splits the rows in chunks of the given size
+        :param rows: array of indexes
+        :param size: chunk size
+        """
+        for start in range(0, len(rows), size):
+            chunk = rows[start:start + size]
+            if self.drop_last and len(chunk) < size:
+                return
+            yield chunk
+
+    def _read(self, rows):
+        """
+        Reads the rows of one batch. Rows are sorted first so the memory mapped files are read sequentially, and then
+        put back in the order of rows
+        :param rows: array of indexes
+        :return: X, y, pair_info
+        """
+        order = np.argsort(rows, kind="stable")
+        sorted_rows = rows[order]
+        restore = np.argsort(order)
+        return (np.asarray(self.reader.features[sorted_rows])[restore],
+                np.asarray(self.reader.labels[sorted_rows])[restore],
+                np.asarray(self.reader.pair_info[sorted_rows])[restore])
+
+
+class _Cycle:
+    """
+    Endless supply of indexes. When all of them were used, starts again (in a new random order if random is informed)
+    """
+
+    def __init__(self, rows, random):
+        self.rows = rows
+        self.random = random
+        self.order = np.array([], dtype=rows.dtype)
+
+    def take(self, n):
+        if len(self.rows) == 0:
+            return self.order[:0]
+        while len(self.order) < n:
+            new_order = self.random.permutation(self.rows) if self.random is not None else self.rows
+            self.order = np.concatenate([self.order, new_order])
+        taken, self.order = self.order[:n], self.order[n:]
+        return taken
+
+
+def _prefetch(iterable, size):
+    """
+    Consumes the iterable in a background thread, keeping up to size items ready
+    :param iterable: source of the items
+    :param size: max number of items waiting to be used
+    :return: generator with the same items
+    """
+    items = queue.Queue(maxsize=size)
+    stop = threading.Event()
+    done = object()
+
+    def produce():
+        try:
+            for item in iterable:
+                if not _put(items, item, stop):
+                    return
+            _put(items, done, stop)
+        except BaseException as e:  # The error is raised again in the consumer thread
+            _put(items, e, stop)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is done:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _put(items, item, stop):
+    """
+    Puts the item in the queue unless the consumer has stopped
+    :return: True if the item was added
+    """
+    while not stop.is_set():
+        try:
+            items.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
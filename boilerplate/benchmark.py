@@ -0,0 +1,180 @@
+"""
+This module measures the time and the peak memory of each stage of the framework, from reading a file to saving the
+predictions. Documents are created with the synthetic module and the features use a stub embedding model, so
+neither spaCy nor network access is needed.
+
+Results are saved as json and can be compared to a previous run (baseline) to find regressions:
+python -m boilerplate.benchmark --sizes 5 20 50 --output bench.json --baseline baseline.json
+The times depend on the machine, so the baseline must be created on the same machine (e.g. on the base commit) and
+no baseline is kept in the repository.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from boilerplate import features
+from boilerplate import instrumentation
+from boilerplate import loader
+from boilerplate import mentions
+from boilerplate import mock_trainer
+from boilerplate import saver
+from boilerplate import synthetic
+from boilerplate import testing
+
+DEFAULT_SIZES = (5, 20, 50)
+STAGES = ("train_file_to_list", "_get_mention", "_create_mention_cluster_list", "build_mention_list",
+          "get_mention_pairs", "make_input_vector", "_save_to_file", "predict", "save_document")
+
+
+def run(sizes=DEFAULT_SIZES, repeat=3, seed=0):
+    """
+    Runs all stages for documents of each size
+    :param sizes: list of document sizes, in sentences
+    :param repeat: each stage runs this number of times and the fastest is kept
+    :param seed: seed of the synthetic documents
+    :return: list of results, one dictionary per (stage, size) with the keys stage, sentences, mentions, seconds
+            and peak_bytes
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            results += _run_size(tmp, size, repeat, seed)
+    return results
+
+
+def compare(results, baseline, tolerance=0.25, min_seconds=0.01):
+    """
+    Finds the stages that got slower or use more memory than in the baseline
+    :param results: list returned by run
+    :param baseline: list returned by a previous run
+    :param tolerance: accepted increase (0.25 means 25%)
+    :param min_seconds: stages faster than this are too noisy and their times are not compared
+    :return: list of messages, one for each regression
+    """
+    previous = {(r["stage"], r["sentences"]): r for r in baseline}
+    regressions = []
+    for r in results:
+        old = previous.get((r["stage"], r["sentences"]))
+        if old is None:
+            continue
+        for key in ("seconds", "peak_bytes"):
+            if key == "seconds" and r[key] < min_seconds:
+                continue
+            if old[key] > 0 and r[key] > old[key] * (1 + tolerance):
+                regressions.append("{} ({} sentences): {} went from {:.4g} to {:.4g}".format(
+                    r["stage"], r["sentences"], key, old[key], r[key]))
+    return regressions
+
+
+def _run_size(tmp, size, repeat, seed):
+    """
+    Runs all stages for one document size. Each stage uses the output of the previous one
+    """
+    name = "synthetic/bench_{}".format(size)
+    original = os.path.join(tmp, name + ".gold_conll")
+    os.makedirs(os.path.dirname(original), exist_ok=True)
+    lines, _ = synthetic.generate_document(name, sentences=size, random=random.Random(seed))
+    with open(original, "w", encoding="utf8") as f:
+        f.writelines(lines)
+
+    output = os.path.join(tmp, "output")
+    os.makedirs(output, exist_ok=True)
+    mapper = features.FeatureMapper(testing.stub_embedding, lines)
+    mention_list = mentions.build_mention_list(lines, testing.stub_increment_mention)
+    cluster_start, start_pos, cluster_end, end_pos = mentions._get_mention(lines)
+    file_x = os.path.join(output, "bench_in")
+    file_y = os.path.join(output, "bench_out")
+    state = {}
+
+    def pairs():
+        state["pairs"] = mentions.get_mention_pairs(lines, testing.stub_increment_mention,
+                                                    testing.stub_increment_mention_pair)
+
+    def vectors():
+        state["input"] = loader._append_mention_info(state["pairs"], mapper.make_input_vector(state["pairs"]))
+        state["output"] = features.make_output_vector(state["pairs"])
+
+    def save():
+        loader._save_to_file(state["input"], output, "bench_in", name)
+        loader._save_to_file(state["output"], output, "bench_out")
+
+    def predict():
+        state["doc"] = mock_trainer.predict(file_x, file_y)
+
+    stages = [("train_file_to_list", lambda: loader.train_file_to_list(original)),
+              ("_get_mention", lambda: mentions._get_mention(lines)),
+              # The ends are removed from the lists as they are matched, so each run gets its own copy
+              ("_create_mention_cluster_list",
+               lambda: mentions._create_mention_cluster_list(cluster_start, start_pos, list(cluster_end),
+                                                             list(end_pos))),
+              ("build_mention_list", lambda: mentions.build_mention_list(lines, testing.stub_increment_mention)),
+              ("get_mention_pairs", pairs),
+              ("make_input_vector", vectors),
+              ("_save_to_file", save),
+              ("predict", predict),
+              ("save_document", lambda: saver.save_document(tmp, output, state["doc"]))]
+
+    results = []
+    for stage, function in stages:
+        seconds, peak = _measure(function, repeat)
+        results.append({"stage": stage, "sentences": size, "mentions": len(mention_list), "seconds": seconds,
+                        "peak_bytes": peak})
+    return results
+
+
+def _measure(function, repeat):
+    """
+    :param function: function without parameters
+    :param repeat: number of timed runs
+    :return: fastest time in seconds, peak memory allocated during one extra run (bytes)
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(times), peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks each stage of the framework")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="sentences per document")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="json file to save the results")
+    parser.add_argument("--baseline", help="json file of a previous run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="accepted increase over the baseline")
+    args = parser.parse_args(argv)
+
+    instrumentation.set_progress(False)
+    results = run(args.sizes, args.repeat, args.seed)
+    for r in results:
+        print("{stage:30} {sentences:6} sentences {mentions:6} mentions {seconds:10.4f}s {peak_bytes:12} bytes"
+              .format(**r))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=1)
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for message in regressions:
+            print("REGRESSION " + message)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
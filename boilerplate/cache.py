@@ -0,0 +1,97 @@
+"""
+This module keeps the features already computed on the disk, one block of columns per feature group, so adding or
+changing a group only computes that group (see features.FEATURE_GROUPS).
+
+A block is identified by:
+* the document: hash of the lines of the file, of the rows (mention spans for the mention groups, pair positions for
+  the pair groups) and of the cache namespace
+* the feature group name
+* the group version
+
+Changing the values of a group (i.e. the code or the hooks it depends on) requires increasing its version. The
+namespace must identify anything else that changes all values, like the embedding model.
+
+Usage:
+    mapper = features.FeatureMapper(word2vec, train_list, cache=cache.FeatureCache("cache_folder", "en_core_web_lg"))
+"""
+import hashlib
+import os
+
+import numpy as np
+
+from boilerplate import instrumentation
+from boilerplate import outputs
+
+BLOCK_SUFFIX = ".npy"
+
+
+class FeatureCache:
+    """
+    Stores the column blocks as .npy files: [path]/[key[:2]]/[key]/[group].v[version].npy. Blocks are written
+    atomically, each writer with its own temporary file (see outputs.atomic_open), so several processes can share the
+    same folder
+    """
+
+    def __init__(self, path, namespace=""):
+        """
+        :param path: cache folder. Created if needed
+        :param namespace: identifies the embedding model (or anything else that changes all features)
+        """
+        self.path = path
+        self.namespace = namespace
+        os.makedirs(path, exist_ok=True)
+
+    def document_hash(self, train_list):
+        """
+        :param train_list: list of lines in the document
+        :return: hash of the document
+        """
+        digest = hashlib.sha1(self.namespace.encode("utf8"))
+        for line in train_list:
+            digest.update(line.encode("utf8"))
+        return digest.hexdigest()
+
+    def key(self, document_hash, vector_size, mention_items=(), pairs=()):
+        """
+        Mention blocks should be keyed only by their mentions and pair blocks only by their pairs, so changing the
+        pairs (i.e. the sampler) does not invalidate the mention blocks
+        :param document_hash: value returned by document_hash
+        :param vector_size: size of the word vectors
+        :param mention_items: mentions whose features are in the mention blocks (in the order of the rows)
+        :param pairs: pairs whose features are in the pair blocks (in the order of the rows)
+        :return: key of the blocks of this set of rows
+        """
+        positions = [(m.start_pos, m.end_pos) for m in mention_items] + [tuple(p.get_info_vector()) for p in pairs]
+        digest = hashlib.sha1("{}|{}|{}|{}".format(document_hash, vector_size, len(mention_items),
+                                                   positions).encode("utf8"))
+        return digest.hexdigest()
+
+    def load(self, key, group, version):
+        """
+        :param key: value returned by key
+        :param group: group name
+        :param version: group version
+        :return: np.array with one line per row, or None if the block is not in the cache
+        """
+        block_path = self._block_path(key, group, version)
+        if not os.path.isfile(block_path):
+            instrumentation.count("cache_misses", 1)
+            return None
+        instrumentation.count("cache_hits", 1)
+        return np.load(block_path)
+
+    def save(self, key, group, version, block):
+        """
+        :param key: value returned by key
+        :param group: group name
+        :param version: group version
+        :param block: np.array with one line per row
+        """
+        block_path = self._block_path(key, group, version)
+        os.makedirs(os.path.dirname(block_path), exist_ok=True)
+        with outputs.atomic_open(block_path, "wb") as f:
+            np.save(f, block)
+        instrumentation.count("bytes_written", block.nbytes)
+
+    def _block_path(self, key, group, version):
+        return os.path.join(self.path, key[:2], key, "{}.v{}{}".format(group, version, BLOCK_SUFFIX))
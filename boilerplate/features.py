@@ -2,12 +2,20 @@
 This is an example of the implementation of a make_vectors functions. This functions is expected to receive a list of
 mention pairs and return two lists of vectors (input and output vectors, one entry for each pair).
 
+The features are organized in named groups (see FEATURE_GROUPS and feature_group). Each group declares its width and
+the attributes it needs, so only the selected groups are computed and the columns of each group can be found with
+FeatureMapper.schema. Example of an ablation without the context words:
+    make_vectors_without_context = select([g for g in MENTION_GROUPS + PAIR_GROUPS if "words" not in g])
+
 """
 
+import functools
 import string
 
 import numpy as np
-from tqdm import tqdm
+
+from boilerplate import instrumentation
+from boilerplate import mentions
 
 
 class Features:
@@ -31,6 +39,72 @@ class Features:
                                self.pair_features])
 
 
+class FeatureGroup:
+    """
+    A named block of columns. Mention groups are computed once per mention (and used for both mentions of a pair),
+    pair groups once per mention pair
+    """
+
+    def __init__(self, name, scope, compute, width=0, vectors=0, requires=(), version=1):
+        """
+        :param name: group name
+        :param scope: MENTION or PAIR
+        :param compute: function (mapper, mention or pair) that returns a np.array (size, 1)
+        :param width: number of columns, not counting the word vectors
+        :param vectors: number of word vectors (each one has FeatureMapper.VECTOR_SIZE columns)
+        :param requires: mention (or pair) attributes used by the group. See mentions.requires
+        :param version: must be increased when the values of the group change
+        """
+        self.name = name
+        self.scope = scope
+        self.compute = compute
+        self.width = width
+        self.vectors = vectors
+        self.requires = frozenset(requires)
+        self.version = version
+
+    def size(self, vector_size):
+        """
+        :param vector_size: size of the word vectors
+        :return: number of columns of the group
+        """
+        return self.width + self.vectors * vector_size
+
+
+MENTION = "mention"
+PAIR = "pair"
+FEATURE_GROUPS = {}
+_PUNCTUATION_TABLE = str.maketrans({key: None for key in string.punctuation})
+
+
+def normalize_word(word):
+    """
+    Form of the word given to word2vec: lowercase and, if it has more than one character, without punctuation
+    :param word: word of the document
+    :return: normalized word
+    """
+    word = word.lower()
+    if len(word) > 1:
+        word = word.translate(_PUNCTUATION_TABLE)  # This will remove punctuation
+    return word
+
+
+def feature_group(name, scope, width=0, vectors=0, requires=(), version=1):
+    """
+    Registers a function as a feature group. See FeatureGroup for the parameters
+    Usage:
+        @feature_group("head_word", MENTION, vectors=1, requires=["head_word"])
+        def _head_word(mapper, mention):
+            return mapper._get_vector(mention.head_word)
+    """
+
+    def decorator(compute):
+        FEATURE_GROUPS[name] = FeatureGroup(name, scope, compute, width, vectors, requires, version)
+        return compute
+
+    return decorator
+
+
 class FeatureMapper:
     """
         This class is used to map the words into vectors. Also has some extra methods for features used in this
@@ -39,16 +113,47 @@ class FeatureMapper:
     _nlp = None
     VECTOR_SIZE = 50
 
-    def __init__(self, word2vec, train_list):
+    def __init__(self, word2vec, train_list, groups=None, cache=None):
         """
         :param word2vec: function to map work to vector of length VECTOR_SIZE.
         :param train_list: list of all lines in document
+        :param groups: names of the feature groups to be computed (see FEATURE_GROUPS). Default uses all groups in the
+                original order (see layout)
+        :param cache: cache.FeatureCache. If informed, the groups already in the cache are not computed again
         """
         self.model = word2vec if word2vec is not None else {}
 
-        # Used to remove punctuation of the words
-        self.table = str.maketrans({key: None for key in string.punctuation})
+        # Used to remove punctuation of the words, see normalize_word
+        self.table = _PUNCTUATION_TABLE
         self.doc_dict = _document_dictionary(train_list)
+        self.layout = layout(groups)
+        self._docs_average = None
+        self._mention_cache = {}
+        self.cache = cache
+        self.document_hash = cache.document_hash(train_list) if cache is not None else None
+
+    @property
+    def docs_average(self):
+        """
+        Average vector of each document. Only calculated if a selected group needs it
+        """
+        if self._docs_average is None:
+            self._docs_average = self._calculate_docs_average()
+        return self._docs_average
+
+    def schema(self, roles=(MENTION, "antecedent", PAIR)):
+        """
+        :param roles: roles to be included. Use (MENTION,) for the vectors of make_mention_vectors and (PAIR,) for
+                make_pair_vectors
+        :return: dictionary column name ([role].[group]) -> slice of the columns in the vectors
+        """
+        return column_schema(self.layout, self.VECTOR_SIZE, roles)
+
+    def input_size(self):
+        """
+        :return: number of columns of the vectors returned by make_input_vector
+        """
+        return sum(s.stop - s.start for s in self.schema().values())
 
     def _get_vector(self, word):
         """
@@ -57,9 +162,7 @@ class FeatureMapper:
         :param word:
         :return: np.array(VECTOR_SIZE,1)
         """
-        word = word.lower()
-        if len(word) > 1:
-            word = word.translate(self.table)  # This will remove punctuation
+        word = normalize_word(word)
 
         try:  # "easier to ask for forgiveness than permission
             vec = self.model(word)
@@ -91,78 +194,132 @@ class FeatureMapper:
             doc_avg.append(self._get_average_vector(self.doc_dict[d].split()))
         return doc_avg
 
-    def make_input_vector(self, pairs):
+    def make_input_vector(self, pairs, out=None):
         """
-        Builds the input feature vector from the mention pairs
+        Builds the input feature vector from the mention pairs. Only the selected groups are computed and the mention
+        groups are computed once per mention
         :param pairs: mention pais
-        :return: np.array of all features (one line per pair)
+        :param out: np.array (len(pairs), input_size()) where the features are written, i.e. a shared.SharedMatrix
+                array. If informed, out is returned instead of the list
+        :return: list of np.array with all features (one per pair). See schema for the columns
         """
-        docs_avg = self._calculate_docs_average()
+        if self.cache is not None:
+            vectors = self._make_cached_input_vector(pairs)
+            if out is not None:
+                out[:] = np.reshape(vectors, out.shape)
+                return out
+            return vectors
         input_feature_list = []
-        for p in tqdm(pairs, desc="features"):
-            # Build a Features object
-            input_feature_vector = self._make_pair_feature(docs_avg, p)
-            # Saves into a list the vector representation
-            input_feature_list.append(input_feature_vector.to_vector())
-
-        return input_feature_list
-
-    def _make_pair_feature(self, docs_avg, pair):
+        try:
+            for n, p in enumerate(instrumentation.progress(pairs, desc="features")):
+                if out is None:
+                    input_feature_list.append(self._make_pair_feature(p))
+                else:
+                    out[n] = self._make_pair_feature(p).reshape(-1)
+        finally:
+            self._mention_cache = {}
+        return input_feature_list if out is None else out
+
+    def make_mention_vectors(self, mention_list):
+        """
+        Builds the features of each mention only once. This is the mention part of the pair vectors
+        :param mention_list: list of mentions
+        :return: np.array with one line per mention. See schema((MENTION,)) for the columns
+        """
+        groups = [name for role, name in self.layout if role == MENTION]
+        if self.cache is not None:
+            blocks = self._cached_blocks(mention_list, [], groups)
+            return np.hstack([blocks[g] for g in groups] + [np.zeros((len(mention_list), 0))])
+        vectors = []
+        for m in instrumentation.progress(mention_list, desc="mention features"):
+            vectors.append(_concatenate_groups([FEATURE_GROUPS[g].compute(self, m) for g in groups]).reshape(-1))
+        return np.array(vectors, dtype=np.float64).reshape((len(vectors), -1))
+
+    def make_pair_vectors(self, pairs):
+        """
+        Builds only the features that depend on both mentions
+        :param pairs: mention pairs
+        :return: np.array with one line per pair. See schema((PAIR,)) for the columns
+        """
+        groups = [name for role, name in self.layout if role == PAIR]
+        if self.cache is not None:
+            blocks = self._cached_blocks([], pairs, groups)
+            return np.hstack([blocks[g] for g in groups] + [np.zeros((len(pairs), 0))])
+        vectors = [_concatenate_groups([FEATURE_GROUPS[g].compute(self, p) for g in groups]).reshape(-1) for p in pairs]
+        return np.array(vectors, dtype=np.float64).reshape((len(vectors), -1))
+
+    def _make_cached_input_vector(self, pairs):
+        """
+        Same as make_input_vector, assembling the vectors from the blocks of the cache
+        :param pairs: mention pairs
+        :return: list of np.array with all features (one per pair)
+        """
+        position = {}
+        mention_items = []
+        for p in pairs:
+            for m in (p.mention1, p.mention2):
+                if id(m) not in position:
+                    position[id(m)] = len(mention_items)
+                    mention_items.append(m)
+        rows = {MENTION: np.array([position[id(p.mention1)] for p in pairs], dtype=np.int64),
+                "antecedent": np.array([position[id(p.mention2)] for p in pairs], dtype=np.int64)}
+
+        blocks = self._cached_blocks(mention_items, pairs, [name for _, name in self.layout])
+        columns = [blocks[name] if role == PAIR else blocks[name][rows[role]] for role, name in self.layout]
+        matrix = np.hstack(columns + [np.zeros((len(pairs), 0))])
+        return list(matrix.reshape((len(pairs), -1, 1)))
+
+    def _cached_blocks(self, mention_items, pairs, names):
         """
-        Builds the features for one pair
-        :param docs_avg: word average vector for all documents
+        Reads the blocks of the groups from the cache. Missing blocks are computed and saved
+        :param mention_items: mentions of the rows of the mention groups
+        :param pairs: pairs of the rows of the pair groups
+        :param names: group names
+        :return: dictionary group name -> np.array (rows, group size)
+        """
+        # Mention blocks do not depend on the pairs, so changing the sampler keeps them
+        keys = {MENTION: self.cache.key(self.document_hash, self.VECTOR_SIZE, mention_items=mention_items),
+                PAIR: self.cache.key(self.document_hash, self.VECTOR_SIZE, pairs=pairs)}
+        blocks = {}
+        for name in dict.fromkeys(names):
+            group = FEATURE_GROUPS[name]
+            key = keys[group.scope]
+            block = self.cache.load(key, name, group.version)
+            if block is None:
+                items = mention_items if group.scope == MENTION else pairs
+                block = np.array([group.compute(self, x).reshape(-1) for x in items])
+                block = block.reshape((len(items), group.size(self.VECTOR_SIZE)))
+                self.cache.save(key, name, group.version, block)
+            blocks[name] = block
+        return blocks
+
+    def _make_pair_feature(self, pair):
+        """
+        Builds the features for one pair, following the layout
         :param pair: mention pair
-        :return: list of list of features. There are 5 groups (each one in a position of the vector):
-            - antecedent avg
-            - antecedent features
-            - mention avg
-            - mention features
-            - pair features
+        :return: np.array(columns, 1)
         """
-        mention_avg = self._get_average_vector(pair.mention1.words)
-        antecedent_avg = self._get_average_vector(pair.mention2.words)
-        mention_features = self._get_mention_features(pair.mention1, docs_avg)
-        antecedent_features = self._get_mention_features(pair.mention2, docs_avg)
-        pair_features = _get_pair_features(pair)
-
-        return Features(mention_avg, antecedent_avg, mention_features, antecedent_features, pair_features)
-
-    def _get_mention_features(self, mention, doc_average):
+        blocks = []
+        for role, name in self.layout:
+            group = FEATURE_GROUPS[name]
+            if role == PAIR:
+                blocks.append(group.compute(self, pair))
+                continue
+            mention = pair.mention1 if role == MENTION else pair.mention2
+            key = (id(mention), name)  # Pairs keep the mentions alive, so the ids are not reused during the call
+            block = self._mention_cache.get(key)
+            if block is None:
+                block = self._mention_cache[key] = group.compute(self, mention)
+            blocks.append(block)
+        return _concatenate_groups(blocks)
+
+    def _get_mention_features(self, mention):
         """
-        Buils a vector with all the features of a single mention
+        Buils a vector with all the features of a single mention (the MENTION_GROUPS)
         :param mention:
-        :param doc_average: list of document average word
         :return: np.array with all features for that mention
         """
-        mention_length = self._get_vector(mention.mention_length)
-        mention_type = np.array(mention.mention_type).reshape((4, 1))
-        mention_position = np.array(mention.mention_position).reshape((1, 1))
-
-        # p: previous, n: next, w: words, a: average, s: sentence
-        first_w = self._get_vector(mention.first_word)
-        last_w = self._get_vector(mention.last_word)
-
-        # Contained
-        mention_contain = np.ones((1, 1)) if mention.contained else np.zeros((1, 1))
-        # Previous words
-        mention_p_w1, mention_p_w2 = self._get_vector_if_defined(mention.pre_words, [0, 1])
-        # Next words
-        mention_n_w1, mention_n_w2 = self._get_vector_if_defined(mention.next_words, [0, 1])
-        # Previous words Average
-        mention_p_w_a = self._get_average_vector(mention.pre_words)
-        # Next words Average
-        mention_n_w_a = self._get_average_vector(mention.next_words)
-        # Mention Sentence Average
-        mention_s_a = self._get_average_vector(mention.words)
-
-        # Extra info
-        doc_id = mention.doc_id
-        doc_avg = doc_average[int(doc_id)]
-
-        features = np.concatenate((first_w, last_w, mention_p_w1, mention_p_w2, mention_p_w_a, mention_n_w1,
-                                   mention_n_w2, mention_n_w_a, mention_s_a, mention_length, mention_type,
-                                   mention_position, mention_contain, doc_avg))
-        return features
+        return _concatenate_groups([FEATURE_GROUPS[g].compute(self, mention) for g in MENTION_GROUPS])
 
     def _get_vector_if_defined(self, word_list, indexes):
         """
@@ -178,6 +335,162 @@ class FeatureMapper:
         return output
 
 
+# Mention groups. p: previous, n: next, w: words, a: average
+@feature_group("mention_avg", MENTION, vectors=1)
+def _mention_avg(mapper, mention):
+    return mapper._get_average_vector(mention.words)
+
+
+@feature_group("first_word", MENTION, vectors=1)
+def _first_word(mapper, mention):
+    return mapper._get_vector(mention.first_word)
+
+
+@feature_group("last_word", MENTION, vectors=1)
+def _last_word(mapper, mention):
+    return mapper._get_vector(mention.last_word)
+
+
+@feature_group("prev_words", MENTION, vectors=2, requires=["pre_words"])
+def _prev_words(mapper, mention):
+    return np.concatenate(mapper._get_vector_if_defined(mention.pre_words, [0, 1]))
+
+
+@feature_group("prev_words_avg", MENTION, vectors=1, requires=["pre_words"])
+def _prev_words_avg(mapper, mention):
+    return mapper._get_average_vector(mention.pre_words)
+
+
+@feature_group("next_words", MENTION, vectors=2, requires=["next_words"])
+def _next_words(mapper, mention):
+    return np.concatenate(mapper._get_vector_if_defined(mention.next_words, [0, 1]))
+
+
+@feature_group("next_words_avg", MENTION, vectors=1, requires=["next_words"])
+def _next_words_avg(mapper, mention):
+    return mapper._get_average_vector(mention.next_words)
+
+
+@feature_group("sentence_avg", MENTION, vectors=1)
+def _sentence_avg(mapper, mention):
+    # Historically averages the mention words, the same values as mention_avg
+    return mapper._get_average_vector(mention.words)
+
+
+@feature_group("length", MENTION, vectors=1, requires=["mention_length"])
+def _length(mapper, mention):
+    return mapper._get_vector(mention.mention_length)
+
+
+@feature_group("type", MENTION, width=4, requires=["mention_type"])
+def _type(mapper, mention):
+    return np.array(mention.mention_type).reshape((4, 1))
+
+
+@feature_group("position", MENTION, width=1)
+def _position(mapper, mention):
+    return np.array(mention.mention_position).reshape((1, 1))
+
+
+@feature_group("contained", MENTION, width=1)
+def _contained(mapper, mention):
+    return np.ones((1, 1)) if mention.contained else np.zeros((1, 1))
+
+
+@feature_group("doc_avg", MENTION, vectors=1)
+def _doc_avg(mapper, mention):
+    return mapper.docs_average[int(mention.doc_id)]
+
+
+# Pair groups
+@feature_group("mention_distance", PAIR, width=10, requires=["mention_dist_count"])
+def _mention_distance(mapper, pair):
+    return np.array(pair.mention_dist_count).reshape((10, 1))
+
+
+@feature_group("sentence_distance", PAIR, width=10, requires=["sentence_dist_count"])
+def _sentence_distance(mapper, pair):
+    return np.array(pair.sentence_dist_count).reshape((10, 1))
+
+
+@feature_group("overlap", PAIR, width=1)
+def _overlap(mapper, pair):
+    return np.array(pair.overlap).reshape((1, 1))
+
+
+@feature_group("speaker", PAIR, width=1)
+def _speaker(mapper, pair):
+    return np.array(pair.speaker).reshape((1, 1))
+
+
+@feature_group("head_match", PAIR, width=1, requires=["head_match"])
+def _head_match(mapper, pair):
+    return np.array(pair.head_match).reshape((1, 1))
+
+
+@feature_group("exact_match", PAIR, width=1)
+def _exact_match(mapper, pair):
+    return np.array(pair.mention_exact_match).reshape((1, 1))
+
+
+@feature_group("partial_match", PAIR, width=1)
+def _partial_match(mapper, pair):
+    return np.array(pair.mention_partial_match).reshape((1, 1))
+
+
+MENTION_GROUPS = ("first_word", "last_word", "prev_words", "prev_words_avg", "next_words", "next_words_avg",
+                  "sentence_avg", "length", "type", "position", "contained", "doc_avg")
+PAIR_GROUPS = ("mention_distance", "sentence_distance", "overlap", "speaker", "head_match", "exact_match",
+               "partial_match")
+# Original order of the columns: averages of both mentions, features of both mentions, pair features
+DEFAULT_LAYOUT = ([(MENTION, "mention_avg"), ("antecedent", "mention_avg")] + [(MENTION, g) for g in MENTION_GROUPS] +
+                  [("antecedent", g) for g in MENTION_GROUPS] + [(PAIR, g) for g in PAIR_GROUPS])
+
+
+def layout(groups=None):
+    """
+    Defines the order of the columns of the pair vectors
+    :param groups: names of the selected groups. None means all groups in the original order
+    :return: list of (role, group name). Role is MENTION, antecedent or PAIR. The mention groups are repeated for
+            the mention and for the antecedent, followed by the pair groups
+    """
+    if groups is None:
+        return list(DEFAULT_LAYOUT)
+    unknown = [g for g in groups if g not in FEATURE_GROUPS]
+    if unknown:
+        raise ValueError("Unknown feature groups: {}".format(", ".join(unknown)))
+    mention_groups = [g for g in groups if FEATURE_GROUPS[g].scope == MENTION]
+    return ([(MENTION, g) for g in mention_groups] + [("antecedent", g) for g in mention_groups] +
+            [(PAIR, g) for g in groups if FEATURE_GROUPS[g].scope == PAIR])
+
+
+def column_schema(groups_layout, vector_size, roles=(MENTION, "antecedent", PAIR)):
+    """
+    :param groups_layout: list returned by layout
+    :param vector_size: size of the word vectors
+    :param roles: roles to be included
+    :return: dictionary column name ([role].[group]) -> slice of the columns
+    """
+    schema = {}
+    start = 0
+    for role, name in groups_layout:
+        if role not in roles:
+            continue
+        size = FEATURE_GROUPS[name].size(vector_size)
+        schema["{}.{}".format(role, name)] = slice(start, start + size)
+        start += size
+    return schema
+
+
+def required_attributes(groups=None):
+    """
+    :param groups: names of the selected groups. None means all groups
+    :return: set of mention and pair attributes used by the groups
+    """
+    names = set(name for _, name in layout(groups))
+    return frozenset().union(*(FEATURE_GROUPS[name].requires for name in names))
+
+
 def make_output_vector(pairs):
     """
     Builds the output vector from the mentions pairs
@@ -246,7 +559,7 @@ def _get_documents(train_list, split_ponctuation=True, return_names = False):
 
 def _get_pair_features(pair):
     """
-    Builds a vector of features for this mention pair. Currently, it has the following features:
+    Builds a vector of features for this mention pair (the PAIR_GROUPS). Currently, it has the following features:
     * mention distance
     * sentence distance
     * overlap
@@ -258,23 +571,18 @@ def _get_pair_features(pair):
     :param pair:
     :return: vector of doubles
     """
-    # distance features
-    mention_dist = np.array(pair.mention_dist_count).reshape((10, 1))
-    s_dist = np.array(pair.sentence_dist_count).reshape((10, 1))
-    overlap = np.array(pair.overlap).reshape((1, 1))
-
-    # speaker feature
-    speaker = np.array(pair.speaker).reshape((1, 1))
+    return _concatenate_groups([FEATURE_GROUPS[g].compute(None, pair) for g in PAIR_GROUPS])
 
-    # string matching features
-    head_match = np.array(pair.head_match).reshape((1, 1))
-    mention_exact_match = np.array(pair.mention_exact_match).reshape((1, 1))
-    mention_partial_match = np.array(pair.mention_partial_match).reshape((1, 1))
 
-    pair_features = np.concatenate(
-        (mention_dist, s_dist, overlap, speaker, head_match, mention_exact_match, mention_partial_match))
-
-    return pair_features
+def _concatenate_groups(blocks):
+    """
+    Joins the column blocks of the groups
+    :param blocks: list of np.array (size, 1), one per group. Can be empty (no group of this scope was selected)
+    :return: np.array (columns, 1). (0, 1) if there are no blocks
+    """
+    if not blocks:
+        return np.zeros((0, 1))
+    return np.concatenate(blocks)
 
 
 def _document_dictionary(train_file):
@@ -304,18 +612,78 @@ def _map_word(nlp, word):
     return token.vector
 
 
-def make_vectors(pairs, mapper=None, train_list=None):
+@mentions.requires(*required_attributes())
+def make_vectors(pairs, mapper=None, train_list=None, groups=None, cache=None, allocate=None):
     """
     This is the main method. Other implementations should replace this.
     From a mention pair list, it returns the input and output vectors that will be fed into the net
     :param pairs:
     :param mapper: Custom vector mapper, if not informed, will use default FeatureMapper
     :param train_list: list of all files. necessary if no mapper is informed
+    :param groups: feature groups of the default FeatureMapper. Ignored if a mapper is informed
+    :param cache: cache.FeatureCache of the default FeatureMapper. Ignored if a mapper is informed
+    :param allocate: function that receives the shape of the input vectors and returns the np.array where they are
+            written (see shared.lines_to_shared). Default returns a list of vectors
     :return: input_vector,output_vector
     """
     if mapper is None:
-        import spacy
-        nlp = spacy.load('en_core_web_lg')
-        mapper = FeatureMapper(lambda w: _map_word(nlp, w), train_list)
-        mapper.VECTOR_SIZE = 300
-    return mapper.make_input_vector(pairs), make_output_vector(pairs)
+        mapper = _default_mapper(train_list, groups, cache)
+    out = allocate((len(pairs), mapper.input_size())) if allocate is not None else None
+    return mapper.make_input_vector(pairs, out), make_output_vector(pairs)
+
+
+@mentions.requires(*required_attributes())
+def make_ranking_vectors(mention_list, pairs, mapper=None, train_list=None, groups=None, cache=None):
+    """
+    Same as make_vectors, for the mention ranking layout (see ranking module). The mention features are built once
+    per mention instead of once per pair
+    :param mention_list: all mentions of the file
+    :param pairs: mention pairs
+    :param mapper: Custom vector mapper, if not informed, will use default FeatureMapper
+    :param train_list: list of all files. necessary if no mapper is informed
+    :param groups: feature groups of the default FeatureMapper. Ignored if a mapper is informed
+    :param cache: cache.FeatureCache of the default FeatureMapper. Ignored if a mapper is informed
+    :return: mention_vectors, pair_vectors, output_vector
+    """
+    if mapper is None:
+        mapper = _default_mapper(train_list, groups, cache)
+    return mapper.make_mention_vectors(mention_list), mapper.make_pair_vectors(pairs), make_output_vector(pairs)
+
+
+def select(groups, make=make_vectors, cache=None):
+    """
+    Builds a make_vectors function that computes only some feature groups
+    :param groups: names of the groups (see FEATURE_GROUPS). None means all groups
+    :param make: make_vectors or make_ranking_vectors
+    :param cache: cache.FeatureCache used by the function
+    :return: function with the same parameters as make. The mention attributes of the groups are declared (see
+            mentions.requires)
+    """
+    layout(groups)  # Fails now for unknown groups
+    return mentions.requires(*required_attributes(groups))(functools.partial(make, groups=groups, cache=cache))
+
+
+def _default_mapper(train_list, groups=None, cache=None):
+    """
+    :param train_list: list of all lines in document
+    :param groups: names of the feature groups to be computed
+    :param cache: cache.FeatureCache
+    :return: FeatureMapper using the spacy vectors
+    """
+    mapper = FeatureMapper(spacy_word2vec(), train_list, groups, cache)
+    mapper.VECTOR_SIZE = 300
+    return mapper
+
+
+def spacy_word2vec():
+    """
+    :return: function that maps a word to its spaCy vector (300 positions). The model is loaded only once per process
+    """
+    nlp = _spacy_model()
+    return lambda w: _map_word(nlp, w)
+
+
+@functools.lru_cache(maxsize=None)
+def _spacy_model():
+    import spacy
+    return spacy.load('en_core_web_lg')
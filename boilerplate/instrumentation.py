@@ -0,0 +1,246 @@
+"""
+This module collects timings and counters for each processed document. Nothing is collected unless a Recorder is
+active (see recording), so the cost for normal runs is a function call per stage.
+
+Each document generates one record (a dictionary) with:
+* document: name of the document
+* wall_seconds: total time spent with the document
+* stages: seconds spent in each stage (read, mentions, pairs, features, write, save)
+* counters: mentions, candidate_pairs, kept_pairs, positive_pairs and bytes_written (when the stage happened)
+* positive_ratio: positive_pairs / kept_pairs
+* peak_rss_bytes: peak resident memory of the process when the document finished (None if not available)
+
+Records are sent to sinks: any function that receives a record. JsonLinesSink and MemorySink are provided.
+
+Progress bars can be disabled with set_progress(False)
+"""
+import contextlib
+import json
+import sys
+import threading
+import time
+
+from tqdm import tqdm
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+_progress_enabled = True
+_active = None
+_local = threading.local()
+
+
+def set_progress(enabled):
+    """
+    Enables or disables all progress bars of the framework
+    :param enabled: False hides the bars
+    """
+    global _progress_enabled
+    _progress_enabled = enabled
+
+
+def progress(iterable, desc, **kwargs):
+    """
+    Wraps the iterable with a progress bar, unless they were disabled by set_progress
+    :param iterable: iterable to be wrapped
+    :param desc: description of the bar
+    :return: tqdm object
+    """
+    return tqdm(iterable, desc=desc, disable=not _progress_enabled, **kwargs)
+
+
+class Recorder:
+    """
+    Receives the records of all documents and sends them to the sinks. Can be used by several threads
+    """
+
+    def __init__(self, *sinks):
+        self.sinks = list(sinks)
+        self._lock = threading.Lock()
+
+    def emit(self, record):
+        with self._lock:
+            for sink in self.sinks:
+                sink(record)
+
+
+class MemorySink:
+    """
+    Keeps all records in a list
+    """
+
+    def __init__(self):
+        self.records = []
+
+    def __call__(self, record):
+        self.records.append(record)
+
+
+class JsonLinesSink:
+    """
+    Appends each record as a json line to a file
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "a", encoding="utf8")
+
+    def __call__(self, record):
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+@contextlib.contextmanager
+def recording(recorder):
+    """
+    Activates the recorder while the block runs
+    :param recorder: Recorder object
+    """
+    global _active
+    previous = _active
+    _active = recorder
+    try:
+        yield recorder
+    finally:
+        _active = previous
+
+
+@contextlib.contextmanager
+def document(name):
+    """
+    Collects a record for the document processed inside the block (in the current thread). If a document is already
+    being collected, the block is added to it
+    :param name: document name
+    :return: the record (None if there is no active recorder)
+    """
+    if current() is not None:
+        yield current()
+        return
+
+    record = start(name)
+    with attach(record):
+        try:
+            yield record
+        finally:
+            finish(record)
+
+
+def start(name):
+    """
+    Creates the record of a document without making it current. Used when the document passes through several
+    threads: each thread attaches the record while working on it and the last one calls finish
+    :param name: document name
+    :return: the record (None if there is no active recorder)
+    """
+    if _active is None:
+        return None
+    return {"document": name, "wall_seconds": 0., "stages": {}, "counters": {},
+            "_recorder": _active, "_start": time.perf_counter()}
+
+
+def finish(record):
+    """
+    Completes the record created by start and sends it to the recorder
+    :param record: record returned by start (None is ignored)
+    """
+    if record is None:
+        return
+    recorder = record.pop("_recorder")
+    record["wall_seconds"] = time.perf_counter() - record.pop("_start")
+    counters = record["counters"]
+    if counters.get("kept_pairs"):
+        record["positive_ratio"] = counters.get("positive_pairs", 0) / counters["kept_pairs"]
+    record["peak_rss_bytes"] = peak_rss()
+    recorder.emit(record)
+
+
+@contextlib.contextmanager
+def attach(record):
+    """
+    Makes the record the current one for this thread. Used to continue a record in another thread
+    :param record: record returned by document or start
+    """
+    previous = current()
+    _local.record = record
+    try:
+        yield record
+    finally:
+        _local.record = previous
+
+
+@contextlib.contextmanager
+def collecting():
+    """
+    Collects the stages and counters of the block in a new record, even if there is no active recorder. The record is
+    not sent anywhere: it is used by worker processes, whose timings are sent back and added to the record of the
+    document in the parent process (see merge)
+    :return: dictionary with stages and counters
+    """
+    record = {"stages": {}, "counters": {}}
+    with attach(record):
+        yield record
+
+
+def merge(collected):
+    """
+    Adds the stages and counters collected by another thread or process to the current record
+    :param collected: dictionary with stages and counters, see collecting
+    """
+    record = current()
+    if record is None:
+        return
+    for key in ("stages", "counters"):
+        values = record[key]
+        for name, value in collected[key].items():
+            values[name] = values.get(name, 0) + value
+
+
+def current():
+    """
+    :return: record being collected in this thread or None
+    """
+    return getattr(_local, "record", None)
+
+
+@contextlib.contextmanager
+def stage(name):
+    """
+    Adds the time spent in the block to the stage of the current record
+    :param name: stage name
+    """
+    record = current()
+    if record is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages = record["stages"]
+        stages[name] = stages.get(name, 0.) + time.perf_counter() - start
+
+
+def count(name, value):
+    """
+    Adds the value to the counter of the current record
+    :param name: counter name
+    :param value: number to be added
+    """
+    record = current()
+    if record is not None:
+        counters = record["counters"]
+        counters[name] = counters.get(name, 0) + value
+
+
+def peak_rss():
+    """
+    :return: peak resident memory of the process in bytes, or None if it can not be measured
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Linux reports kilobytes
@@ -4,58 +4,232 @@ The main function is trainfile_to_vectors
 
 """
 
+import functools
 import os
 import re
 
-from tqdm import tqdm
-
+from boilerplate import instrumentation
 from boilerplate import mentions
+from boilerplate import outputs
+from boilerplate import pipeline
+from boilerplate import shards
+from boilerplate import shared
+from boilerplate import sources
 
 
-def trainfile_to_vectors(path, increment_mention, increment_mention_pair, make_vectors):
+def trainfile_to_vectors(path, increment_mention, increment_mention_pair, make_vectors, sampler=None):
     """
     Given one file, returns the input and output vectors to be passed to a learning algo
     :param path: file path to be used
     :param increment_mention: method to add information to the mention
     :param increment_mention_pair: method to add information to the mention pair
+    :param make_vectors: method to build the vectors. The mention attributes it uses can be declared with
+            mentions.requires
+    :param sampler: chooses the mention pairs, see sampling.Sampler. Default uses mentions.check_usable_pairs
+    :return: [input_vector, output_vector, document_name]
+    """
+    with instrumentation.stage("read"):
+        train_list = train_file_to_list(path)
+    return lines_to_vectors(train_list, increment_mention, increment_mention_pair, make_vectors, sampler)
+
+
+def lines_to_vectors(train_list, increment_mention, increment_mention_pair, make_vectors, sampler=None):
+    """
+    Same as trainfile_to_vectors, for a file already read
+    :param train_list: list of lines of the file
+    :param increment_mention: method to add information to the mention
+    :param increment_mention_pair: method to add information to the mention pair
     :param make_vectors: method to build the vectors
+    :param sampler: chooses the mention pairs, see sampling.Sampler
     :return: [input_vector, output_vector, document_name]
     """
-    train_list = train_file_to_list(path)
-    pairs = mentions.get_mention_pairs(train_list, increment_mention, increment_mention_pair)
-    input_vector, output_vector = make_vectors(pairs, train_list=train_list)
-    input_vector = _append_mention_info(pairs, input_vector)
+    pairs = mentions.get_mention_pairs(train_list, increment_mention, increment_mention_pair, sampler=sampler,
+                                       attributes=getattr(make_vectors, "mention_attributes", None))
+    with instrumentation.stage("features"):
+        input_vector, output_vector = make_vectors(pairs, train_list=train_list)
+        input_vector = _append_mention_info(pairs, input_vector)
     return input_vector, output_vector, get_document_name(train_list)
 
 
-def process_dir(path_in, path_out, callback):
-    with tqdm(os.walk(path_in), desc="folders")as pb:
-        for r, d, f in pb:
-            pb.set_description("folder:...{}".format(r[-20:]))
-            for file_name in tqdm(f, desc="files"):
-                if not file_name.endswith("_conll"):
+class CsvWriter:
+    """
+    Default writer used by process_dir. Saves two text files per document: [original_name]_in with the document name
+    and the input vectors and [original_name]_out with the output vectors.
+    Other writers (i.e. packed.PackedWriter) must have the same save method
+    """
+
+    def __init__(self, path_out):
+        self.path_out = path_out
+
+    def save(self, file_name, v_in, v_out, doc_name):
+        """
+        Saves the vectors of one document
+        :param file_name: original file name
+        :param v_in: input vectors (pair info + features)
+        :param v_out: output vectors
+        :param doc_name: document name
+        :return: list of files created in the output folder
+        """
+        _save_to_file(v_in, self.path_out, file_name + "_in", doc_name)
+        _save_to_file(v_out, self.path_out, file_name + "_out")
+        saved = [file_name + "_in", file_name + "_out"]
+        instrumentation.count("bytes_written", sum(os.path.getsize(os.path.join(self.path_out, f)) for f in saved))
+        return saved
+
+
+def process_dir(path_in, path_out, callback, resume=False, shard_index=0, num_shards=1, writer=None,
+                save_templates=False):
+    """
+    Walks path_in and calls the callback for every *_conll file, saving the returned vectors into path_out.
+    Files are written atomically (temp file plus rename), so an interrupted run never leaves truncated outputs behind.
+    :param path_in: root folder to be searched
+    :param path_out: output folder
+    :param callback: method that receives a file path and returns [input_vector, output_vector, document_name]
+    :param resume: if True, files already in the journal of path_out are skipped
+    :param shard_index: index of the shard to be processed by this call. See shards.partition
+    :param num_shards: number of shards the files are split into. With more than one shard, the journal is also kept
+            in path_out and works as the shard manifest for shards.merge_shards
+    :param writer: object used to save the vectors. Default is CsvWriter(path_out)
+    :param save_templates: if True, the output template of each file (see saver.build_template) is also saved as
+            [original_name]_template, so predictions can be saved without the original corpus
+    """
+    writer = writer if writer is not None else CsvWriter(path_out)
+    files, completed, journal = _start_run(_find_conll_files(path_in), path_out, resume, shard_index, num_shards)
+    try:
+        with instrumentation.progress(files, desc="files") as pb:
+            for source, file_path, _ in pb:
+                pb.set_description("file:...{}".format(source[-20:]))
+                if source in completed:
                     continue
-                v_in, v_out, doc_name = callback(os.path.join(r, file_name))
+                with instrumentation.document(source):
+                    result = callback(file_path)
+                    _write_result(writer, journal, path_out, source, file_path, result, save_templates)
+    finally:
+        if journal:
+            journal.close()
+
+
+def process_source(source, path_out, callback, resume=False, shard_index=0, num_shards=1, writer=None,
+                   save_templates=False):
+    """
+    Same as process_dir, reading the files from a source (see sources module), i.e. a tar archive
+    :param source: sources.DirectorySource, sources.TarSource or any object with the same methods
+    :param path_out: output folder
+    :param callback: method that receives the list of lines of a file and returns [input_vector, output_vector,
+            document_name] (see lines_to_vectors)
+    :param resume: if True, files already in the journal of path_out are skipped
+    :param shard_index: index of the shard to be processed by this call
+    :param num_shards: number of shards the files are split into
+    :param writer: object used to save the vectors. Default is CsvWriter(path_out)
+    :param save_templates: if True, the output template of each file is also saved
+    """
+    os.makedirs(path_out, exist_ok=True)
+    writer = writer if writer is not None else CsvWriter(path_out)
+    files, completed, journal = _start_run(source.files(), path_out, resume, shard_index, num_shards)
+    names = set(f[0] for f in files if f[0] not in completed)
+    try:
+        with instrumentation.progress(None, desc="files", total=len(names)) as pb:
+            for name, locator, read in source.entries(names):
+                with instrumentation.document(name):
+                    with instrumentation.stage("read"):
+                        train_list = read()
+                    result = callback(train_list)
+                    _write_result(writer, journal, path_out, name, locator, result, save_templates, train_list)
+                pb.update(1)
+    finally:
+        if journal:
+            journal.close()
+
 
-                if len(v_in) > 0 and len(v_out) > 0:
-                    _save_to_file(v_in, path_out, file_name + "_in", doc_name)
-                    _save_to_file(v_out, path_out, file_name + "_out")
+def _start_run(files, path_out, resume, shard_index, num_shards):
+    """
+    Selects the files of this shard and opens the journal. See process_dir for the parameters
+    :param files: list of (name, locator, size), as returned by _find_conll_files
+    :return: files of the shard, dictionary of completed files (see outputs.read_journal), journal (or None)
+    """
+    if num_shards > 1:
+        selected = shards.select_shard([(source, size) for source, _, size in files], shard_index, num_shards)
+        files = [f for f in files if f[0] in selected]
+
+    keep_journal = resume or num_shards > 1
+    completed = outputs.read_journal(path_out) if resume else {}
+    journal = outputs.open_journal(path_out, truncate=not resume) if keep_journal else None
+    return files, completed, journal
+
+
+def _write_result(writer, journal, path_out, source, file_path, result, save_templates, train_list=None):
+    """
+    Saves the vectors of one file and adds it to the journal
+    :param writer: object used to save the vectors
+    :param journal: file object returned by outputs.open_journal or None
+    :param path_out: output folder
+    :param source: relative name of the file
+    :param file_path: full path of the file (or the name of the archive member)
+    :param result: [input_vector, output_vector, document_name] returned by the callback
+    :param save_templates: if True, the template of the file is also saved
+    :param train_list: lines of the file, if already read
+    """
+    v_in, v_out, doc_name = result
+    file_name = os.path.basename(file_path)
+    saved = []
+    with instrumentation.stage("write"):
+        if len(v_in) > 0 and len(v_out) > 0:
+            saved = writer.save(file_name, v_in, v_out, doc_name)
+        if save_templates:
+            saved = saved + [_save_template(file_path, path_out, file_name, train_list)]
+
+    if journal:
+        outputs.write_journal(journal, {"source": source, "doc_name": doc_name, "files": saved,
+                                 "rows": len(v_out) if len(v_in) > 0 else 0})
 
 
-def transform_conll_to_vectors(path_in, path_out, increment_mention, increment_mention_pair, make_vectors):
+def transform_conll_to_vectors(path_in, path_out, increment_mention, increment_mention_pair, make_vectors,
+                               resume=False, shard_index=0, num_shards=1, writer=None, save_templates=False,
+                               sampler=None, workers=0, queue_size=4, processes=0):
     """
     Walks the input path looking for *_conll files. If any file is found, it is processed and two files are generated
     into the path_out root.
     A file with pattern [original_name]_in with the input vectors and [original_name]_out with the output vectors
-    :param path_in: root folder to be searched. Files can be in multiple sub-folders
+    :param path_in: root folder to be searched. Files can be in multiple sub-folders. Can also be a .tar, .tar.gz or
+            .tgz archive (see sources module)
     :param path_out: output folder
     :param increment_mention: method to add information to the mention
     :param increment_mention_pair: method to add information to the mention pair
     :param make_vectors: method to build the vectors
+    :param resume: if True, files completed by a previous (interrupted) run are skipped. See process_dir
+    :param shard_index: index of the shard converted by this call, from 0 to num_shards - 1
+    :param num_shards: number of machines splitting the conversion. Use shards.merge_shards to combine the outputs
+    :param writer: object used to save the vectors, i.e. packed.PackedWriter. Default saves the two files above
+    :param save_templates: if True, a third file [original_name]_template is saved. See saver.build_template
+    :param sampler: chooses the mention pairs, see sampling.Sampler. Default uses mentions.check_usable_pairs
+    :param workers: if greater than 0, files are read, converted and written at the same time, with this number of
+            threads converting files. See pipeline.process_dir
+    :param queue_size: max number of files waiting between two stages of the pipeline
+    :param processes: if greater than 0, files are converted by this number of processes and the vectors are passed
+            back through shared memory (see shared module). The hooks, make_vectors and the sampler must be picklable.
+            Ignored if workers is greater than 0
+    :return: depends on the mode:
+            * workers > 0: statistics of each stage of the pipeline, see pipeline.process_source
+            * processes > 0: result of shared.process_source, which is None
+            * sequential (default): None
     """
+    source = sources.open_source(path_in)
+    if processes > 0 and workers <= 0:
+        callback = functools.partial(shared.lines_to_shared, increment_mention=increment_mention,
+                                     increment_mention_pair=increment_mention_pair, make_vectors=make_vectors,
+                                     sampler=sampler)
+        return shared.process_source(source, path_out, callback, processes, resume=resume, shard_index=shard_index,
+                                     num_shards=num_shards, writer=writer, save_templates=save_templates)
+    callback = functools.partial(lines_to_vectors, increment_mention=increment_mention,
+                                 increment_mention_pair=increment_mention_pair, make_vectors=make_vectors,
+                                 sampler=sampler)
+    if workers > 0:
+        return pipeline.process_source(source, path_out, callback, workers=workers, queue_size=queue_size,
+                                       resume=resume, shard_index=shard_index, num_shards=num_shards, writer=writer,
+                                       save_templates=save_templates)
 
-    process_dir(path_in, path_out,
-                lambda x: trainfile_to_vectors(x, increment_mention, increment_mention_pair, make_vectors))
+    process_source(source, path_out, callback, resume=resume, shard_index=shard_index, num_shards=num_shards,
+                   writer=writer, save_templates=save_templates)
 
 
 def train_file_to_list(file):
@@ -69,14 +243,14 @@ def train_file_to_list(file):
 
 def _save_to_file(vector, path, file_name, doc_name=None):
     """
-    Saves a vector into a file if the vector is not empty
+    Saves a vector into a file if the vector is not empty. The file only gets its final name once it is complete
     :param vector: list of lists of values. Can be numpy arrays
     :param path: folder to save
     :param file_name: file name to use
     """
     if len(vector) == 0:  # Do not create empty files
         return
-    with open(os.path.join(path, file_name), "w") as f:
+    with outputs.atomic_open(os.path.join(path, file_name)) as f:
         if doc_name:
             f.write(doc_name + "\n")
 
@@ -84,6 +258,47 @@ def _save_to_file(vector, path, file_name, doc_name=None):
             f.write(",".join([str(i) for i in line]) + "\n")
 
 
+def _save_template(file_path, path, file_name, train_list=None):
+    """
+    Saves the output template of the file
+    :param file_path: original file
+    :param path: output folder
+    :param file_name: original file name
+    :param train_list: lines of the file. Read from file_path if not informed
+    :return: name of the template file
+    """
+    from boilerplate import saver  # Only needed when templates are saved
+    template_name = file_name + saver.TEMPLATE_SUFFIX
+    template = saver.build_template(train_list if train_list is not None else train_file_to_list(file_path))
+    saver.save_template(template, path, template_name)
+    return template_name
+
+
+def _find_conll_files(path_in):
+    """
+    Finds all *_conll files under path_in
+    :param path_in: root folder to be searched. Files can be in multiple sub-folders
+    :return: list of (relative name, full path, size in bytes), sorted by name
+    """
+    files = []
+    for r, d, f in os.walk(path_in):
+        for file_name in f:
+            if file_name.endswith("_conll"):
+                file_path = os.path.join(r, file_name)
+                files.append((_relative_name(file_path, path_in), file_path, os.path.getsize(file_path)))
+    return sorted(files)
+
+
+def _relative_name(file_path, root):
+    """
+    Name of the file relative to the root, always using '/' as separator
+    :param file_path: full file path
+    :param root: root folder
+    :return: relative name
+    """
+    return os.path.relpath(file_path, root).replace(os.sep, "/")
+
+
 def _append_mention_info(pairs, input_vectors):
     """
     Append pair information into the vector to be saved in the disk
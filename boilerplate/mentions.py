@@ -6,9 +6,13 @@ the output files.
 """
 
 import difflib
+import functools
 import re
+import sys
 
-from tqdm import tqdm
+import numpy as np
+
+from boilerplate import instrumentation
 
 CONLL_DOC_ID_COLUMN = 0
 CONLL_PART_NUM_COLUMN = 1
@@ -22,13 +26,24 @@ CONLL_SENSE_COLUMN = 8
 CONLL_SPEAKER_COLUMN = 9
 CONLL_NAMED_COLUMN = 10
 
+# Mention attributes that are only computed when used (see Mention and requires)
+LAZY_ATTRIBUTES = ("pre_words", "next_words", "mention_sentence")
+
 
 class Mention:
     """
     This class represents a mention with all its features. It can be extended if more information is needed
     """
 
-    def __init__(self, m_id, words, start_pos, end_pos):
+    def __init__(self, m_id, words, start_pos, end_pos, train_list=None):
+        """
+        :param m_id: mention id ([part]_[cluster])
+        :param words: words of the mention
+        :param start_pos: first line of the mention
+        :param end_pos: last line of the mention
+        :param train_list: lines of the document. Needed by the attributes in LAZY_ATTRIBUTES
+        """
+        self.train_list = train_list
         self.words = words
         self.mention_id = m_id
         self.doc_id = m_id.split('_')[0]
@@ -54,6 +69,178 @@ class Mention:
     def get_seq_id(self, substructre_id):
         return self.seq_ids[substructre_id]
 
+    # Context attributes. Computed on first access and cached
+    @functools.cached_property
+    def pre_words(self):
+        return _get_preceding_words(self._document(), self.start_pos)
+
+    @functools.cached_property
+    def next_words(self):
+        return _get_next_words(self._document(), self.end_pos)
+
+    @functools.cached_property
+    def mention_sentence(self):
+        return _mention_sentence(self._document(), self.start_pos)
+
+    def _document(self):
+        if self.train_list is None:
+            raise AttributeError("Mention created without train_list has no context attributes")
+        return self.train_list
+
+
+class DocumentTokens:
+    """
+    Words, parts, speakers and sentences of all lines of a file, shared by the CompactMention objects of the file.
+    Words and speakers are interned and stored as ids, so repeated strings are kept in memory only once
+    """
+
+    def __init__(self, train_list):
+        """
+        :param train_list: list of lines in the document
+        """
+        n = len(train_list)
+        self.vocabulary = []
+        self.speakers = []
+        self.word_ids = np.full(n, -1, dtype=np.int32)  # -1 on blank/header lines
+        self.speaker_ids = np.full(n, -1, dtype=np.int32)
+        self.parts = np.full(n, -1, dtype=np.int32)
+        self.boundary = np.zeros(n, dtype=bool)  # #begin/#end lines
+        words = {}
+        speakers = {}
+        for i, line in enumerate(train_list):
+            if line == '\n':
+                continue
+            cols = line.split()
+            if cols[CONLL_DOC_ID_COLUMN] == '#begin' or cols[CONLL_DOC_ID_COLUMN] == '#end':
+                self.boundary[i] = True
+                continue
+            self.word_ids[i] = _intern_id(words, self.vocabulary, cols[CONLL_WORD_COLUMN])
+            self.speaker_ids[i] = _intern_id(speakers, self.speakers, cols[CONLL_SPEAKER_COLUMN])
+            self.parts[i] = int(cols[CONLL_PART_NUM_COLUMN])
+
+        # A new sentence starts after each blank or #begin/#end line
+        breaks = (self.word_ids == -1)
+        self.sentence_ids = np.cumsum(np.concatenate([[False], breaks[:-1]])).astype(np.int32)
+        self._sentences = {}
+
+    def words(self, start, end):
+        """
+        :param start: first line (1 is the first line of the file)
+        :param end: last line
+        :return: list of words
+        """
+        vocabulary = self.vocabulary
+        return [vocabulary[w] for w in self.word_ids[start - 1:end].tolist()]
+
+    def sentence(self, sentence_id):
+        """
+        :param sentence_id: id of the sentence (see sentence_ids)
+        :return: string with all words of the sentence. Built once per sentence
+        """
+        sentence = self._sentences.get(sentence_id)
+        if sentence is None:
+            lines = np.flatnonzero((self.sentence_ids == sentence_id) & (self.word_ids != -1))
+            sentence = " ".join(self.vocabulary[w] for w in self.word_ids[lines].tolist())
+            self._sentences[sentence_id] = sentence
+        return sentence
+
+    def context(self, line_idx, step, max_words=5):
+        """
+        Same as _get_preceding_words (step -1) and _get_next_words (step 1)
+        :param line_idx: index (starting at 0) of the first line to be checked
+        :param step: direction of the search
+        :param max_words: max words to be returned
+        :return: list of words
+        """
+        part = self.parts[line_idx - step]
+        words = []
+        stop = 0 if step < 0 else len(self.word_ids)  # Line 0 is never checked when looking back
+        for i in range(line_idx, stop, step):
+            if self.boundary[i]:
+                break
+            if self.parts[i] == part and self.word_ids[i] != -1:
+                words.append(self.vocabulary[self.word_ids[i]])
+                if len(words) == max_words:
+                    break
+        return words
+
+
+class CompactMention:
+    """
+    Same interface as Mention, using less memory. The fields are slotted and the words are read from the
+    DocumentTokens shared by all mentions of the file, instead of being copied into each mention. Attributes added by
+    custom code (i.e. increment_mention) are still accepted
+    """
+    __slots__ = ("tokens", "mention_id", "doc_id", "start_pos", "end_pos", "speaker_id", "sentence_id", "index",
+                 "mention_position", "contained", "overlap", "_seq_ids", "__dict__")
+
+    def __init__(self, tokens, m_id, start_pos, end_pos):
+        """
+        :param tokens: DocumentTokens of the file
+        :param m_id: mention id ([part]_[cluster])
+        :param start_pos: first line of the mention
+        :param end_pos: last line of the mention
+        """
+        self.tokens = tokens
+        self.mention_id = sys.intern(m_id)
+        self.doc_id = sys.intern(m_id.split('_')[0])
+        self.start_pos = start_pos
+        self.end_pos = end_pos
+        self.speaker_id = int(tokens.speaker_ids[start_pos - 1])
+        self.sentence_id = int(tokens.sentence_ids[start_pos - 1])
+        self._seq_ids = None
+
+    @property
+    def words(self):
+        return self.tokens.words(self.start_pos, self.end_pos)
+
+    @property
+    def mention(self):
+        return " ".join(self.words)
+
+    @property
+    def first_word(self):
+        return self.tokens.vocabulary[self.tokens.word_ids[self.start_pos - 1]]
+
+    @property
+    def last_word(self):
+        return self.tokens.vocabulary[self.tokens.word_ids[self.end_pos - 1]]
+
+    @property
+    def mention_start(self):
+        return self.start_pos
+
+    @property
+    def mention_end(self):
+        return self.end_pos
+
+    @property
+    def speaker(self):
+        return self.tokens.speakers[self.speaker_id]
+
+    @property
+    def pre_words(self):
+        return self.tokens.context(self.start_pos - 2, -1)
+
+    @property
+    def next_words(self):
+        return self.tokens.context(self.end_pos, 1)
+
+    @property
+    def mention_sentence(self):
+        return self.tokens.sentence(self.sentence_id)
+
+    @property
+    def seq_ids(self):
+        if self._seq_ids is None:
+            self._seq_ids = {}
+        return self._seq_ids
+
+    compare = Mention.compare
+    set_seq_id = Mention.set_seq_id
+    get_seq_id = Mention.get_seq_id
+    __str__ = Mention.__str__
+
 
 class MentionPair:
     """
@@ -92,44 +279,164 @@ def check_usable_pairs(mention_list, i, j):
     return True
 
 
-def build_mention_list(train_list, fill_information=None):
+def requires(*attributes):
+    """
+    Declares the mention attributes used by a make_vectors function. The attributes in LAZY_ATTRIBUTES that are
+    declared are computed while the mentions are built, the others only if something reads them.
+    Usage:
+        @mentions.requires("pre_words", "next_words")
+        def make_vectors(pairs, mapper=None, train_list=None):
+    :param attributes: attribute names
+    """
+
+    def decorator(function):
+        function.mention_attributes = frozenset(attributes)
+        return function
+
+    return decorator
+
+
+def batch_hook(function):
+    """
+    Declares a hook that receives all mentions (or pairs) of a document at once, instead of one at a time. A batch
+    hook returns a dictionary attribute name -> column, with one value per mention (or pair) in the order received.
+    The values are set as attributes of each mention (or pair); numpy columns are converted with tolist, so a 2D
+    column gives one list per row.
+    Usage:
+        @mentions.batch_hook
+        def increment_mentions(mention_list, train_list):
+            return {"head_word": [m.last_word for m in mention_list]}
+
+        @mentions.batch_hook
+        def increment_mention_pairs(batch, train_list):  # batch is a PairBatch
+            index = batch.mention_column("index")
+            return {"index_distance": index[batch.i] - index[batch.j]}
+    Hooks without this declaration are called once per item (see batch_mentions and batch_pairs)
+    :param function: hook to be declared
+    """
+    function.batched = True
+    return function
+
+
+def batch_mentions(increment_mention):
+    """
+    Adapts a per mention hook (increment_mention(mention)) to the batch protocol (see batch_hook)
+    :param increment_mention: hook that changes one mention
+    :return: batch hook
+    """
+
+    @batch_hook
+    def increment_mentions(mention_list, train_list):
+        for mention in mention_list:
+            increment_mention(mention)
+        return {}
+
+    return increment_mentions
+
+
+def batch_pairs(increment_mention_pair):
+    """
+    Adapts a per pair hook (increment_mention_pair(pair, train_list)) to the batch protocol (see batch_hook)
+    :param increment_mention_pair: hook that changes one pair
+    :return: batch hook
+    """
+
+    @batch_hook
+    def increment_mention_pairs(batch, train_list):
+        for pair in batch.pairs:
+            increment_mention_pair(pair, train_list)
+        return {}
+
+    return increment_mention_pairs
+
+
+class PairBatch:
+    """
+    Pairs of a document in columns, given to the batch pair hooks. Pair k is (mentions[i[k]], mentions[j[k]])
+    """
+
+    def __init__(self, mention_list, pairs, i, j):
+        """
+        :param mention_list: all mentions of the document
+        :param pairs: list of MentionPair
+        :param i: np.array with the index of mention1 of each pair
+        :param j: np.array with the index of mention2 of each pair
+        """
+        self.mentions = mention_list
+        self.pairs = pairs
+        self.i = i
+        self.j = j
+
+    def __len__(self):
+        return len(self.pairs)
+
+    def mention_column(self, attribute):
+        """
+        :param attribute: mention attribute
+        :return: np.array with the attribute of each mention. Index it with i or j to get the values of the pairs
+        """
+        return np.array([getattr(m, attribute) for m in self.mentions])
+
+
+def _set_columns(items, columns):
+    """
+    Sets the columns returned by a batch hook as attributes of the items
+    """
+    for name, column in columns.items():
+        values = column.tolist() if isinstance(column, np.ndarray) else column
+        if len(values) != len(items):
+            raise ValueError("Column {} has {} values for {} items".format(name, len(values), len(items)))
+        for item, value in zip(items, values):
+            setattr(item, name, value)
+
+
+def build_mention_list(train_list, fill_information=None, compact=False, attributes=None):
     """
     Build a list of dictionaries with the information about each mention. The mentions are not yet grouped
 
     :param train_list: list of lines in the document
-    :param fill_information: function to add more information into the cluster
+    :param fill_information: function to add more information into the cluster. Can be a batch hook (see batch_hook)
+    :param compact: if True, CompactMention objects are created instead of Mention
+    :param attributes: attributes that will be used (see requires). The ones in LAZY_ATTRIBUTES are computed now.
+            Default computes them only when they are read
     :return:
     """
+    eager = [a for a in LAZY_ATTRIBUTES if a in attributes] if attributes and not compact else []
     mentions = []
     cluster_start, start_pos, cluster_end, end_pos = _get_mention(train_list)
     mention_cluster = _create_mention_cluster_list(cluster_start, start_pos, cluster_end, end_pos)
-    for m in tqdm(mention_cluster, desc="mentions"):
+    tokens = DocumentTokens(train_list) if compact else None
+    for m in instrumentation.progress(mention_cluster, desc="mentions"):
         m_id, start_pos, end_pos = m
+        if compact:
+            mentions.append(CompactMention(tokens, m_id, start_pos, end_pos))
+            continue
 
         mention_words = get_mention_words(train_list, start_pos, end_pos)
-        mention = Mention(m_id, mention_words, start_pos, end_pos)
+        mention = Mention(m_id, mention_words, start_pos, end_pos, train_list)
 
         # Building features
         mention.mention_start = start_pos
         mention.mention_end = end_pos
-        mention.pre_words = _get_preceding_words(train_list, start_pos)
-        mention.next_words = _get_next_words(train_list, end_pos)
-        mention.mention_sentence = _mention_sentence(train_list, start_pos)
         mention.speaker = train_list[start_pos - 1].split()[CONLL_SPEAKER_COLUMN]
-
-        # This will allow external info to be added
-        if fill_information:
-            fill_information(mention)
+        for attribute in eager:
+            getattr(mention, attribute)
 
         mentions.append(mention)
 
+    # This will allow external info to be added
+    if fill_information:
+        hook = fill_information if getattr(fill_information, "batched", False) else batch_mentions(fill_information)
+        _set_columns(mentions, hook(mentions, train_list))
+
     mentions = sorted(mentions, key=lambda k: k.mention_start)
     mentions = _check_mention_contain(mentions)
     mentions = _get_index(mentions)
     return mentions
 
 
-def _add_extra_pair_info(mention_pair_list, train_list, increment_mention_pair=None):
+def _add_extra_pair_info(mention_pair_list, train_list, increment_mention_pair=None, mention_list=None, pair_i=None,
+                         pair_j=None):
     """
     Adds distance information about the mention pairs.
     'overlap' : True (1) if the second element overlaps the first
@@ -139,7 +446,11 @@ def _add_extra_pair_info(mention_pair_list, train_list, increment_mention_pair=N
 
     :param mention_pair_list: list of pair of mentions
     :param train_list: list of lines in the document
-    :param increment_mention_pair: function to add more information to each pair
+    :param increment_mention_pair: function to add more information to each pair. Can be a batch hook (see
+            batch_hook)
+    :param mention_list: mentions of the pairs, for the batch hooks
+    :param pair_i: index (in mention_list) of the first mention of each pair, for the batch hooks
+    :param pair_j: index (in mention_list) of the second mention of each pair, for the batch hooks
     :return:
     """
     for p in mention_pair_list:
@@ -151,8 +462,12 @@ def _add_extra_pair_info(mention_pair_list, train_list, increment_mention_pair=N
         score = seq.ratio()
         p.mention_partial_match = score > 0.6
 
-        if increment_mention_pair:
-            increment_mention_pair(p, train_list)
+    if increment_mention_pair:
+        hook = increment_mention_pair if getattr(increment_mention_pair, "batched", False) else \
+            batch_pairs(increment_mention_pair)
+        batch = PairBatch(mention_list, mention_pair_list, np.asarray(pair_i, dtype=np.int64),
+                          np.asarray(pair_j, dtype=np.int64))
+        _set_columns(mention_pair_list, hook(batch, train_list))
 
     return mention_pair_list
 
@@ -394,7 +709,7 @@ def _get_index(mentions):
 
 
 def get_mention_pairs(train_list, increment_mention_info=None, increment_mention_pair=None,
-                      use_pair=check_usable_pairs):
+                      use_pair=check_usable_pairs, sampler=None, compact=False, attributes=None):
     """
     Builds a list of pair of mentions for the file. Each pair may or may not have a coreference. Each position
     simulates an object with the first two positions being mentions and the following are dictionaries with extra
@@ -404,17 +719,64 @@ def get_mention_pairs(train_list, increment_mention_info=None, increment_mention
     :param increment_mention_info: function to add more information to the mention
     :param increment_mention_pair: function to add more information to the mention pair
     :param use_pair: function to define if two mentions should be paired or not
+    :param sampler: function that receives the mention list and train_list and returns two arrays (i, j) with the
+            pairs to be used (see sampling.Sampler). When informed, use_pair is ignored
+    :param compact: if True, CompactMention objects are used (see build_mention_list)
+    :param attributes: mention attributes that will be used (see requires)
     :return: list of objects
     """
-    mention_list = build_mention_list(train_list, increment_mention_info)
-    mention_pair_list = []
-    for i in tqdm(range(1, len(mention_list)), desc="mention pair"):
-        for j in range(0, i):
-            if use_pair(mention_list, i, j):
-                pair = MentionPair(mention_list[i], mention_list[j])
-                mention_pair_list.append(pair)
+    with instrumentation.stage("mentions"):
+        mention_list = build_mention_list(train_list, increment_mention_info, compact, attributes)
+    instrumentation.count("mentions", len(mention_list))
+    return pair_mentions(mention_list, train_list, increment_mention_pair, use_pair, sampler)
+
 
-    # Adding extra info
-    mention_pair_list = _add_extra_pair_info(mention_pair_list, train_list, increment_mention_pair)
+def pair_mentions(mention_list, train_list, increment_mention_pair=None, use_pair=check_usable_pairs, sampler=None):
+    """
+    Builds the pairs of an existing mention list. Same as get_mention_pairs, for callers that also need the mentions
+    :param mention_list: list returned by build_mention_list
+    :param train_list: list of lines in the file
+    :param increment_mention_pair: function to add more information to the mention pair. Can be a batch hook (see
+            batch_hook)
+    :param use_pair: function to define if two mentions should be paired or not
+    :param sampler: function that chooses the pairs (see get_mention_pairs)
+    :return: list of MentionPair, sorted by the first mention and then by the second
+    """
+    with instrumentation.stage("pairs"):
+        mention_pair_list = []
+        if sampler is not None:
+            pair_i, pair_j = sampler(mention_list, train_list)
+            for i, j in zip(pair_i.tolist(), pair_j.tolist()):
+                mention_pair_list.append(MentionPair(mention_list[i], mention_list[j]))
+        else:
+            pair_i, pair_j = [], []
+            for i in instrumentation.progress(range(1, len(mention_list)), desc="mention pair"):
+                for j in range(0, i):
+                    if use_pair(mention_list, i, j):
+                        pair = MentionPair(mention_list[i], mention_list[j])
+                        mention_pair_list.append(pair)
+                        pair_i.append(i)
+                        pair_j.append(j)
+
+        # Adding extra info
+        mention_pair_list = _add_extra_pair_info(mention_pair_list, train_list, increment_mention_pair, mention_list,
+                                                 pair_i, pair_j)
+    instrumentation.count("candidate_pairs", len(mention_list) * (len(mention_list) - 1) // 2)
+    instrumentation.count("kept_pairs", len(mention_pair_list))
+    instrumentation.count("positive_pairs", sum(p.coref for p in mention_pair_list))
 
     return mention_pair_list
+
+
+def _intern_id(ids, values, value):
+    """
+    :param ids: dictionary value -> id
+    :param values: list of values (position is the id)
+    :param value: string to be interned
+    :return: id of the value. New values are added to both structures
+    """
+    value_id = ids.get(value)
+    if value_id is None:
+        value_id = ids[value] = len(values)
+        values.append(sys.intern(value))
+    return value_id
@@ -12,6 +12,8 @@ import numpy as np
 import spacy
 from num2words import num2words
 
+from boilerplate import mentions
+
 # Loading spaCy
 nlp = spacy.load('en_core_web_lg')
 
@@ -35,25 +37,63 @@ def increment_mention_pair(p, train_list):
     p.head_match = p.mention1.head_word == p.mention2.head_word
 
 
+@mentions.batch_hook
+def increment_mention_pairs(batch, train_list):
+    """
+    Same as increment_mention_pair, for all pairs of the document at once
+    :param batch: mentions.PairBatch
+    :param train_list: list of all lists in fhe file
+    :return: columns sentence_dist_count, mention_dist_count and head_match
+    """
+    blank_before = np.concatenate([[0], np.cumsum([line == '\n' for line in train_list])])
+    start = batch.mention_column("mention_start").reshape(-1)
+    m1, m2 = start[batch.i], start[batch.j]
+    count = np.where(m1 < m2, blank_before[np.minimum(m2 + 1, len(train_list))] - blank_before[m1], 0)
+    index = batch.mention_column("index").reshape(-1)
+    head_word = batch.mention_column("head_word").reshape(-1)
+    return {"sentence_dist_count": _distances(count),
+            "mention_dist_count": _distances(index[batch.i] - index[batch.j]),
+            "head_match": head_word[batch.i] == head_word[batch.j]}
+
+
 def increment_mention(mention):
     """
     Adding information about head word and mention type
     :param mention:
     :return: None
     """
-
     mention_words = mention.mention
+    mention.head_word, mention.mention_type, mention.mention_length = _mention_info(mention_words, nlp(mention_words))
+
 
-    doc = nlp(mention_words)
+@mentions.batch_hook
+def increment_mentions(mention_list, train_list):
+    """
+    Same as increment_mention, for all mentions of the document at once. spaCy parses the mentions in batches
+    :param mention_list: mentions of the document
+    :param train_list: list of all lists in fhe file
+    :return: columns head_word, mention_type and mention_length
+    """
+    words = [m.mention for m in mention_list]
+    info = [_mention_info(w, doc) for w, doc in zip(words, nlp.pipe(words))]
+    columns = list(zip(*info)) if info else [[], [], []]
+    return {"head_word": list(columns[0]), "mention_type": list(columns[1]), "mention_length": list(columns[2])}
+
+
+def _mention_info(mention_words, doc):
+    """
+    :param mention_words: the mention as string
+    :param doc: the mention converted to tokens
+    :return: head word, mention type and mention length
+    """
     if mention_words.isdigit() or mention_words == 'its' or mention_words.lower() == 'that' or mention_words.lower() == 'this':
-        mention.head_word = ''
+        head_word = ''
     else:
         if len(list(doc.noun_chunks)) > 0:
-            mention.head_word = list(doc.noun_chunks)[0].root.head.text
+            head_word = list(doc.noun_chunks)[0].root.head.text
         else:
-            mention.head_word = ''
-    mention.mention_type = _mention_type(doc, mention_words).tolist()
-    mention.mention_length = _get_mention_length(mention_words)
+            head_word = ''
+    return head_word, _mention_type(doc, mention_words).tolist(), _get_mention_length(mention_words)
 
 
 def _get_mention_length(mention_words):
@@ -123,3 +163,24 @@ def _distance(a):
     d[(a >= 32) & (a < 64), 8] = 1
     d[a >= 64, 9] = 1
     return d.tolist()
+
+
+def _distances(a):
+    """
+    Same as _distance, for an array of distances
+    :param a: np.array
+    :return: np.array with one vector of 10 positions per distance
+    """
+    a = np.asarray(a)
+    d = np.zeros((len(a), 10))
+    d[a == 0, 0] = 1
+    d[a == 1, 1] = 1
+    d[a == 2, 2] = 1
+    d[a == 3, 3] = 1
+    d[a == 4, 4] = 1
+    d[(5 <= a) & (a < 8), 5] = 1
+    d[(8 <= a) & (a < 16), 6] = 1
+    d[(16 <= a) & (a < 32), 7] = 1
+    d[(a >= 32) & (a < 64), 8] = 1
+    d[a >= 64, 9] = 1
+    return d
@@ -2,26 +2,130 @@
 This is an example of an algorithm tat reads the generated files and predicts somehow the outputs.
 In this mock it will use exactly the supervised output as the prediction
 """
+import numpy as np
+
 from boilerplate.saver import Document
 
 
-def predict(file_name_x, file_name_y):
+class UnionFind:
+    """
+    Disjoint sets of mentions. Each mention is a (start, end) tuple. Joining two mentions joins their whole clusters,
+    so chains like A-B, C-B, C-D end up in a single cluster
+    """
+
+    def __init__(self):
+        self.parent = {}
+        self.size = {}
+
+    def add(self, mention):
+        """
+        Adds a mention as a cluster of its own, if it is not known yet
+        :param mention: (start, end)
+        """
+        if mention not in self.parent:
+            self.parent[mention] = mention
+            self.size[mention] = 1
+
+    def find(self, mention):
+        """
+        Gets the representative mention of the cluster
+        :param mention: (start, end)
+        :return: (start, end) of the representative
+        """
+        self.add(mention)
+        parent = self.parent
+        while parent[mention] != mention:
+            parent[mention] = parent[parent[mention]]  # Path halving
+            mention = parent[mention]
+        return mention
+
+    def union(self, mention1, mention2):
+        """
+        Joins the clusters of both mentions
+        :param mention1: (start, end)
+        :param mention2: (start, end)
+        """
+        root1 = self.find(mention1)
+        root2 = self.find(mention2)
+        if root1 == root2:
+            return
+        if self.size[root1] < self.size[root2]:
+            root1, root2 = root2, root1
+        self.parent[root2] = root1
+        self.size[root1] += self.size[root2]
+
+    def clusters(self):
+        """
+        :return: list of clusters, each one a sorted list of mentions. Clusters are sorted by their first mention
+        """
+        grouped = {}
+        for mention in self.parent:
+            grouped.setdefault(self.find(mention), []).append(mention)
+        return sorted(sorted(c) for c in grouped.values())
+
+
+def predict(file_name_x, file_name_y, threshold=0.5):
     """
     Builds a document based on the train files. This will not have any intelligence.
     It simply rebuild the original info
 
     :param file_name_x: file name of the X part of the information (features)
     :param file_name_y:  file name of the Y part of the information (supervised output)
+    :param threshold: pairs with output greater or equal to this value are coreferent
+    :return: a Document object
+    """
+    file_name, pair_info, labels = _read_vectors(file_name_x, file_name_y)
+    return predict_arrays(file_name, pair_info, labels, threshold)
+
+
+def predict_arrays(file_name, pair_info, predictions, threshold=0.5):
+    """
+    Builds a document from the pair info and the predictions of a model (i.e. read from packed.PackedReader)
+    :param file_name: document file name
+    :param pair_info: array (n, 4) with the start/end positions of both mentions of each pair
+    :param predictions: array (n,) or (n, 1) with labels or probabilities
+    :param threshold: pairs with prediction greater or equal to this value are coreferent
     :return: a Document object
     """
-    file_name, clusters = _create_mock(file_name_x, file_name_y)
-    return _create_document(file_name, clusters)
+    return _create_document_from_clusters(file_name, cluster_pairs(pair_info, predictions, threshold))
+
+
+def cluster_pairs(pair_info, predictions, threshold=0.5):
+    """
+    Groups the coreferent pairs into clusters of mentions
+    :param pair_info: array (n, 4) with the start/end positions of both mentions of each pair
+    :param predictions: array (n,) or (n, 1) with labels or probabilities
+    :param threshold: pairs with prediction greater or equal to this value are coreferent
+    :return: list of clusters, each one a sorted list of (start, end) tuples
+    """
+    pair_info = np.asarray(pair_info, dtype=np.int64).reshape((-1, 4))
+    predictions = np.asarray(predictions, dtype=np.float64).reshape(-1)
+    linked = pair_info[predictions >= threshold]
+
+    clusters = UnionFind()
+    for s1, e1, s2, e2 in linked.tolist():
+        clusters.union((s1, e1), (s2, e2))
+    return clusters.clusters()
+
+
+def _read_vectors(file_name_x, file_name_y):
+    """
+    Reads the pair info of the X file and the whole Y file
+    :param file_name_x: file name of the X part of the information (features)
+    :param file_name_y: file name of the Y part of the information (supervised output)
+    :return: file_name, pair_info (n, 4), labels (n,)
+    """
+    with open(file_name_x, "r") as x_file:
+        original_file = next(x_file).strip("\n").strip("\r")
+    pair_info = np.loadtxt(file_name_x, delimiter=",", skiprows=1, usecols=range(4), dtype=np.int64, ndmin=2)
+    labels = np.loadtxt(file_name_y, delimiter=",", ndmin=1)
+    return original_file, pair_info, labels
 
 
 def _create_mock(file_name_x, file_name_y):
     """
     Gets the information in the files and build a structure that contains all mention coreferences
-    based on the file name y
+    based on the file name y. The clusters are not transitive, use cluster_pairs instead
     :param file_name_x:
     :param file_name_y:
     :return: file_name, dictionary of mention -> set of mentions. Each mention here is a tuple with (start, end)
@@ -51,22 +155,29 @@ def _create_mock(file_name_x, file_name_y):
 
 def _create_document(file_name, mapping):
     """
-    Creats a Document object based on the input
+    Creates a Document object from the mapping returned by _create_mock. Each entry is one cluster
 
     :param file_name: document file name
     :param mapping: dictionary of tuples. Each entry must be mention head -> list of mentions.
             Each mention is a tuple of (start, end)
     :return: Document object
     """
+    return _create_document_from_clusters(file_name, [[head] + list(values) for head, values in mapping.items()])
+
+
+def _create_document_from_clusters(file_name, clusters):
+    """
+    Creates a Document object from a list of clusters
+
+    :param file_name: document file name
+    :param clusters: list of clusters, each one a list of (start, end) tuples
+    :return: Document object
+    """
     doc = Document(file_name)
-    for key, values in mapping.items():
-        cluster = {key[0]: key[1]}
-        for v in values:
-            if v[0] in cluster:
-                print("This should not happen: same start in the same cluster,file_name:{}, start_line:{}".format(
-                    file_name, v[0]))
-            else:
-                cluster[v[0]] = v[1]
+    for mentions in clusters:
+        cluster = {}
+        for start, end in mentions:
+            cluster.setdefault(start, []).append(end)
         doc.add_cluster(cluster)
 
     return doc
@@ -0,0 +1,82 @@
+"""
+This module writes the files of an output folder: files that only appear once they are complete (atomic_open) and the
+journal of the converted files, used to resume a run (see loader.process_dir) and to merge shards (see
+shards.merge_shards). It has no dependencies on the other modules, so all of them can use it.
+
+"""
+import contextlib
+import json
+import os
+import tempfile
+
+JOURNAL_FILE_NAME = ".process_dir.journal"
+TMP_SUFFIX = ".tmp"
+_UMASK = os.umask(0)  # Read once, to give the atomic files the same permissions as open
+os.umask(_UMASK)
+
+
+@contextlib.contextmanager
+def atomic_open(file_path, mode="w", **kwargs):
+    """
+    Opens a temporary file that replaces file_path only when the block finishes without errors. Each call uses its
+    own temporary file, so several processes can write the same file: the last one to finish wins
+    :param file_path: final file path
+    :param mode: open mode (must be a write mode)
+    :return: a file object
+    """
+    folder, name = os.path.split(file_path)
+    fd, tmp_path = tempfile.mkstemp(suffix=TMP_SUFFIX, prefix=name + ".", dir=folder or ".")
+    try:
+        with os.fdopen(fd, mode, **kwargs) as f:
+            os.chmod(tmp_path, 0o666 & ~_UMASK)
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def open_journal(path_out, truncate=False):
+    """
+    Opens the journal of completed files in the output folder
+    :param path_out: output folder
+    :param truncate: if True, previous entries are discarded. Otherwise new entries are appended
+    :return: a file object
+    """
+    os.makedirs(path_out, exist_ok=True)
+    return open(os.path.join(path_out, JOURNAL_FILE_NAME), "w" if truncate else "a", encoding="utf8")
+
+
+def write_journal(journal, entry):
+    """
+    Appends one entry to the journal. The entry is flushed to the disk before returning
+    :param journal: file object returned by open_journal
+    :param entry: dictionary describing the completed file. Must have the key 'source'
+    """
+    journal.write(json.dumps(entry) + "\n")
+    journal.flush()
+    os.fsync(journal.fileno())
+
+
+def read_journal(path_out):
+    """
+    Reads the entries of the journal in the output folder. A partially written last line (crash while writing) is
+    ignored
+    :param path_out: output folder
+    :return: dictionary source -> entry, in the order they were completed
+    """
+    entries = {}
+    journal_path = os.path.join(path_out, JOURNAL_FILE_NAME)
+    if not os.path.isfile(journal_path):
+        return entries
+    with open(journal_path, "r", encoding="utf8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            entries[entry["source"]] = entry
+    return entries
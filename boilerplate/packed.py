@@ -0,0 +1,311 @@
+"""
+This module implements a packed dataset format. Instead of two small files per document, all documents are appended
+to the same three binary files:
+
+* features.bin: one row of features per mention pair
+* labels.bin: one label per mention pair (the output vector)
+* pairs.bin: one row with the pair info (start/end positions of both mentions) per mention pair
+
+An index (index.jsonl) maps each document to the range of rows it uses, so a document can be read without scanning
+the others. The PackedWriter can be passed as the writer of loader.process_dir
+
+"""
+import json
+import os
+
+import numpy as np
+
+from boilerplate import instrumentation
+from boilerplate import outputs
+
+FEATURES_FILE_NAME = "features.bin"
+LABELS_FILE_NAME = "labels.bin"
+PAIRS_FILE_NAME = "pairs.bin"
+INDEX_FILE_NAME = "index.jsonl"
+META_FILE_NAME = "meta.json"
+
+PAIR_INFO_SIZE = 4
+LABELS_DTYPE = np.int8
+PAIRS_DTYPE = np.int32
+
+
+class PackedWriter:
+    """
+    Appends documents to a packed dataset. The data of a document is flushed to the disk before its index entry is
+    written, so a crash can only lose the document being written. Reopening the folder discards any rows that are not
+    in the index and continues from there
+    """
+
+    def __init__(self, path, features_dtype="float32"):
+        """
+        :param path: dataset folder. Created if needed
+        :param features_dtype: numpy type used to store the features
+        """
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.meta = _read_meta(path) or {"features_dtype": np.dtype(features_dtype).name, "n_features": None}
+        self.index = _read_index(path)
+        self.sources = {entry["source"] for entry in self.index}
+        self.rows = self.index[-1]["stop"] if self.index else 0
+
+        self._files = {}
+        for file_name, width, dtype in self._layout():
+            self._files[file_name] = _open_truncated(os.path.join(path, file_name),
+                                                     self.rows * width * np.dtype(dtype).itemsize)
+        _write_index(path, self.index)  # Drops a partially written last entry
+        self._index_file = open(os.path.join(path, INDEX_FILE_NAME), "a", encoding="utf8")
+
+    def save(self, file_name, v_in, v_out, doc_name):
+        """
+        Appends the vectors of one document. A document already in the index is not appended again
+        :param file_name: original file name
+        :param v_in: input vectors (pair info + features), as built by loader.trainfile_to_vectors
+        :param v_out: output vectors
+        :param doc_name: document name
+        :return: empty list. No new file is created for the document
+        """
+        if file_name in self.sources or len(v_in) == 0:
+            return []
+        v_in = np.asarray(v_in, dtype=np.float64)
+        pair_info = v_in[:, :PAIR_INFO_SIZE].astype(PAIRS_DTYPE)
+        features = v_in[:, PAIR_INFO_SIZE:].astype(self.meta["features_dtype"])
+        labels = np.asarray(v_out).reshape(-1).astype(LABELS_DTYPE)
+
+        if self.meta["n_features"] is None:
+            self.meta["n_features"] = features.shape[1]
+            _write_meta(self.path, self.meta)
+        if features.shape[1] != self.meta["n_features"]:
+            raise ValueError("Document {} has {} features, dataset has {}".format(doc_name, features.shape[1],
+                                                                                  self.meta["n_features"]))
+
+        for file_name_bin, data in [(FEATURES_FILE_NAME, features), (LABELS_FILE_NAME, labels),
+                                    (PAIRS_FILE_NAME, pair_info)]:
+            f = self._files[file_name_bin]
+            f.write(np.ascontiguousarray(data).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+            instrumentation.count("bytes_written", data.nbytes)
+
+        entry = {"name": doc_name, "source": file_name, "start": self.rows, "stop": self.rows + len(labels)}
+        self._index_file.write(json.dumps(entry) + "\n")
+        self._index_file.flush()
+        os.fsync(self._index_file.fileno())
+
+        self.index.append(entry)
+        self.sources.add(file_name)
+        self.rows = entry["stop"]
+        return []
+
+    def append(self, path):
+        """
+        Appends all documents of another packed dataset. The data files are copied without decoding the rows
+        :param path: dataset folder created by PackedWriter. Rows after its last indexed document are ignored
+        :return: list of index entries added, with the rows of this dataset
+        """
+        meta = _read_meta(path)
+        index = _read_index(path)
+        if not index:
+            return []
+        if self.rows == 0 and self.meta["n_features"] is None:
+            self.meta = dict(meta)
+            _write_meta(self.path, self.meta)
+        if (meta["n_features"], meta["features_dtype"]) != (self.meta["n_features"], self.meta["features_dtype"]):
+            raise ValueError("Dataset {} has {} features of type {}, expected {} of type {}".format(
+                path, meta["n_features"], meta["features_dtype"], self.meta["n_features"],
+                self.meta["features_dtype"]))
+        for entry in index:
+            if entry["source"] in self.sources:
+                raise ValueError("File {} of dataset {} is already in {}".format(entry["source"], path, self.path))
+
+        rows = index[-1]["stop"]
+        for file_name, width, dtype in self._layout():
+            f = self._files[file_name]
+            with open(os.path.join(path, file_name), "rb") as source:
+                _copy_bytes(source, f, rows * width * np.dtype(dtype).itemsize)
+            f.flush()
+            os.fsync(f.fileno())
+
+        added = [dict(entry, start=entry["start"] + self.rows, stop=entry["stop"] + self.rows) for entry in index]
+        for entry in added:
+            self._index_file.write(json.dumps(entry) + "\n")
+        self._index_file.flush()
+        os.fsync(self._index_file.fileno())
+
+        self.index += added
+        self.sources.update(entry["source"] for entry in added)
+        self.rows += rows
+        return added
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        self._index_file.close()
+
+    def _layout(self):
+        """
+        :return: list of (file name, values per row, dtype)
+        """
+        return [(FEATURES_FILE_NAME, self.meta["n_features"] or 0, self.meta["features_dtype"]),
+                (LABELS_FILE_NAME, 1, LABELS_DTYPE),
+                (PAIRS_FILE_NAME, PAIR_INFO_SIZE, PAIRS_DTYPE)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class PackedReader:
+    """
+    Reads a packed dataset. The arrays are memory mapped, so only the rows that are actually used are read from the
+    disk
+    """
+
+    def __init__(self, path):
+        """
+        :param path: dataset folder created by PackedWriter
+        """
+        self.path = path
+        self.meta = _read_meta(path)
+        self.index = _read_index(path)
+        self.rows = self.index[-1]["stop"] if self.index else 0
+        self.documents = {}
+        for entry in self.index:
+            self.documents[entry["name"]] = (entry["start"], entry["stop"])
+
+        n_features = self.meta["n_features"] if self.meta else 0
+        self.features = self._map(FEATURES_FILE_NAME, self.meta["features_dtype"] if self.meta else "float32",
+                                  (self.rows, n_features))
+        self.labels = self._map(LABELS_FILE_NAME, LABELS_DTYPE, (self.rows,))
+        self.pair_info = self._map(PAIRS_FILE_NAME, PAIRS_DTYPE, (self.rows, PAIR_INFO_SIZE))
+
+    def __len__(self):
+        return self.rows
+
+    def names(self):
+        """
+        :return: list of document names in the order they were written
+        """
+        return [entry["name"] for entry in self.index]
+
+    def document(self, name):
+        """
+        Gets all rows of one document
+        :param name: document name
+        :return: features, labels, pair_info
+        """
+        start, stop = self.documents[name]
+        return self.features[start:stop], self.labels[start:stop], self.pair_info[start:stop]
+
+    def _map(self, file_name, dtype, shape):
+        """
+        Memory maps one of the data files. Rows after the last indexed document are not mapped
+        :param file_name: data file
+        :param dtype: numpy type
+        :param shape: shape of the array
+        :return: read-only array
+        """
+        if self.rows == 0 or shape[-1] == 0:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(os.path.join(self.path, file_name), dtype=dtype, mode="r", shape=shape)
+
+
+def pack_vectors_dir(path_vectors, path_out, features_dtype="float32"):
+    """
+    Converts the text files created by loader.CsvWriter ([name]_in/[name]_out) into a packed dataset. Documents are
+    converted one at a time
+    :param path_vectors: folder with the text files
+    :param path_out: packed dataset folder
+    :param features_dtype: numpy type used to store the features
+    """
+    with PackedWriter(path_out, features_dtype) as writer:
+        for file_name in sorted(os.listdir(path_vectors)):
+            if not file_name.endswith("_in"):
+                continue
+            file_in = os.path.join(path_vectors, file_name)
+            with open(file_in, "r") as f:
+                doc_name = next(f).strip("\n").strip("\r")
+            v_in = np.loadtxt(file_in, delimiter=",", skiprows=1, ndmin=2)
+            v_out = np.loadtxt(file_in[:-3] + "_out", delimiter=",", ndmin=2)
+            writer.save(file_name[:-3], v_in, v_out, doc_name)
+
+
+def _copy_bytes(source, destination, size, chunk_size=1 << 20):
+    """
+    Copies the first bytes of a file
+    :param source: file object to read
+    :param destination: file object to write
+    :param size: number of bytes. Raises ValueError if the source is shorter
+    :param chunk_size: bytes read at a time
+    """
+    while size > 0:
+        data = source.read(min(size, chunk_size))
+        if not data:
+            raise ValueError("{} ended before the last indexed row".format(source.name))
+        destination.write(data)
+        instrumentation.count("bytes_written", len(data))
+        size -= len(data)
+
+
+def _open_truncated(file_path, size):
+    """
+    Opens a data file for appending, discarding anything after size bytes
+    :param file_path: file to be opened. Created if needed
+    :param size: number of valid bytes
+    :return: a file object
+    """
+    f = open(file_path, "ab")
+    f.truncate(size)
+    return f
+
+
+def _read_index(path):
+    """
+    Reads the index of the dataset. A partially written last line (crash while writing) is ignored
+    :param path: dataset folder
+    :return: list of entries with the keys name, source, start and stop
+    """
+    index = []
+    index_path = os.path.join(path, INDEX_FILE_NAME)
+    if not os.path.isfile(index_path):
+        return index
+    with open(index_path, "r", encoding="utf8") as f:
+        for line in f:
+            try:
+                index.append(json.loads(line))
+            except ValueError:
+                break
+    return index
+
+
+def _write_index(path, index):
+    """
+    Rewrites the whole index
+    :param path: dataset folder
+    :param index: list of entries
+    """
+    with outputs.atomic_open(os.path.join(path, INDEX_FILE_NAME), encoding="utf8") as f:
+        for entry in index:
+            f.write(json.dumps(entry) + "\n")
+
+
+def _read_meta(path):
+    """
+    :param path: dataset folder
+    :return: dictionary with the metadata or None if the dataset is new
+    """
+    meta_path = os.path.join(path, META_FILE_NAME)
+    if not os.path.isfile(meta_path):
+        return None
+    with open(meta_path, "r", encoding="utf8") as f:
+        return json.load(f)
+
+
+def _write_meta(path, meta):
+    """
+    :param path: dataset folder
+    :param meta: dictionary with the metadata
+    """
+    with outputs.atomic_open(os.path.join(path, META_FILE_NAME), encoding="utf8") as f:
+        json.dump(meta, f)
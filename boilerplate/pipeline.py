@@ -0,0 +1,219 @@
+"""
+This module runs loader.process_dir as a pipeline. The stages run at the same time, in different threads:
+
+* read: one thread reads the files, in the order of the source (see sources module)
+* work: a pool of threads builds the vectors (mentions, pairs and features)
+* write: one thread saves the vectors, the templates and the journal
+
+The stages are connected by bounded queues. When a stage is slower than the previous one, the queue fills up and the
+previous stage waits (backpressure), so the memory used does not depend on the number of files.
+The time each stage spent working and waiting is returned, to show where the bottleneck is: the stage with the
+highest utilization is the one limiting the pipeline.
+
+The work stage only runs in parallel while the callback releases the GIL (numpy, spaCy and disk access do), so the
+gain comes mostly from overlapping the reads and writes with the feature extraction.
+"""
+import os
+import queue
+import threading
+import time
+
+from boilerplate import instrumentation
+from boilerplate import loader
+from boilerplate import sources
+
+STAGES = ("read", "work", "write")
+_DONE = object()
+_POLL_SECONDS = 0.1
+
+
+class StageStats:
+    """
+    Time spent by the threads of one stage. Can be updated by several threads
+    """
+
+    def __init__(self, threads):
+        self.threads = threads
+        self.items = 0
+        self.busy_seconds = 0.
+        self.starved_seconds = 0.  # Waiting for the previous stage
+        self.blocked_seconds = 0.  # Waiting for space in the next queue
+        self._lock = threading.Lock()
+
+    def add(self, busy=0., starved=0., blocked=0., items=0):
+        with self._lock:
+            self.busy_seconds += busy
+            self.starved_seconds += starved
+            self.blocked_seconds += blocked
+            self.items += items
+
+    def as_dict(self, wall_seconds):
+        """
+        :param wall_seconds: total time of the pipeline
+        :return: dictionary with the statistics. utilization is the fraction of the time the threads were working
+        """
+        capacity = wall_seconds * self.threads
+        return {"threads": self.threads, "items": self.items, "busy_seconds": self.busy_seconds,
+                "starved_seconds": self.starved_seconds, "blocked_seconds": self.blocked_seconds,
+                "utilization": self.busy_seconds / capacity if capacity else 0.}
+
+
+def process_dir(path_in, path_out, callback, workers=2, queue_size=4, resume=False, shard_index=0, num_shards=1,
+                writer=None, save_templates=False):
+    """
+    Same as loader.process_dir, running the stages in parallel. See process_source
+    :param path_in: root folder to be searched
+    :return: dictionary stage name (see STAGES) -> statistics (see StageStats.as_dict), plus wall_seconds
+    """
+    return process_source(sources.DirectorySource(path_in), path_out, callback, workers, queue_size, resume,
+                          shard_index, num_shards, writer, save_templates)
+
+
+def process_source(source, path_out, callback, workers=2, queue_size=4, resume=False, shard_index=0, num_shards=1,
+                   writer=None, save_templates=False):
+    """
+    Same as loader.process_source, running the stages in parallel. Documents are written in the order they are
+    completed, which may differ from the order of the files
+    :param source: sources.DirectorySource, sources.TarSource or any object with the same methods
+    :param path_out: output folder
+    :param callback: method that receives the list of lines of a file and returns [input_vector, output_vector,
+            document_name] (see loader.lines_to_vectors)
+    :param workers: number of threads of the work stage
+    :param queue_size: max number of files waiting between two stages
+    :param resume: if True, files already in the journal of path_out are skipped
+    :param shard_index: index of the shard to be processed by this call
+    :param num_shards: number of shards the files are split into
+    :param writer: object used to save the vectors. Default is loader.CsvWriter(path_out)
+    :param save_templates: if True, the output template of each file is also saved
+    :return: dictionary stage name (see STAGES) -> statistics (see StageStats.as_dict), plus wall_seconds
+    """
+    os.makedirs(path_out, exist_ok=True)
+    writer = writer if writer is not None else loader.CsvWriter(path_out)
+    files, completed, journal = loader._start_run(source.files(), path_out, resume, shard_index, num_shards)
+    names = set(f[0] for f in files if f[0] not in completed)
+
+    read_queue = queue.Queue(queue_size)
+    write_queue = queue.Queue(queue_size)
+    stop = threading.Event()
+    failures = []
+    stats = {"read": StageStats(1), "work": StageStats(workers), "write": StageStats(1)}
+
+    def fail(error):
+        failures.append(error)
+        stop.set()
+
+    def read():
+        try:
+            for name, locator, read_lines in source.entries(names):
+                if stop.is_set():
+                    break
+                start = time.perf_counter()
+                record = instrumentation.start(name)
+                with instrumentation.attach(record), instrumentation.stage("read"):
+                    train_list = read_lines()
+                busy = time.perf_counter() - start
+                blocked = _put(read_queue, (name, locator, train_list, record), stop)
+                stats["read"].add(busy=busy, blocked=blocked, items=1)
+        except BaseException as e:
+            fail(e)
+        finally:
+            for _ in range(workers):
+                _put(read_queue, _DONE, stop)
+
+    def work():
+        try:
+            while True:
+                item, starved = _get(read_queue, stop)
+                if item is _DONE:
+                    break
+                name, locator, train_list, record = item
+                start = time.perf_counter()
+                with instrumentation.attach(record):
+                    result = callback(train_list)
+                busy = time.perf_counter() - start
+                blocked = _put(write_queue, (name, locator, train_list, record, result), stop)
+                stats["work"].add(busy=busy, starved=starved, blocked=blocked, items=1)
+        except BaseException as e:
+            fail(e)
+        finally:
+            _put(write_queue, _DONE, stop)
+
+    def write(pb):
+        running = workers
+        try:
+            while running:
+                item, starved = _get(write_queue, stop)
+                if item is _DONE:
+                    running -= 1
+                    continue
+                name, locator, train_list, record, result = item
+                start = time.perf_counter()
+                with instrumentation.attach(record):
+                    loader._write_result(writer, journal, path_out, name, locator, result, save_templates,
+                                         train_list)
+                instrumentation.finish(record)
+                stats["write"].add(busy=time.perf_counter() - start, starved=starved, items=1)
+                pb.update(1)
+        except BaseException as e:
+            fail(e)
+
+    start = time.perf_counter()
+    try:
+        with instrumentation.progress(None, desc="files", total=len(names)) as pb:
+            threads = ([threading.Thread(target=read, name="pipeline-read")] +
+                       [threading.Thread(target=work, name="pipeline-work-{}".format(i)) for i in range(workers)] +
+                       [threading.Thread(target=write, args=(pb,), name="pipeline-write")])
+            for thread in threads:
+                thread.daemon = True
+                thread.start()
+            for thread in threads:
+                thread.join()
+    finally:
+        if journal:
+            journal.close()
+    if failures:
+        raise failures[0]
+
+    wall_seconds = time.perf_counter() - start
+    result = {name: stats[name].as_dict(wall_seconds) for name in STAGES}
+    result["wall_seconds"] = wall_seconds
+    return result
+
+
+def _put(q, item, stop):
+    """
+    Puts the item in the queue, waiting for space. Gives up if the pipeline is stopped
+    :return: seconds waiting
+    """
+    start = time.perf_counter()
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=_POLL_SECONDS)
+            break
+        except queue.Full:
+            continue
+    return time.perf_counter() - start
+
+
+def _get(q, stop):
+    """
+    Gets the next item of the queue. Returns _DONE if the pipeline is stopped
+    :return: item, seconds waiting
+    """
+    start = time.perf_counter()
+    while not stop.is_set():
+        try:
+            return q.get(timeout=_POLL_SECONDS), time.perf_counter() - start
+        except queue.Empty:
+            continue
+    return _DONE, time.perf_counter() - start
+
+
+def utilization_report(stats):
+    """
+    :param stats: dictionary returned by process_dir
+    :return: one line of text per stage
+    """
+    return ["{:6} threads {:3} items {:6} busy {:8.2f}s starved {:8.2f}s blocked {:8.2f}s utilization {:.0%}".format(
+        name, s["threads"], s["items"], s["busy_seconds"], s["starved_seconds"], s["blocked_seconds"],
+        s["utilization"]) for name, s in ((n, stats[n]) for n in STAGES)]
@@ -0,0 +1,205 @@
+"""
+This module implements the mention ranking layout. The default layout saves one row per mention pair with the features
+of both mentions, so the features of a mention are repeated for every pair it is part of. Here each document has:
+
+* mentions: one row of features per mention
+* mention_info: start/end position of each mention
+* offsets/antecedents: candidate antecedents of each mention in CSR format. The antecedents of mention i are
+  antecedents[offsets[i]:offsets[i + 1]] (indexes of the mentions array)
+* pair_features: one row per candidate antecedent, with the features that depend on both mentions
+* labels: one label per candidate antecedent
+
+Each document is saved as [original_name]_ranking.npz. The RankingWriter can be passed as the writer of
+loader.process_dir, with trainfile_to_ranking as the callback (see transform_conll_to_ranking)
+
+"""
+import functools
+import os
+
+import numpy as np
+
+from boilerplate import instrumentation
+from boilerplate import loader
+from boilerplate import mentions
+from boilerplate import outputs
+from boilerplate import sources
+
+FILE_SUFFIX = "_ranking.npz"
+LABELS_DTYPE = np.int8
+INDEX_DTYPE = np.int32
+
+
+class RankingVectors:
+    """
+    Vectors of one document in the mention ranking layout
+    """
+
+    def __init__(self, mentions, mention_info, offsets, antecedents, pair_features, labels):
+        self.mentions = mentions
+        self.mention_info = mention_info
+        self.offsets = offsets
+        self.antecedents = antecedents
+        self.pair_features = pair_features
+        self.labels = labels
+
+    def __len__(self):
+        """
+        :return: number of pairs (candidate antecedents)
+        """
+        return len(self.antecedents)
+
+    def candidates(self, i):
+        """
+        :param i: mention index
+        :return: antecedent indexes, pair features and labels of the mention
+        """
+        start, stop = self.offsets[i], self.offsets[i + 1]
+        return self.antecedents[start:stop], self.pair_features[start:stop], self.labels[start:stop]
+
+    def pair_indexes(self):
+        """
+        :return: arrays i, j with the mention and antecedent of each pair
+        """
+        i = np.repeat(np.arange(len(self.mentions)), np.diff(self.offsets))
+        return i, self.antecedents
+
+    def to_pair_rows(self):
+        """
+        Rebuilds one row per pair, for algorithms that need the flat layout
+        :return: np.array with the mention features, the antecedent features and the pair features of each pair
+        """
+        i, j = self.pair_indexes()
+        return np.hstack([self.mentions[i], self.mentions[j], self.pair_features])
+
+
+def build(mention_list, pairs, mention_vectors, pair_vectors, labels):
+    """
+    Builds the ranking layout of one document
+    :param mention_list: all mentions of the document, as returned by mentions.build_mention_list
+    :param pairs: mention pairs. Both mentions of each pair must be in mention_list
+    :param mention_vectors: one line of features per mention
+    :param pair_vectors: one line of features per pair
+    :param labels: one label per pair
+    :return: RankingVectors. Candidates of each mention keep the order of the pairs
+    """
+    position = {id(m): n for n, m in enumerate(mention_list)}
+    i = np.array([position[id(p.mention1)] for p in pairs], dtype=INDEX_DTYPE)
+    j = np.array([position[id(p.mention2)] for p in pairs], dtype=INDEX_DTYPE)
+    order = np.argsort(i, kind="stable")
+
+    offsets = np.zeros(len(mention_list) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(i, minlength=len(mention_list)), out=offsets[1:])
+    mention_info = np.array([[m.start_pos, m.end_pos] for m in mention_list], dtype=INDEX_DTYPE)
+    pair_vectors = np.asarray(pair_vectors).reshape((len(pairs), -1))
+    return RankingVectors(np.asarray(mention_vectors).reshape((len(mention_list), -1)),
+                          mention_info.reshape((len(mention_list), 2)), offsets, j[order], pair_vectors[order],
+                          np.asarray(labels).reshape(-1)[order].astype(LABELS_DTYPE))
+
+
+def trainfile_to_ranking(path, increment_mention, increment_mention_pair, make_ranking_vectors, sampler=None):
+    """
+    Same as loader.trainfile_to_vectors, for the ranking layout. Can be used as the callback of loader.process_dir
+    :param path: file path to be used
+    :param increment_mention: method to add information to the mention
+    :param increment_mention_pair: method to add information to the mention pair
+    :param make_ranking_vectors: method to build the vectors, see features.make_ranking_vectors
+    :param sampler: chooses the mention pairs, see sampling.Sampler
+    :return: [RankingVectors, labels, document_name]
+    """
+    with instrumentation.stage("read"):
+        train_list = loader.train_file_to_list(path)
+    return lines_to_ranking(train_list, increment_mention, increment_mention_pair, make_ranking_vectors, sampler)
+
+
+def lines_to_ranking(train_list, increment_mention, increment_mention_pair, make_ranking_vectors, sampler=None):
+    """
+    Same as trainfile_to_ranking, for a file already read. Can be used as the callback of loader.process_source
+    :param train_list: list of lines of the file
+    :param increment_mention: method to add information to the mention
+    :param increment_mention_pair: method to add information to the mention pair
+    :param make_ranking_vectors: method to build the vectors, see features.make_ranking_vectors
+    :param sampler: chooses the mention pairs, see sampling.Sampler
+    :return: [RankingVectors, labels, document_name]
+    """
+    with instrumentation.stage("mentions"):
+        mention_list = mentions.build_mention_list(train_list, increment_mention,
+                                                   attributes=getattr(make_ranking_vectors, "mention_attributes", None))
+    instrumentation.count("mentions", len(mention_list))
+    pairs = mentions.pair_mentions(mention_list, train_list, increment_mention_pair, sampler=sampler)
+    with instrumentation.stage("features"):
+        mention_vectors, pair_vectors, labels = make_ranking_vectors(mention_list, pairs, train_list=train_list)
+        vectors = build(mention_list, pairs, mention_vectors, pair_vectors, labels)
+    return vectors, vectors.labels, loader.get_document_name(train_list)
+
+
+class RankingWriter:
+    """
+    Saves each document as [original_name]_ranking.npz. Has the same save method as loader.CsvWriter
+    """
+
+    def __init__(self, path_out, features_dtype="float32"):
+        """
+        :param path_out: output folder
+        :param features_dtype: numpy type used to store the mention and pair features
+        """
+        self.path_out = path_out
+        self.features_dtype = features_dtype
+
+    def save(self, file_name, v_in, v_out, doc_name):
+        """
+        Saves the vectors of one document
+        :param file_name: original file name
+        :param v_in: RankingVectors
+        :param v_out: labels (already in v_in)
+        :param doc_name: document name
+        :return: list with the file created in the output folder
+        """
+        saved = file_name + FILE_SUFFIX
+        file_path = os.path.join(self.path_out, saved)
+        with outputs.atomic_open(file_path, "wb") as f:
+            np.savez(f, doc_name=np.array(doc_name),
+                     mentions=v_in.mentions.astype(self.features_dtype),
+                     mention_info=v_in.mention_info,
+                     offsets=v_in.offsets,
+                     antecedents=v_in.antecedents,
+                     pair_features=v_in.pair_features.astype(self.features_dtype),
+                     labels=v_in.labels)
+        instrumentation.count("bytes_written", os.path.getsize(file_path))
+        return [saved]
+
+
+def load(file_path):
+    """
+    Reads a file saved by RankingWriter
+    :param file_path: [original_name]_ranking.npz file
+    :return: RankingVectors, document name
+    """
+    with np.load(file_path) as data:
+        vectors = RankingVectors(data["mentions"], data["mention_info"], data["offsets"], data["antecedents"],
+                                 data["pair_features"], data["labels"])
+        return vectors, str(data["doc_name"])
+
+
+def transform_conll_to_ranking(path_in, path_out, increment_mention, increment_mention_pair, make_ranking_vectors,
+                               resume=False, shard_index=0, num_shards=1, save_templates=False, sampler=None,
+                               features_dtype="float32"):
+    """
+    Same as loader.transform_conll_to_vectors, saving the ranking layout
+    :param path_in: root folder to be searched. Files can be in multiple sub-folders. Can also be a tar archive
+    :param path_out: output folder
+    :param increment_mention: method to add information to the mention
+    :param increment_mention_pair: method to add information to the mention pair
+    :param make_ranking_vectors: method to build the vectors, see features.make_ranking_vectors
+    :param resume: if True, files completed by a previous (interrupted) run are skipped
+    :param shard_index: index of the shard converted by this call, from 0 to num_shards - 1
+    :param num_shards: number of machines splitting the conversion
+    :param save_templates: if True, the output template of each file is also saved
+    :param sampler: chooses the mention pairs, see sampling.Sampler
+    :param features_dtype: numpy type used to store the features
+    """
+    callback = functools.partial(lines_to_ranking, increment_mention=increment_mention,
+                                 increment_mention_pair=increment_mention_pair,
+                                 make_ranking_vectors=make_ranking_vectors, sampler=sampler)
+    loader.process_source(sources.open_source(path_in), path_out, callback,
+                          resume=resume, shard_index=shard_index, num_shards=num_shards,
+                          writer=RankingWriter(path_out, features_dtype), save_templates=save_templates)
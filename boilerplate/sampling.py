@@ -0,0 +1,272 @@
+"""
+This module chooses which mention pairs are generated, replacing the use_pair check of mentions.get_mention_pairs.
+The choice is made on arrays of mention indexes, so the pairs that are not used are never created, featurized or
+saved.
+
+A Sampler combines strategies. Each strategy receives the candidate pairs (arrays i, j, where mention j is a possible
+antecedent of mention i) and returns the ones that should be kept. The strategies provided are:
+* ClosestK: only the k closest antecedents of each mention
+* SentenceWindow: only antecedents up to n sentences before the mention
+* PronounWindow: same as SentenceWindow, but only for pronouns
+* RandomNegatives: random down-sampling of the non coreferent pairs
+* CoarsePruning: only the k antecedents of each mention that are the most similar in a cheap embedding of the
+  mentions, so the expensive features are computed for O(n * k) pairs instead of O(n^2)
+
+Usage:
+    sampler = Sampler([SentenceWindow(5), RandomNegatives(3, seed=0)], keep_positives=True)
+    pairs = mentions.get_mention_pairs(train_list, sampler=sampler)
+"""
+import numpy as np
+
+from boilerplate import features
+
+PRONOUNS = {"i", "me", "my", "mine", "myself", "you", "your", "yours", "yourself", "he", "him", "his", "himself",
+            "she", "her", "hers", "herself", "it", "its", "itself", "we", "us", "our", "ours", "ourselves", "they",
+            "them", "their", "theirs", "themselves"}
+
+
+class MentionArrays:
+    """
+    Columns with the information about the mentions of a document that the strategies need
+    """
+
+    def __init__(self, mention_list, train_list):
+        """
+        :param mention_list: list returned by mentions.build_mention_list
+        :param train_list: list of lines in the document
+        """
+        blank = np.fromiter((line == "\n" for line in train_list), dtype=bool, count=len(train_list))
+        sentence_of_line = np.cumsum(blank)
+        self.start = np.array([m.start_pos for m in mention_list], dtype=np.int64)
+        self.end = np.array([m.end_pos for m in mention_list], dtype=np.int64)
+        self.sentence = sentence_of_line[self.start - 1] if len(mention_list) else np.zeros(0, dtype=np.int64)
+        _, self.doc = np.unique([m.doc_id for m in mention_list], return_inverse=True)
+        _, self.cluster = np.unique([m.mention_id for m in mention_list], return_inverse=True)
+        self.is_pronoun = np.array([_is_pronoun(m) for m in mention_list], dtype=bool)
+        self.mentions = mention_list
+
+    def __len__(self):
+        return len(self.start)
+
+
+class Sampler:
+    """
+    Applies the strategies in order. Can be passed as the sampler of mentions.get_mention_pairs
+    """
+
+    def __init__(self, strategies, keep_positives=False):
+        """
+        :param strategies: list of strategies
+        :param keep_positives: if True, coreferent pairs are always kept, even if a strategy removes them (this is
+                what the default check_usable_pairs does)
+        """
+        self.strategies = strategies
+        self.keep_positives = keep_positives
+
+    def __call__(self, mention_list, train_list):
+        """
+        :param mention_list: list returned by mentions.build_mention_list
+        :param train_list: list of lines in the document
+        :return: arrays i, j of the pairs (mention_list[i], mention_list[j]), sorted by i and then j
+        """
+        arrays = MentionArrays(mention_list, train_list)
+        generators = [s for s in self.strategies if hasattr(s, "candidates")]
+        i, j = generators[0].candidates(arrays) if generators else all_candidates(arrays)
+        for strategy in self.strategies:
+            i, j = strategy(arrays, i, j)
+
+        if self.keep_positives:
+            pi, pj = positive_pairs(arrays)
+            i, j = np.concatenate([i, pi]), np.concatenate([j, pj])
+            i, j = _unique_pairs(i, j, len(arrays))
+        order = np.lexsort((j, i))
+        return i[order], j[order]
+
+
+class ClosestK:
+    """
+    Keeps only the k closest antecedents of each mention (mentions are sorted by position)
+    """
+
+    def __init__(self, k):
+        self.k = k
+
+    def candidates(self, arrays):
+        """
+        Generates only the candidate pairs within the distance, without building all pairs
+        """
+        n = len(arrays)
+        counts = np.minimum(np.arange(n), self.k)  # Mention m has min(m, k) antecedents
+        i = np.repeat(np.arange(n), counts)
+        distance = np.arange(len(i)) - np.repeat(np.cumsum(counts) - counts, counts) + 1
+        j = i - distance
+        keep = arrays.doc[i] == arrays.doc[j]
+        return i[keep], j[keep]
+
+    def __call__(self, arrays, i, j):
+        keep = (i - j) <= self.k
+        return i[keep], j[keep]
+
+
+class SentenceWindow:
+    """
+    Keeps only antecedents at most n sentences before the mention
+    """
+
+    def __init__(self, n):
+        self.n = n
+
+    def __call__(self, arrays, i, j):
+        keep = (arrays.sentence[i] - arrays.sentence[j]) <= self.n
+        return i[keep], j[keep]
+
+
+class PronounWindow:
+    """
+    When the mention is a pronoun, keeps only antecedents at most n sentences before it. Other mentions are not
+    changed
+    """
+
+    def __init__(self, n):
+        self.n = n
+
+    def __call__(self, arrays, i, j):
+        keep = ~arrays.is_pronoun[i] | ((arrays.sentence[i] - arrays.sentence[j]) <= self.n)
+        return i[keep], j[keep]
+
+
+class RandomNegatives:
+    """
+    Keeps all coreferent pairs and a random sample of the others, with ratio negatives for each positive
+    """
+
+    def __init__(self, ratio, seed=None, min_negatives=1):
+        """
+        :param ratio: number of negative pairs kept for each positive pair
+        :param seed: seed of the random generator. The same seed keeps the same pairs of the same document
+        :param min_negatives: negative pairs kept when the document has no positive pairs
+        """
+        self.ratio = ratio
+        self.seed = seed
+        self.min_negatives = min_negatives
+
+    def __call__(self, arrays, i, j):
+        positive = arrays.cluster[i] == arrays.cluster[j]
+        negatives = np.flatnonzero(~positive)
+        n_keep = max(int(np.ceil(self.ratio * positive.sum())), self.min_negatives)
+        if n_keep < len(negatives):
+            random = np.random.default_rng(self.seed)
+            negatives = random.choice(negatives, n_keep, replace=False)
+        keep = np.flatnonzero(positive)
+        keep = np.sort(np.concatenate([keep, negatives]))
+        return i[keep], j[keep]
+
+
+class CoarsePruning:
+    """
+    Keeps only the k antecedents of each mention with the highest coarse score. Each mention is represented by the
+    average vector of its words plus the vector of its head word (last word if there is no head_word attribute) and
+    the score of all pairs is the cosine similarity, computed with a single matrix product.
+    Words are normalized as in features.FeatureMapper (see features.normalize_word)
+    """
+
+    def __init__(self, word2vec, k, keep_gold=True):
+        """
+        :param word2vec: function to map a word to a vector, as the word2vec of features.FeatureMapper. Words not
+                found raise KeyError
+        :param k: number of antecedents kept for each mention
+        :param keep_gold: if True, coreferent pairs are kept even if they are not among the k best, as
+                RandomNegatives does (training data). Use False to prune as a model would, without the gold clusters
+        """
+        self.word2vec = word2vec
+        self.k = k
+        self.keep_gold = keep_gold
+
+    def vectors(self, mention_list):
+        """
+        :param mention_list: mentions of the document
+        :return: np.array with one normalized coarse vector per mention
+        """
+        cache = {}
+        rows = [self._average(m.words, cache) + self._average([getattr(m, "head_word", None) or m.last_word], cache)
+                for m in mention_list]
+        size = max((len(r) for r in rows if r.ndim), default=0)
+        matrix = np.array([r if r.ndim else np.zeros(size) for r in rows]).reshape((len(mention_list), size))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms > 0, norms, 1)
+
+    def _average(self, words, cache):
+        """
+        :return: average vector of the words found, or a scalar 0 if none was found
+        """
+        found = [v for v in (self._vector(w, cache) for w in words) if v is not None]
+        return np.mean(found, axis=0) if found else np.float64(0)
+
+    def _vector(self, word, cache):
+        word = features.normalize_word(word)
+        if word not in cache:
+            try:
+                cache[word] = np.asarray(self.word2vec(word), dtype=np.float64).reshape(-1)
+            except KeyError:
+                cache[word] = None
+        return cache[word]
+
+    def __call__(self, arrays, i, j):
+        vectors = self.vectors(arrays.mentions)
+        score = (vectors @ vectors.T)[i, j]
+        order = np.lexsort((-score, i))  # Best antecedents first, for each mention
+        group_start = np.searchsorted(i[order], i[order], side="left")
+        keep = np.zeros(len(i), dtype=bool)
+        keep[order[np.arange(len(order)) - group_start < self.k]] = True
+        if self.keep_gold:
+            keep |= arrays.cluster[i] == arrays.cluster[j]
+        keep = np.flatnonzero(keep)
+        return i[keep], j[keep]
+
+
+def all_candidates(arrays):
+    """
+    :param arrays: MentionArrays
+    :return: arrays i, j with all pairs j < i of the same document
+    """
+    i, j = np.tril_indices(len(arrays), -1)
+    keep = arrays.doc[i] == arrays.doc[j]
+    return i[keep], j[keep]
+
+
+def positive_pairs(arrays):
+    """
+    :param arrays: MentionArrays
+    :return: arrays i, j with all coreferent pairs j < i
+    """
+    i, j = [], []
+    order = np.argsort(arrays.cluster, kind="stable")
+    bounds = np.flatnonzero(np.diff(arrays.cluster[order])) + 1
+    for members in np.split(order, bounds):
+        mi, mj = np.tril_indices(len(members), -1)
+        i.append(members[mi])
+        j.append(members[mj])
+    if not i:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    i, j = np.concatenate(i), np.concatenate(j)
+    swap = i < j
+    i[swap], j[swap] = j[swap], i[swap]
+    return i, j
+
+
+def _unique_pairs(i, j, n):
+    """
+    Removes repeated pairs
+    """
+    codes = np.unique(i.astype(np.int64) * max(n, 1) + j)
+    return codes // max(n, 1), codes % max(n, 1)
+
+
+def _is_pronoun(mention):
+    """
+    Uses the mention_type (see mentions_custom.increment_mention) if available, otherwise a list of pronouns
+    """
+    mention_type = getattr(mention, "mention_type", None)
+    if mention_type is not None:
+        return mention_type[0] == 1
+    return mention.mention.lower() in PRONOUNS
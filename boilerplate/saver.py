@@ -1,9 +1,22 @@
 """
 
 This module is responsible for generating the output files for a given prediction. It will
-use the original files to keep the format compatible
+use the original files to keep the format compatible. The relevant parts of an original file can also be extracted once
+into a template (see build_template), so outputs can be saved without reading the original file again
 """
+import collections
+import concurrent.futures
+import json
 import os
+import re
+
+from boilerplate import instrumentation
+from boilerplate import outputs
+
+# Buffer used by the output files. Large enough to write each document with few system calls
+OUTPUT_BUFFER_SIZE = 1 << 20
+# Suffix of the template files saved next to the vectors (see build_template)
+TEMPLATE_SUFFIX = "_template"
 
 
 class LineInfo:
@@ -68,7 +81,7 @@ class Document:
     generate to allow the framework to save it in the proper CoNLL format.
     """
 
-    def __init__(self, name, first_line_idx):
+    def __init__(self, name, first_line_idx=0):
         self.name = name
         # Each cluster is a dictionary that maps start -> end for each mention in that cluster. Start/end are the
         # original document line number
@@ -77,8 +90,8 @@ class Document:
         # Line number => line info
         self.line_info = {}
         self.first_line_idx = first_line_idx
-        self.next_line = 0
-        self.next_line_generator = self._get_next_line()
+        # Line number => rendered operations. Built by compile once all clusters are added
+        self.annotations = None
 
     def add_cluster(self, cluster):
         """
@@ -87,6 +100,7 @@ class Document:
         """
         self.clusters.append(cluster)
         cluster_id = len(self.clusters)
+        self.annotations = None  # Must be compiled again
 
         # Adding one operation for key and another for value
         for key, values in cluster.items():
@@ -107,32 +121,33 @@ class Document:
 
         self.line_info[line_number].add_operation(cluster_id, operation)
 
+    def compile(self):
+        """
+        Renders the operations of every line once. After this, getting the operations of any line is a simple lookup,
+        in any order and from any thread. Called automatically on the first lookup after a cluster is added
+        :return: list where position i has the operations of line i ("-" if there are none)
+        """
+        annotations = ["-"] * (max(self.line_info) + 1 if self.line_info else 0)
+        for line_number, info in self.line_info.items():
+            annotations[line_number] = str(info)
+        self.annotations = annotations
+        return annotations
+
     def _get_line_operations(self, line_number):
         """
         Gets the operation for a given line number
         :param line_number:
         :return:
         """
-        if self.next_line < line_number:
-            try:
-                self.next_line = next(self.next_line_generator)
-            except StopIteration:
-                # If this exception occurs, it means that there are no more
-                # lines to be generated. All following lines must be marked with -
-                self.next_line += 1000
+        annotations = self.annotations
+        if annotations is None:
+            annotations = self.compile()
 
-        if line_number == self.next_line:
-            return str(self.line_info[line_number])
+        if 0 <= line_number < len(annotations):
+            return annotations[line_number]
 
         return "-"
 
-    def _get_next_line(self):
-        """
-        Generator for line numbers. Iterates over added lines information
-        """
-        for line_number in sorted(self.line_info):
-            yield line_number
-
     def get_line(self, counter):
         return self.name + " " + self._get_line_operations(counter - self.first_line_idx)
 
@@ -145,45 +160,238 @@ def save_document(original_path, output_path, document):
     :param output_path:
     :param document: a Document object
     """
-    with _open_original_file(original_path, document.name) as o:
+    with instrumentation.document(document.name), instrumentation.stage("save"):
+        text = render_document(original_path, document)
         with _open_destination_file(output_path, document.name) as d:
-            counter = 0
-            for line in o:
-                counter += 1
+            d.write(text)
+        instrumentation.count("bytes_written", len(text))
+
+
+def render_document(original_path, document):
+    """
+    Builds the content of the output file of the document. It reads the original file to keep the common lines.
+    Lines are numbered from the first_line_idx of the document (see Document.get_line), as in save_documents and
+    render_from_template
 
-                if _write_as_is(line):  # Some lines are identical in both documents
-                    d.write(line)
-                else:  # Others are simply the name and the open/close mention (or a dash)
-                    d.write(document.name + " " + document._get_line_operations(counter) + "\n")
+    :param original_path: root path (generally the 'annotation' folder)
+    :param document: a Document object
+    :return: string with the whole output file
+    """
+    with _open_original_file(original_path, document.name) as o:
+        lines = []
+        counter = 0
+        for line in o:
+            counter += 1
+
+            if _write_as_is(line):  # Some lines are identical in both documents
+                lines.append(line)
+            else:  # Others are simply the name and the open/close mention (or a dash)
+                lines.append(document.get_line(counter) + "\n")
+        return "".join(lines)
+
+
+def save_document_batch(original_path, output_path, documents, output_file=None, max_workers=None,
+                        use_processes=False):
+    """
+    Saves many documents, rendering them in parallel. The outputs are written in the same order of the documents,
+    while the next ones are still being rendered
+
+    :param original_path: root path (generally the 'annotation' folder)
+    :param output_path: root of the output files
+    :param documents: iterable of Document objects
+    :param output_file: if informed, all documents are written to this single file (relative to output_path).
+            Otherwise each document is saved as in save_document
+    :param max_workers: size of the pool. Default is the number of cores
+    :param use_processes: if True uses a process pool, otherwise a thread pool
+    :return: number of documents saved
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    executor_class = concurrent.futures.ProcessPoolExecutor if use_processes else concurrent.futures.ThreadPoolExecutor
+    single_file = None
+    if output_file:
+        single_file = open(os.path.join(output_path, output_file), "w", buffering=OUTPUT_BUFFER_SIZE)
+
+    saved = 0
+    try:
+        with executor_class(max_workers=max_workers) as executor:
+            tasks = ((original_path, d) for d in documents)
+            for document, text in _ordered_map(executor, _render_task, tasks, 2 * max_workers):
+                if single_file:
+                    single_file.write(text)
+                else:
+                    with _open_destination_file(output_path, document.name) as d:
+                        d.write(text)
+                saved += 1
+    finally:
+        if single_file:
+            single_file.close()
+    return saved
+
+
+def _render_task(task):
+    """
+    Renders one document. Defined at module level so it can be sent to a process pool
+    :param task: (original_path, document)
+    :return: (document, rendered text)
+    """
+    original_path, document = task
+    return document, render_document(original_path, document)
 
 
-def save_documents(in_file, out_file, docs):
+def _ordered_map(executor, function, items, window):
+    """
+    Same as executor.map, but only keeps window items running at a time, so an endless or huge iterable does not get
+    fully submitted (and rendered in memory) before the first result is consumed
+    :param executor: concurrent.futures executor
+    :param function: function applied to each item
+    :param items: iterable
+    :param window: max number of pending items
+    :return: generator of results in the order of items
+    """
+    pending = collections.deque()
+    for item in items:
+        pending.append(executor.submit(function, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def save_documents(in_file, out_file, docs, progress=None):
+    """
+    Saves several documents of the same original file into one output file. Nothing is printed: the lines of each
+    document are formatted together and written to a block buffered file
+
+    :param in_file: original file (gold_conll) with all documents
+    :param out_file: output file
+    :param docs: iterable of Document objects, in the same order they appear in the original file
+    :param progress: optional function called as progress(document_name, documents_written) after each document
+    """
     doc_iterator = iter(docs)
-    with open(in_file, "r") as entrada, open(out_file, "w") as saida:
+    with open(in_file, "r", encoding="utf8") as entrada, \
+            open(out_file, "w", buffering=OUTPUT_BUFFER_SIZE) as saida:
         counter = 0
+        written = 0
         current_doc = next(doc_iterator)
-        print(f"Writing doc {current_doc.name}")
-        next_doc = next(doc_iterator)
+        next_doc = next(doc_iterator, None)
+        lines = []
 
         for line in entrada:
             counter += 1
             if _write_as_is(line):  # Some lines are identical in both documents
-                write(saida, line)
+                lines.append(line)
             else:  # Others are simply the name and the open/close mention (or a dash)
                 if (next_doc is not None) and (next_doc.first_line_idx <= counter):
+                    saida.writelines(lines)
+                    lines = []
+                    written += 1
+                    if progress:
+                        progress(current_doc.name, written)
                     current_doc = next_doc
-                    print(f"Writing doc {current_doc.name}")
-                    try:
-                        next_doc = next(doc_iterator)
-                        print("Moving to next document")
-                    except StopIteration:
-                        next_doc = None
-                        print("No more docs")
+                    next_doc = next(doc_iterator, None)
+
+                lines.append(current_doc.get_line(counter) + "\n")
+
+        saida.writelines(lines)
+        if progress:
+            progress(current_doc.name, written + 1)
+
+
+def build_template(lines):
+    """
+    Extracts from an original file everything the output files need: the number of lines, the lines copied as they
+    are (header, footer and blank lines) and where each document starts. With the template, outputs can be written
+    without reading the original file again
+
+    :param lines: list of lines of the original file
+    :return: dictionary with the keys
+        * n_lines: number of lines
+        * blank: line numbers of the blank lines
+        * as_is: list of [line number, text] for the other lines copied as they are
+        * documents: list of [first_line_idx, name] for each document (see Document)
+    """
+    blank = []
+    as_is = []
+    documents = []
+    name_re = re.compile(r".*\((.*)\).*")
+    for counter, line in enumerate(lines, 1):
+        if not _write_as_is(line):
+            continue
+        if line == "\n":
+            blank.append(counter)
+            continue
+        as_is.append([counter, line])
+        if "#begin" in line:
+            match = name_re.match(line)
+            documents.append([counter - 1, match.group(1) if match else ""])
+    return {"n_lines": len(lines), "blank": blank, "as_is": as_is, "documents": documents}
+
+
+def save_template(template, path, file_name):
+    """
+    Saves the template as a json file. The file only gets its final name once it is complete
+    :param template: dictionary created by build_template
+    :param path: folder
+    :param file_name: file name to be used
+    """
+    with outputs.atomic_open(os.path.join(path, file_name), encoding="utf8") as f:
+        json.dump(template, f)
 
-                write(saida, current_doc.get_line(counter) + "\n")
+
+def load_template(path, file_name):
+    """
+    Loads a template saved by save_template
+    :param path: folder
+    :param file_name: file name
+    :return: dictionary created by build_template
+    """
+    with open(os.path.join(path, file_name), "r", encoding="utf8") as f:
+        return json.load(f)
+
+
+def render_from_template(template, docs):
+    """
+    Builds the content of an output file from its template, without the original file
+
+    :param template: dictionary created by build_template
+    :param docs: Document objects, in the same order they appear in the original file
+    :return: string with the whole output file
+    """
+    fixed = {counter: line for counter, line in template["as_is"]}
+    fixed.update((counter, "\n") for counter in template["blank"])
+    doc_iterator = iter(docs)
+    current_doc = next(doc_iterator)
+    next_doc = next(doc_iterator, None)
+
+    lines = []
+    for counter in range(1, template["n_lines"] + 1):
+        line = fixed.get(counter)
+        if line is not None:
+            lines.append(line)
+            continue
+        if (next_doc is not None) and (next_doc.first_line_idx <= counter):
+            current_doc = next_doc
+            next_doc = next(doc_iterator, None)
+        lines.append(current_doc.get_line(counter) + "\n")
+    return "".join(lines)
+
+
+def save_from_template(template, output_path, document):
+    """
+    Same as save_document, but using the template instead of the original file
+
+    :param template: dictionary created by build_template
+    :param output_path: root of the output files
+    :param document: a Document object
+    """
+    with _open_destination_file(output_path, document.name) as d:
+        d.write(render_from_template(template, [document]))
 
 
 def write(file, line):
+    """
+    Writes the line to the file and to the standard output. Only useful for debugging
+    """
     print(line)
     file.write(line)
 
@@ -211,7 +419,7 @@ def _open_destination_file(output_path, name):
         os.makedirs(os.path.join(output_path, *name.split("/")[:-1]))
     except FileExistsError:
         pass  # Do nothing - folder structure already exists
-    return open("{}/{}.output".format(output_path, name), "w")
+    return open("{}/{}.output".format(output_path, name), "w", buffering=OUTPUT_BUFFER_SIZE)
 
 
 def _write_as_is(line):
@@ -0,0 +1,225 @@
+"""
+This module evaluates predictions without the external reference scorer. It implements the metrics used by the
+CoNLL 2012 shared task:
+
+* MUC
+* B3 (B-cubed)
+* CEAF-e (entity based CEAF)
+* CoNLL F1: the average of the F1 of the three metrics above
+
+A cluster here is a list of mentions and each mention is a (start, end) tuple with the line numbers, as used by
+saver.Document and mentions._get_mention. Scores of several documents are aggregated by summing the numerators and
+denominators of each document, the same way the reference scorer does
+
+"""
+import numpy as np
+
+from boilerplate import mentions
+
+METRICS = ("muc", "bcub", "ceafe")
+
+
+class Score:
+    """
+    Numerators and denominators of recall and precision. Scores can be summed to aggregate documents
+    """
+
+    def __init__(self, recall_num=0., recall_den=0., precision_num=0., precision_den=0.):
+        self.recall_num = recall_num
+        self.recall_den = recall_den
+        self.precision_num = precision_num
+        self.precision_den = precision_den
+
+    def __add__(self, other):
+        return Score(self.recall_num + other.recall_num, self.recall_den + other.recall_den,
+                     self.precision_num + other.precision_num, self.precision_den + other.precision_den)
+
+    @property
+    def recall(self):
+        return self.recall_num / self.recall_den if self.recall_den else 0.
+
+    @property
+    def precision(self):
+        return self.precision_num / self.precision_den if self.precision_den else 0.
+
+    @property
+    def f1(self):
+        recall, precision = self.recall, self.precision
+        return 2 * recall * precision / (recall + precision) if recall + precision else 0.
+
+    def __str__(self):
+        return "R: {:.2%} P: {:.2%} F1: {:.2%}".format(self.recall, self.precision, self.f1)
+
+
+def evaluate(key, response):
+    """
+    Scores one document
+    :param key: list of gold clusters
+    :param response: list of predicted clusters
+    :return: dictionary metric name -> Score. Names are in METRICS
+    """
+    overlap, key_sizes, response_sizes = _overlap_matrix(key, response)
+    return {"muc": _muc(overlap, key_sizes, response_sizes),
+            "bcub": _b_cubed(overlap, key_sizes, response_sizes),
+            "ceafe": _ceaf_e(overlap, key_sizes, response_sizes)}
+
+
+def evaluate_documents(documents):
+    """
+    Scores several documents and the whole corpus
+    :param documents: iterable of (name, key clusters, response clusters)
+    :return: per_document, corpus. per_document is a dictionary name -> scores (as in evaluate) and corpus is
+            the aggregation of all documents
+    """
+    per_document = {}
+    corpus = {metric: Score() for metric in METRICS}
+    for name, key, response in documents:
+        scores = evaluate(key, response)
+        per_document[name] = scores
+        for metric in METRICS:
+            corpus[metric] = corpus[metric] + scores[metric]
+    return per_document, corpus
+
+
+def conll_f1(scores):
+    """
+    :param scores: dictionary returned by evaluate
+    :return: the average F1 of MUC, B3 and CEAF-e
+    """
+    return sum(scores[metric].f1 for metric in METRICS) / len(METRICS)
+
+
+def clusters_from_document(document):
+    """
+    :param document: saver.Document
+    :return: list of clusters
+    """
+    return [[(start, end) for start, ends in cluster.items() for end in ends] for cluster in document.clusters]
+
+
+def clusters_from_lines(train_list):
+    """
+    Reads the gold clusters of a file
+    :param train_list: list of lines of the file (see loader.train_file_to_list)
+    :return: list of clusters, in the order the clusters first appear
+    """
+    cluster_start, start_pos, cluster_end, end_pos = mentions._get_mention(train_list)
+    clusters = {}
+    for m_id, start, end in mentions._create_mention_cluster_list(cluster_start, start_pos, cluster_end, end_pos):
+        clusters.setdefault(m_id, []).append((start, end))
+    return list(clusters.values())
+
+
+def _overlap_matrix(key, response):
+    """
+    Counts the mentions in common between each key and response cluster
+    :param key: list of key clusters
+    :param response: list of response clusters
+    :return: overlap (len(key), len(response)), key cluster sizes, response cluster sizes
+    """
+    mention_ids = {}
+    key_ids = [[mention_ids.setdefault(m, len(mention_ids)) for m in set(c)] for c in key]
+    response_ids = [[mention_ids.setdefault(m, len(mention_ids)) for m in set(c)] for c in response]
+    key_matrix = _membership(key_ids, len(mention_ids))
+    response_matrix = _membership(response_ids, len(mention_ids))
+    overlap = key_matrix @ response_matrix.T
+    return overlap, key_matrix.sum(axis=1), response_matrix.sum(axis=1)
+
+
+def _membership(clusters, n_mentions):
+    """
+    :param clusters: list of lists of mention ids
+    :param n_mentions: total number of mentions
+    :return: matrix (len(clusters), n_mentions) with 1 where the mention is in the cluster
+    """
+    matrix = np.zeros((len(clusters), n_mentions), dtype=np.int64)
+    for i, ids in enumerate(clusters):
+        matrix[i, ids] = 1
+    return matrix
+
+
+def _muc(overlap, key_sizes, response_sizes):
+    """
+    MUC: number of links that must be added/removed to turn one partition into the other. Mentions missing in the
+    other side count as partitions of their own
+    """
+
+    def links(matrix, sizes):
+        partitions = np.count_nonzero(matrix, axis=1) + (sizes - matrix.sum(axis=1))
+        return (sizes - partitions).sum(), (sizes - 1).clip(min=0).sum()
+
+    recall_num, recall_den = links(overlap, key_sizes)
+    precision_num, precision_den = links(overlap.T, response_sizes)
+    return Score(recall_num, recall_den, precision_num, precision_den)
+
+
+def _b_cubed(overlap, key_sizes, response_sizes):
+    """
+    B3: average over the mentions of the fraction of the cluster that is shared by the other side
+    """
+    squared = overlap.astype(np.float64) ** 2
+    recall_num = (squared.sum(axis=1) / np.maximum(key_sizes, 1)).sum()
+    precision_num = (squared.sum(axis=0) / np.maximum(response_sizes, 1)).sum()
+    return Score(recall_num, key_sizes.sum(), precision_num, response_sizes.sum())
+
+
+def _ceaf_e(overlap, key_sizes, response_sizes):
+    """
+    CEAF-e: best one to one alignment between clusters, using phi4 (2 * common / (size1 + size2)) as similarity
+    """
+    if overlap.size == 0:
+        return Score(0., len(key_sizes), 0., len(response_sizes))
+    similarity = 2. * overlap / (key_sizes[:, None] + response_sizes[None, :])
+    rows, cols = _linear_assignment(similarity)
+    total = similarity[rows, cols].sum()
+    return Score(total, len(key_sizes), total, len(response_sizes))
+
+
+def _linear_assignment(score):
+    """
+    Finds the one to one assignment of rows to columns with the maximum total score (Hungarian algorithm with
+    potentials, O(n^3) with the inner loop vectorized)
+    :param score: matrix (n, m)
+    :return: rows, cols. Arrays with min(n, m) positions
+    """
+    transposed = score.shape[0] > score.shape[1]
+    cost = -(score.T if transposed else score).astype(np.float64)
+    n, m = cost.shape
+
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=np.int64)  # Row assigned to each column (1 based, 0 is free)
+    way = np.zeros(m + 1, dtype=np.int64)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        min_v = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = ~used[1:]
+            current = cost[i0 - 1] - u[i0] - v[1:]
+            better = free & (current < min_v[1:])
+            min_v[1:][better] = current[better]
+            way[1:][better] = j0
+            candidates = np.where(free, min_v[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+            u[p[used]] += delta
+            v[used] -= delta
+            min_v[1:][free] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    cols = np.flatnonzero(p[1:])
+    rows = p[1:][cols] - 1
+    if transposed:
+        rows, cols = cols, rows
+    order = np.argsort(rows)
+    return rows[order], cols[order]
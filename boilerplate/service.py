@@ -0,0 +1,313 @@
+"""
+This module keeps the framework loaded in a long running process, to featurize single documents with low latency (for
+example for a live coreference model). The models and the word vectors are loaded once, when the service starts, and
+the vectors of the most recently used words are kept in memory.
+
+Each request is one json line with the text of a CoNLL document:
+    {"id": 1, "text": "#begin document (...); part 000\\n..."}
+The response is one json line:
+    {"id": 1, "document": "...", "mentions": [[start, end], ...], "pairs": [[i, j], ...], "features": [[...], ...],
+     "labels": [...], "seconds": {"mentions": ..., "pairs": ..., "features": ..., "total": ...}}
+mentions are the first and last lines of each mention (see Mention.start_pos), pairs are indexes of mentions (mention
+i and its antecedent j) and features has one row per pair, in the same order (see features.FeatureMapper.schema).
+Failed requests return {"id": 1, "error": "..."}.
+
+Requests are answered by a pool of threads, so responses can be out of order and must be matched by the id. Only
+as many requests as threads are read ahead, so a fast producer does not fill the memory. The service can read the
+requests from stdin (answering in stdout) or from a unix socket:
+python -m boilerplate.service --socket /tmp/featurize.sock
+"""
+import argparse
+import collections
+import concurrent.futures
+import contextlib
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+import numpy as np
+
+from boilerplate import features
+from boilerplate import instrumentation
+from boilerplate import loader
+from boilerplate import mentions
+
+DEFAULT_WORKERS = 4
+WORD_CACHE_SIZE = 100000  # Words whose vectors are kept, see _WordVectors
+_LATENCY_WINDOW = 1000  # Latencies kept for the percentiles
+
+
+class FeaturizationService:
+    """
+    Featurizes documents with models that are loaded only once. Can be used by several threads
+    """
+
+    def __init__(self, increment_mention, increment_mention_pair, word2vec=None, vector_size=None, groups=None,
+                 make_vectors=None, sampler=None, word_cache_size=WORD_CACHE_SIZE):
+        """
+        :param increment_mention: method to add information to the mention
+        :param increment_mention_pair: method to add information to the mention pair
+        :param word2vec: function to map a word to a vector. Default uses the spaCy model (see features.spacy_word2vec)
+        :param vector_size: size of the vectors returned by word2vec. Default is 300 for spaCy and
+                FeatureMapper.VECTOR_SIZE otherwise
+        :param groups: feature groups to be computed (see features.FEATURE_GROUPS). Default uses all groups
+        :param make_vectors: replaces the default features. Called as make_vectors(pairs, train_list=train_list)
+        :param sampler: chooses the mention pairs, see sampling.Sampler
+        :param word_cache_size: max number of words whose vectors are kept in memory
+        """
+        if word2vec is None and make_vectors is None:
+            word2vec = features.spacy_word2vec()
+            vector_size = vector_size or 300
+        self.increment_mention = increment_mention
+        self.increment_mention_pair = increment_mention_pair
+        self.word2vec = _WordVectors(word2vec, word_cache_size) if word2vec is not None else None
+        self.vector_size = vector_size or features.FeatureMapper.VECTOR_SIZE
+        self.groups = groups
+        self.make_vectors = make_vectors if make_vectors is not None else self._make_vectors
+        self.sampler = sampler
+        self.attributes = getattr(self.make_vectors, "mention_attributes",
+                                  features.required_attributes(groups) if make_vectors is None else None)
+        self._latencies = []
+        self._requests = 0
+        self._errors = 0
+        self._lock = threading.Lock()
+
+    def _make_vectors(self, pairs, train_list=None):
+        mapper = features.FeatureMapper(self.word2vec, train_list, self.groups)
+        mapper.VECTOR_SIZE = self.vector_size
+        return features.make_vectors(pairs, mapper)
+
+    def featurize(self, text):
+        """
+        :param text: CoNLL document (or list of lines)
+        :return: dictionary with document, mentions, pairs, features, labels and seconds (see module documentation).
+                 features is a np.array
+        """
+        start = time.perf_counter()
+        seconds = {}
+        train_list = text if isinstance(text, list) else text.splitlines(True)
+        with _timer(seconds, "mentions"):
+            mention_list = mentions.build_mention_list(train_list, self.increment_mention, attributes=self.attributes)
+        with _timer(seconds, "pairs"):
+            pairs = mentions.pair_mentions(mention_list, train_list, self.increment_mention_pair,
+                                           sampler=self.sampler)
+        with _timer(seconds, "features"):
+            input_vector, output_vector = self.make_vectors(pairs, train_list=train_list)
+        position = {id(m): n for n, m in enumerate(mention_list)}
+        seconds["total"] = time.perf_counter() - start
+        return {"document": loader.get_document_name(train_list),
+                "mentions": [[m.start_pos, m.end_pos] for m in mention_list],
+                "pairs": [[position[id(p.mention1)], position[id(p.mention2)]] for p in pairs],
+                "features": np.asarray(input_vector, dtype=float).reshape((len(pairs), -1)),
+                "labels": [int(np.ravel(v)[0]) for v in output_vector],
+                "seconds": seconds}
+
+    def handle(self, line):
+        """
+        Answers one request
+        :param line: json line with id and text
+        :return: json line (without the line break) with the response or the error
+        """
+        request_id = None
+        start = time.perf_counter()
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            with instrumentation.document(request_id):
+                response = self.featurize(request["text"])
+            response["features"] = response["features"].tolist()
+            response["id"] = request_id
+            failed = False
+        except Exception as e:
+            response = {"id": request_id, "error": "{}: {}".format(type(e).__name__, e)}
+            failed = True
+        self._record(time.perf_counter() - start, failed)
+        return json.dumps(response)
+
+    def _record(self, seconds, failed):
+        with self._lock:
+            self._requests += 1
+            self._errors += failed
+            self._latencies.append(seconds)
+            del self._latencies[:-_LATENCY_WINDOW]
+
+    def stats(self):
+        """
+        :return: dictionary with the number of requests and errors and the latency percentiles (in seconds) of the
+                 last requests
+        """
+        with self._lock:
+            latencies = np.array(self._latencies)
+            result = {"requests": self._requests, "errors": self._errors}
+        for p in (50, 90, 99):
+            result["p{}_seconds".format(p)] = float(np.percentile(latencies, p)) if len(latencies) else 0.
+        return result
+
+    def serve_stream(self, f_in, f_out, workers=DEFAULT_WORKERS):
+        """
+        Answers the requests of f_in (one per line) in f_out, until f_in ends. The next request is only read when there
+        are less than workers requests in flight
+        :param f_in: text file with the requests, like sys.stdin
+        :param f_out: text file for the responses, like sys.stdout
+        :param workers: number of requests answered at the same time
+        """
+        lock = threading.Lock()
+        in_flight = threading.BoundedSemaphore(workers)
+
+        def answer(line):
+            try:
+                response = self.handle(line)
+                with lock:
+                    f_out.write(response + "\n")
+                    f_out.flush()
+            finally:
+                in_flight.release()
+
+        with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+            for line in f_in:
+                if line.strip():
+                    in_flight.acquire()
+                    executor.submit(answer, line)
+
+    def unix_server(self, path):
+        """
+        Creates a server that answers the requests sent to a unix socket. Each connection can send several requests
+        and each connection is answered by its own thread. Use serve_forever to start it and shutdown to stop it
+        :param path: socket file. Replaced if it exists
+        :return: socketserver.ThreadingUnixStreamServer
+        """
+        if os.path.exists(path):
+            os.remove(path)
+        service = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    if line.strip():
+                        self.wfile.write((service.handle(line.decode("utf8")) + "\n").encode("utf8"))
+                        self.wfile.flush()
+
+        server = socketserver.ThreadingUnixStreamServer(path, Handler)
+        server.daemon_threads = True
+        return server
+
+
+class Client:
+    """
+    Sends requests to a service listening on a unix socket. Requests of one client are answered in order
+    """
+
+    def __init__(self, path, timeout=None):
+        """
+        :param path: socket file of the service
+        :param timeout: seconds waiting for a response. None waits forever
+        """
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.settimeout(timeout)
+        self.socket.connect(path)
+        self.file = self.socket.makefile("rwb")
+        self._next_id = 0
+
+    def featurize(self, text):
+        """
+        :param text: CoNLL document
+        :return: response of the service (see module documentation). Raises RuntimeError if the request failed
+        """
+        self._next_id += 1
+        self.file.write((json.dumps({"id": self._next_id, "text": text}) + "\n").encode("utf8"))
+        self.file.flush()
+        response = json.loads(self.file.readline().decode("utf8"))
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return response
+
+    def close(self):
+        self.file.close()
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class _WordVectors:
+    """
+    Keeps the vectors of the words most recently returned by word2vec. Words that are not found (KeyError) are also
+    kept. Can be used by several threads
+    """
+
+    def __init__(self, word2vec, max_size=WORD_CACHE_SIZE):
+        """
+        :param word2vec: function to map a word to a vector
+        :param max_size: max number of words kept. The least recently used word is dropped first
+        """
+        self.word2vec = word2vec
+        self.max_size = max_size
+        self.vectors = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __call__(self, word):
+        with self._lock:
+            vector = self.vectors.get(word)
+            if vector is not None:
+                self.vectors.move_to_end(word)
+        if vector is None:
+            try:
+                vector = self.word2vec(word)
+            except KeyError:
+                vector = _MISSING
+            with self._lock:
+                self.vectors[word] = vector
+                while len(self.vectors) > self.max_size:
+                    self.vectors.popitem(last=False)
+        if vector is _MISSING:
+            raise KeyError(word)
+        return vector
+
+
+_MISSING = object()
+
+
+@contextlib.contextmanager
+def _timer(seconds, name):
+    """
+    Adds the time spent in the block to seconds[name]
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds[name] = time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Featurizes CoNLL documents sent as json lines")
+    parser.add_argument("--socket", help="unix socket to listen on. Default reads stdin and writes stdout")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--groups", nargs="+", help="feature groups, see features.FEATURE_GROUPS")
+    args = parser.parse_args(argv)
+
+    from boilerplate import mentions_custom
+    instrumentation.set_progress(False)
+    service = FeaturizationService(mentions_custom.increment_mention, mentions_custom.increment_mention_pair,
+                                   groups=args.groups)
+    if args.socket is None:
+        service.serve_stream(sys.stdin, sys.stdout, args.workers)
+    else:
+        with service.unix_server(args.socket) as server:
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+    print(json.dumps(service.stats()), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
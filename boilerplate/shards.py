@@ -0,0 +1,120 @@
+"""
+This module splits the conversion of a corpus across several machines without any coordination between them.
+Every node discovers the same *_conll files and keeps only the ones of its own shard, so the only requirement is that
+all nodes see the same input tree.
+
+The outputs of each shard are later combined with merge_shards
+
+"""
+import json
+import os
+import shutil
+
+from boilerplate import outputs
+from boilerplate import packed
+
+INDEX_FILE_NAME = "index.json"
+
+
+def partition(files, num_shards):
+    """
+    Splits the files into num_shards groups with roughly the same number of bytes. The biggest files are assigned
+    first, each one to the group with less bytes so far. Ties are broken by name, so the result only depends on the
+    input files, not on the order they were discovered
+    :param files: list of (name, size in bytes)
+    :param num_shards: number of groups
+    :return: list with num_shards lists of names. Each inner list is sorted
+    """
+    if num_shards < 1:
+        raise ValueError("num_shards must be positive, got {}".format(num_shards))
+    shards = [[] for _ in range(num_shards)]
+    loads = [0] * num_shards
+    for name, size in sorted(files, key=lambda x: (-x[1], x[0])):
+        shard = min(range(num_shards), key=lambda s: (loads[s], s))
+        shards[shard].append(name)
+        loads[shard] += size
+    return [sorted(s) for s in shards]
+
+
+def select_shard(files, shard_index, num_shards):
+    """
+    Gets the names that belong to one shard
+    :param files: list of (name, size in bytes)
+    :param shard_index: index of the shard, from 0 to num_shards - 1
+    :param num_shards: number of shards
+    :return: set of names
+    """
+    if not 0 <= shard_index < num_shards:
+        raise ValueError("shard_index must be in [0, {}), got {}".format(num_shards, shard_index))
+    return set(partition(files, num_shards)[shard_index])
+
+
+def merge_shards(shard_dirs, path_out, move=False):
+    """
+    Combines the outputs of several shards into a single folder with one index. Each shard must have been converted
+    with num_shards > 1 (or resume=True), so its folder has the journal of the converted files.
+    Shards written with packed.PackedWriter are concatenated into one packed dataset in path_out (their data files are
+    always copied)
+    :param shard_dirs: list of output folders, one per shard, in the shard order
+    :param path_out: folder of the merged dataset. May be one of the shard folders
+    :param move: if True the files are moved instead of copied
+    :return: the index, also saved as INDEX_FILE_NAME in path_out
+    """
+    os.makedirs(path_out, exist_ok=True)
+    documents = []
+    seen = {}
+    writer = None
+    try:
+        for shard_index, shard_dir in enumerate(shard_dirs):
+            if os.path.isfile(os.path.join(shard_dir, packed.INDEX_FILE_NAME)):
+                writer = writer or packed.PackedWriter(path_out)
+                if not _same_path(shard_dir, path_out):
+                    writer.append(shard_dir)
+            for entry in outputs.read_journal(shard_dir).values():
+                for file_name in entry.get("files", []):
+                    if file_name in seen:
+                        raise ValueError("File {} found in shards {} and {}".format(file_name, seen[file_name],
+                                                                                     shard_index))
+                    seen[file_name] = shard_index
+                    _transfer(os.path.join(shard_dir, file_name), os.path.join(path_out, file_name), move)
+                documents.append(dict(entry, shard=shard_index))
+    finally:
+        if writer is not None:
+            writer.close()
+
+    index = {"num_shards": len(shard_dirs), "documents": sorted(documents, key=lambda e: e["source"])}
+    with outputs.atomic_open(os.path.join(path_out, INDEX_FILE_NAME), encoding="utf8") as f:
+        json.dump(index, f, indent=1)
+    return index
+
+
+def load_index(path):
+    """
+    Reads the index created by merge_shards
+    :param path: merged dataset folder
+    :return: dictionary with the keys 'num_shards' and 'documents'
+    """
+    with open(os.path.join(path, INDEX_FILE_NAME), "r", encoding="utf8") as f:
+        return json.load(f)
+
+
+def _transfer(source, destination, move):
+    """
+    Copies or moves one file. Nothing is done if both paths are the same file
+    :param source: current path
+    :param destination: new path
+    :param move: move instead of copy
+    """
+    if _same_path(source, destination):
+        return
+    if move:
+        os.replace(source, destination)
+    else:
+        shutil.copyfile(source, destination)
+
+
+def _same_path(path1, path2):
+    """
+    :return: True if both paths point to the same file or folder
+    """
+    return os.path.abspath(path1) == os.path.abspath(path2)
@@ -0,0 +1,302 @@
+"""
+This module passes the input vectors built by worker processes to the parent process through shared memory
+(multiprocessing.shared_memory), instead of pickling them. The worker writes the features directly in a shared block
+(see features.make_vectors allocate) and only a handle (block names, shapes and types) is sent to the parent, which
+maps the same memory as numpy arrays, without copies.
+
+The lifetime of the blocks is explicit:
+* the worker creates and fills the blocks and closes its mapping (close). The blocks stay alive
+* the parent attaches to the blocks (SharedVectors.attach), uses the arrays and frees the memory (release)
+
+generate runs the conversion in a pool of processes and yields the vectors of each document, so they can be consumed
+directly, e.g. by a trainer, and process_source saves them like loader.process_source:
+    callback = functools.partial(shared.lines_to_shared, increment_mention=..., increment_mention_pair=...,
+                                 make_vectors=features.make_vectors)
+    for name, locator, train_list, (v_in, v_out, doc_name) in shared.generate(source, callback, processes=4):
+        model.partial_fit(v_in.features, v_out)
+
+The callback is sent to the worker processes, so it must be picklable (a module function or functools.partial).
+"""
+import collections
+import inspect
+import multiprocessing
+import os
+from multiprocessing import resource_tracker
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from boilerplate import instrumentation
+from boilerplate import loader
+from boilerplate import mentions
+
+PAIR_INFO_SIZE = 4  # Start and end of both mentions, as in packed
+PAIR_INFO_DTYPE = np.int64
+FEATURES_DTYPE = np.float64
+
+_callback = None  # Callback of the worker process, see _init_worker
+
+
+class SharedMatrix:
+    """
+    One matrix in a shared memory block
+    """
+
+    def __init__(self, memory, shape, dtype):
+        self.memory = memory
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=memory.buf)
+
+    @classmethod
+    def create(cls, shape, dtype=FEATURES_DTYPE):
+        """
+        :param shape: shape of the matrix
+        :param dtype: numpy type of the values
+        :return: new SharedMatrix. The values are not initialized
+        """
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        return cls(shared_memory.SharedMemory(create=True, size=max(size, 1)), shape, dtype)
+
+    @classmethod
+    def attach(cls, handle):
+        """
+        :param handle: value of the handle property of the matrix (usually created by another process)
+        :return: SharedMatrix using the same memory
+        """
+        name, shape, dtype = handle
+        return cls(shared_memory.SharedMemory(name=name), shape, dtype)
+
+    @property
+    def handle(self):
+        """
+        :return: (block name, shape, dtype). Can be sent to other processes
+        """
+        return self.memory.name, self.shape, self.dtype.str
+
+    def close(self):
+        """
+        Closes the mapping of this process. The array can not be used after this. If there are still arrays using the
+        memory, the mapping is closed when the last one is deleted
+        """
+        self.array = None
+        try:
+            self.memory.close()
+        except BufferError:
+            pass
+
+    def release(self):
+        """
+        Frees the block. Must be called once, after all processes are done with it
+        """
+        self.memory.unlink()
+        self.close()
+
+
+class SharedVectors:
+    """
+    Input vectors of one document in shared memory: the pair info (positions of both mentions) and the features, in
+    separate blocks. Has the same rows as the input vectors of loader.lines_to_vectors, so it can be given to the
+    writers (see loader.CsvWriter and packed.PackedWriter)
+    """
+
+    def __init__(self, pair_info, features):
+        """
+        :param pair_info: SharedMatrix (pairs, PAIR_INFO_SIZE)
+        :param features: SharedMatrix (pairs, features)
+        """
+        self._pair_info = pair_info
+        self._features = features
+
+    @classmethod
+    def create(cls, n_pairs, n_features):
+        """
+        :param n_pairs: number of rows
+        :param n_features: number of feature columns
+        :return: new SharedVectors
+        """
+        return cls(SharedMatrix.create((n_pairs, PAIR_INFO_SIZE), PAIR_INFO_DTYPE),
+                   SharedMatrix.create((n_pairs, n_features), FEATURES_DTYPE))
+
+    @classmethod
+    def attach(cls, handle):
+        """
+        :param handle: value of the handle property
+        :return: SharedVectors using the same memory
+        """
+        return cls(SharedMatrix.attach(handle[0]), SharedMatrix.attach(handle[1]))
+
+    @property
+    def handle(self):
+        return self._pair_info.handle, self._features.handle
+
+    @property
+    def pair_info(self):
+        """
+        :return: np.array (pairs, PAIR_INFO_SIZE) with the start and end lines of both mentions
+        """
+        return self._pair_info.array
+
+    @property
+    def features(self):
+        """
+        :return: np.array (pairs, features)
+        """
+        return self._features.array
+
+    def __len__(self):
+        return self._features.shape[0]
+
+    def __iter__(self):
+        """
+        Rows with the pair info followed by the features, as the input vectors of loader.lines_to_vectors
+        """
+        for info, row in zip(self.pair_info.tolist(), self.features.tolist()):
+            yield info + row
+
+    def __array__(self, dtype=None, copy=None):
+        return np.hstack([self.pair_info.astype(FEATURES_DTYPE), self.features]).astype(dtype or FEATURES_DTYPE)
+
+    def close(self):
+        self._pair_info.close()
+        self._features.close()
+
+    def release(self):
+        self._pair_info.release()
+        self._features.release()
+
+
+def lines_to_shared(train_list, increment_mention, increment_mention_pair, make_vectors, sampler=None):
+    """
+    Same as loader.lines_to_vectors, writing the input vectors in shared memory. Runs in the worker process
+    :param train_list: list of lines of the file
+    :param increment_mention: method to add information to the mention
+    :param increment_mention_pair: method to add information to the mention pair
+    :param make_vectors: method to build the vectors. If it has an allocate parameter (see features.make_vectors), the
+            features are written directly in the shared block, otherwise they are copied to it
+    :param sampler: chooses the mention pairs, see sampling.Sampler
+    :return: [SharedVectors handle, output_vector, document_name]. The receiver must release the vectors
+    """
+    pairs = mentions.get_mention_pairs(train_list, increment_mention, increment_mention_pair, sampler=sampler,
+                                       attributes=getattr(make_vectors, "mention_attributes", None))
+    vectors = None
+
+    def allocate(shape):
+        nonlocal vectors
+        vectors = SharedVectors.create(len(pairs), shape[1])
+        return vectors.features
+
+    try:
+        with instrumentation.stage("features"):
+            if "allocate" in inspect.signature(make_vectors).parameters:
+                input_vector, output_vector = make_vectors(pairs, train_list=train_list, allocate=allocate)
+            else:
+                input_vector, output_vector = make_vectors(pairs, train_list=train_list)
+            if vectors is None:
+                matrix = np.asarray(input_vector, dtype=FEATURES_DTYPE).reshape((len(pairs), -1)) if pairs else \
+                    np.zeros((0, 0))
+                allocate(matrix.shape)[:] = matrix
+            del input_vector
+            vectors.pair_info[:] = [p.get_info_vector() for p in pairs]
+        handle = vectors.handle
+    except BaseException:
+        if vectors is not None:
+            vectors.release()
+        raise
+    vectors.close()
+    return handle, output_vector, loader.get_document_name(train_list)
+
+
+def generate(source, callback, processes=2, names=None, window=None):
+    """
+    Converts the files of the source in a pool of processes. The vectors of each document are released when the next
+    one is requested (or when the generator is closed), so they must be copied if they are needed after that
+    :param source: sources.DirectorySource, sources.TarSource or any object with the same methods
+    :param callback: picklable method that receives the list of lines of a file and returns [SharedVectors handle,
+            output_vector, document_name] (see lines_to_shared)
+    :param processes: number of worker processes
+    :param names: set of names to be converted. None means all files
+    :param window: max number of files being converted at the same time. Default is twice the processes
+    :return: generator of (name, locator, train_list, [SharedVectors, output_vector, document_name]), in the order of
+             the source
+    """
+    for name, locator, train_list, result, _ in _generate(source, callback, processes, names, window):
+        yield name, locator, train_list, result
+
+
+def _generate(source, callback, processes, names, window):
+    """
+    Same as generate, also yielding the stages and counters recorded by the worker (see instrumentation.collecting)
+    """
+    window = window or 2 * processes
+    pending = collections.deque()
+    context = multiprocessing.get_context()
+    if os.name == "posix":
+        # The workers must share the tracker of this process. A tracker of their own would free the blocks when the
+        # worker stops. Forked workers inherit the running tracker, while the spawn and forkserver start methods
+        # (the defaults on macOS and, from python 3.14, on linux) would start a new one
+        resource_tracker.ensure_running()
+        context = multiprocessing.get_context("fork")
+    with context.Pool(processes, initializer=_init_worker, initargs=(callback,)) as pool:
+        try:
+            entries = source.entries(names)
+            while True:
+                for name, locator, read in entries:
+                    train_list = read()
+                    pending.append((name, locator, train_list, pool.apply_async(_run_worker, (train_list,))))
+                    if len(pending) >= window:
+                        break
+                if not pending:
+                    break
+                name, locator, train_list, result = pending.popleft()
+                (handle, v_out, doc_name), collected = result.get()
+                vectors = SharedVectors.attach(handle)
+                try:
+                    yield name, locator, train_list, [vectors, v_out, doc_name], collected
+                finally:
+                    vectors.release()
+        finally:
+            for _, _, _, result in pending:  # Frees the blocks of the files not consumed
+                try:
+                    SharedVectors.attach(result.get()[0][0]).release()
+                except Exception:
+                    pass
+
+
+def process_source(source, path_out, callback, processes=2, resume=False, shard_index=0, num_shards=1, writer=None,
+                   save_templates=False):
+    """
+    Same as loader.process_source, converting the files in a pool of processes (see generate). The files are read
+    and written by this process
+    :param callback: picklable method, see generate
+    :param processes: number of worker processes
+    """
+    os.makedirs(path_out, exist_ok=True)
+    writer = writer if writer is not None else loader.CsvWriter(path_out)
+    files, completed, journal = loader._start_run(source.files(), path_out, resume, shard_index, num_shards)
+    names = set(f[0] for f in files if f[0] not in completed)
+    try:
+        with instrumentation.progress(None, desc="files", total=len(names)) as pb:
+            for name, locator, train_list, result, collected in _generate(source, callback, processes, names, None):
+                with instrumentation.document(name):
+                    instrumentation.merge(collected)  # Stages of the worker (mentions, pairs and features)
+                    loader._write_result(writer, journal, path_out, name, locator, result, save_templates,
+                                         train_list)
+                pb.update(1)
+    finally:
+        if journal:
+            journal.close()
+
+
+def _init_worker(callback):
+    global _callback
+    _callback = callback
+
+
+def _run_worker(train_list):
+    """
+    :return: result of the callback, stages and counters recorded while it ran (see instrumentation.collecting)
+    """
+    with instrumentation.collecting() as collected:
+        result = _callback(train_list)
+    return result, collected
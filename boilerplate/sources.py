@@ -0,0 +1,122 @@
+"""
+This module reads the *_conll files from different kinds of input, so the corpus does not need to be extracted:
+
+* DirectorySource: a folder (files can be in multiple sub-folders)
+* TarSource: a .tar, .tar.gz or .tgz archive. Members are streamed in the order they are stored, so compressed
+  archives are decompressed only once per pass
+
+Every file is identified by its name relative to the root of the folder/archive, using '/' as separator. An archive
+and the folder it extracts to give the same names, so the outputs (and the journal) are the same.
+
+Sources can be passed to loader.process_source and pipeline.process_source. open_source chooses the source from the
+path.
+"""
+import io
+import os
+import tarfile
+
+from boilerplate import loader
+
+ARCHIVE_EXTENSIONS = (".tar", ".tar.gz", ".tgz")
+CONLL_SUFFIX = "_conll"
+
+
+class DirectorySource:
+    """
+    Files of a folder
+    """
+
+    def __init__(self, path):
+        """
+        :param path: root folder
+        """
+        self.path = path
+
+    def files(self):
+        """
+        :return: list of (name, locator, size in bytes), sorted by name. The locator is the full path of the file
+        """
+        return loader._find_conll_files(self.path)
+
+    def entries(self, names=None):
+        """
+        Iterates over the files, sorted by name
+        :param names: set of names to be read. None means all files
+        :return: generator of (name, locator, read). read is a function without parameters that returns the lines of
+                the file. It must be called before moving to the next entry
+        """
+        for name, file_path, _ in self.files():
+            if names is None or name in names:
+                yield name, file_path, lambda p=file_path: loader.train_file_to_list(p)
+
+
+class TarSource:
+    """
+    Members of a tar archive (compressed or not)
+    """
+
+    def __init__(self, path):
+        """
+        :param path: archive file
+        """
+        self.path = path
+
+    def files(self):
+        """
+        Lists the members. For compressed archives this reads the whole archive
+        :return: list of (name, locator, size in bytes), sorted by name. The locator is the member name
+        """
+        files = []
+        with tarfile.open(self.path, "r|*") as tar:
+            for member in tar:
+                if _is_conll(member):
+                    files.append((_member_name(member.name), member.name, member.size))
+        return sorted(files)
+
+    def entries(self, names=None):
+        """
+        Iterates over the members, in the order they are stored in the archive
+        :param names: set of names to be read. None means all files
+        :return: generator of (name, locator, read). See DirectorySource.entries
+        """
+        with tarfile.open(self.path, "r|*") as tar:
+            for member in tar:
+                if not _is_conll(member):
+                    continue
+                name = _member_name(member.name)
+                if names is None or name in names:
+                    yield name, member.name, lambda m=member: _read_member(tar, m)
+
+
+def open_source(path):
+    """
+    :param path: folder or archive
+    :return: DirectorySource or TarSource
+    """
+    if os.path.isdir(path):
+        return DirectorySource(path)
+    if path.endswith(ARCHIVE_EXTENSIONS) or tarfile.is_tarfile(path):
+        return TarSource(path)
+    raise ValueError("{} is not a folder or a tar archive".format(path))
+
+
+def _is_conll(member):
+    return member.isfile() and member.name.endswith(CONLL_SUFFIX)
+
+
+def _member_name(member_name):
+    """
+    :param member_name: name of the member in the archive
+    :return: name of the file relative to the root, as DirectorySource names it
+    """
+    while member_name.startswith("./"):
+        member_name = member_name[2:]
+    return member_name.lstrip("/")
+
+
+def _read_member(tar, member):
+    """
+    :return: list of lines of the member, as loader.train_file_to_list
+    """
+    data = tar.extractfile(member).read().decode("utf8")
+    return io.StringIO(data, newline=None).readlines()  # Same newline translation as open
@@ -0,0 +1,187 @@
+"""
+This module generates synthetic documents in the CoNLL 2012 format. The documents have no meaning, but they are
+well formed (properly nested coreference brackets, headers, footers, sentence breaks and speakers), so they can be
+used to test and benchmark the framework with documents much bigger than the real ones.
+
+It can also be run from the command line:
+python -m boilerplate.synthetic output_folder --documents 10 --sentences 500
+"""
+import argparse
+import os
+import random as rnd
+
+WORDS = ["agent", "bank", "case", "city", "court", "deal", "family", "group", "house", "jury", "law", "market",
+         "money", "officer", "party", "report", "school", "state", "team", "world"]
+NAMES = ["Alice", "Bob", "Carol", "Dave", "Leung", "Smith", "Paris", "London"]
+PRONOUNS = ["he", "she", "it", "they", "him", "her", "them", "his", "its", "their"]
+FILLERS = ["the", "a", "of", "in", "and", "to", "was", "has", "said", "that", "."]
+
+
+def generate_document(name, sentences=20, sentence_length=(8, 25), mention_density=0.15, max_depth=2,
+                      cluster_size=(2, 6), speakers=2, part=0, random=None):
+    """
+    Generates the lines of one document
+    :param name: document name (used in the header and in the first column)
+    :param sentences: number of sentences
+    :param sentence_length: (min, max) number of words in a sentence
+    :param mention_density: probability of a mention starting at each word
+    :param max_depth: max number of mentions nested inside each other (1 means no nesting)
+    :param cluster_size: (min, max) number of mentions of each cluster. The last clusters may be smaller
+    :param speakers: number of different speakers
+    :param part: part number of the document
+    :param random: random.Random instance. A new one (seed 0) is used if not informed
+    :return: lines, clusters. Lines as returned by loader.train_file_to_list and the gold clusters as lists of
+            (start, end) line numbers (first line is 1, as in saver.Document)
+    """
+    random = random or rnd.Random(0)
+    clusters = _ClusterAssigner(cluster_size, random)
+    lines = ["#begin document ({}); part {:03d}\n".format(name, part)]
+    speaker = "speaker_1"
+
+    for _ in range(sentences):
+        length = random.randint(*sentence_length)
+        spans = _nested_spans(0, length, 1, mention_density, max_depth, random)
+        if random.random() < 0.2:
+            speaker = "speaker_{}".format(random.randint(1, speakers))
+
+        first_line = len(lines) + 1
+        opens = [[] for _ in range(length)]
+        closes = [[] for _ in range(length)]
+        span_clusters = []
+        for start, end, parent in spans:
+            forbidden = []
+            while parent is not None:  # Clusters of all mentions containing this one
+                forbidden.append(span_clusters[parent])
+                parent = spans[parent][2]
+            cluster_id = clusters.assign(first_line + start, first_line + end - 1, forbidden)
+            span_clusters.append(cluster_id)
+            if end - start == 1:
+                opens[start].append("({})".format(cluster_id))
+            else:
+                opens[start].append("({}".format(cluster_id))
+                closes[end - 1].insert(0, "{})".format(cluster_id))  # Inner mentions close first
+
+        for i in range(length):
+            word = _word(random, bool(opens[i]))
+            coref = "|".join(opens[i] + closes[i]) or "-"
+            lines.append("{} {} {} {} NN * - - - {} * {}\n".format(name, part, i, word, speaker, coref))
+        lines.append("\n")
+
+    lines.append("#end document\n")
+    return lines, clusters.clusters()
+
+
+def write_corpus(path, documents=10, seed=0, **kwargs):
+    """
+    Writes one file per document, named synthetic_[n].gold_conll
+    :param path: output folder. Created if needed
+    :param documents: number of documents
+    :param seed: random seed. The same seed always generates the same corpus
+    :param kwargs: other parameters of generate_document
+    :return: list of file paths
+    """
+    os.makedirs(path, exist_ok=True)
+    random = rnd.Random(seed)
+    paths = []
+    for n in range(documents):
+        name = "synthetic/synthetic_{:04d}".format(n)
+        lines, _ = generate_document(name, random=random, **kwargs)
+        file_path = os.path.join(path, "synthetic_{:04d}.gold_conll".format(n))
+        with open(file_path, "w", encoding="utf8") as f:
+            f.writelines(lines)
+        paths.append(file_path)
+    return paths
+
+
+class _ClusterAssigner:
+    """
+    Distributes the mentions among clusters. A mention never joins the cluster of a mention that contains it, since
+    nested mentions of the same cluster can not be represented unambiguously by the brackets
+    """
+
+    def __init__(self, cluster_size, random):
+        self.cluster_size = cluster_size
+        self.random = random
+        self.members = []  # Cluster id - 1 => list of mentions
+        self.capacity = []  # Cluster id - 1 => max size
+        self.open = []  # Ids of clusters that can still receive mentions
+
+    def assign(self, start, end, forbidden):
+        """
+        :param start: first line of the mention
+        :param end: last line of the mention
+        :param forbidden: ids of clusters that can not be used
+        :return: cluster id (starting at 1)
+        """
+        candidates = [c for c in self.open if c not in forbidden]
+        if candidates and self.random.random() < 0.7:
+            cluster_id = self.random.choice(candidates)
+        else:
+            self.members.append([])
+            self.capacity.append(self.random.randint(*self.cluster_size))
+            cluster_id = len(self.members)
+            self.open.append(cluster_id)
+
+        self.members[cluster_id - 1].append((start, end))
+        if len(self.members[cluster_id - 1]) >= self.capacity[cluster_id - 1]:
+            self.open.remove(cluster_id)
+        return cluster_id
+
+    def clusters(self):
+        return [list(m) for m in self.members]
+
+
+def _nested_spans(start, end, depth, density, max_depth, random, parent=None, spans=None):
+    """
+    Chooses non crossing mention spans inside [start, end)
+    :return: list of (start, end, parent). parent is the position in the list of the mention that contains this one
+            (or None). Mentions always come after the mentions that contain them
+    """
+    spans = [] if spans is None else spans
+    i = start
+    while i < end:
+        if random.random() >= density:
+            i += 1
+            continue
+        length = min(end - i, random.choice([1, 1, 2, 3, 4, 6]))
+        spans.append((i, i + length, parent))
+        if depth < max_depth and length > 1:
+            # Nested mentions are strictly smaller than the one containing them
+            inner_start = i + random.randint(0, 1)
+            inner_end = i + length - (1 if inner_start == i else 0)
+            _nested_spans(inner_start, inner_end, depth + 1, density * 2, max_depth, random, len(spans) - 1, spans)
+        i += length
+    return spans
+
+
+def _word(random, first_of_mention):
+    """
+    :return: a random word. Mentions often start with names or pronouns
+    """
+    if first_of_mention and random.random() < 0.5:
+        return random.choice(NAMES + PRONOUNS)
+    return random.choice(WORDS + FILLERS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generates synthetic CoNLL 2012 documents")
+    parser.add_argument("path", help="output folder")
+    parser.add_argument("--documents", type=int, default=10)
+    parser.add_argument("--sentences", type=int, default=20, help="sentences per document")
+    parser.add_argument("--min-length", type=int, default=8, help="min words per sentence")
+    parser.add_argument("--max-length", type=int, default=25, help="max words per sentence")
+    parser.add_argument("--density", type=float, default=0.15, help="probability of a mention at each word")
+    parser.add_argument("--depth", type=int, default=2, help="max nesting depth of mentions")
+    parser.add_argument("--min-cluster", type=int, default=2)
+    parser.add_argument("--max-cluster", type=int, default=6)
+    parser.add_argument("--speakers", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    write_corpus(args.path, args.documents, args.seed, sentences=args.sentences,
+                 sentence_length=(args.min_length, args.max_length), mention_density=args.density,
+                 max_depth=args.depth, cluster_size=(args.min_cluster, args.max_cluster), speakers=args.speakers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+This module has the stubs and fixtures shared by the tests and the benchmark. The stubs replace the spaCy models of
+mentions_custom and features, so the framework can run without them:
+    mention_list = mentions.build_mention_list(train_list, testing.stub_increment_mention)
+    mapper = features.FeatureMapper(testing.stub_embedding, train_list)
+
+The module functions can be sent to worker processes (see shared.generate), as they are picklable.
+"""
+import os
+import tempfile
+import unittest
+import zlib
+
+import numpy as np
+
+from boilerplate import features
+from boilerplate import instrumentation
+from boilerplate import loader
+from boilerplate import synthetic
+
+
+def stub_embedding(word):
+    """
+    Deterministic fake word vector with FeatureMapper.VECTOR_SIZE positions
+    """
+    seed = zlib.crc32(word.encode("utf8"))
+    return np.random.default_rng(seed).random((features.FeatureMapper.VECTOR_SIZE, 1))
+
+
+def stub_increment_mention(mention):
+    """
+    Same attributes as mentions_custom.increment_mention, without spaCy
+    """
+    mention.head_word = mention.last_word
+    is_pronoun = mention.mention.lower() in synthetic.PRONOUNS
+    mention.mention_type = [1, 0, 0, 0] if is_pronoun else [0, 0, 1, 0]
+    mention.mention_length = str(len(mention.words))
+
+
+def stub_increment_mention_pair(p, train_list):
+    """
+    Same attributes as mentions_custom.increment_mention_pair, without spaCy
+    """
+    p.sentence_dist_count = distance(0)
+    p.mention_dist_count = distance(p.mention1.index - p.mention2.index)
+    p.head_match = p.mention1.head_word == p.mention2.head_word
+
+
+def distance(a):
+    """
+    One hot vector with 10 positions for the distance buckets used by mentions_custom
+    """
+    buckets = [0, 1, 2, 3, 4, 5, 8, 16, 32, 64]
+    d = [0] * 10
+    if a >= 0:
+        d[max(i for i, b in enumerate(buckets) if a >= b)] = 1
+    return d
+
+
+def make_stub_vectors(pairs, train_list=None, allocate=None):
+    """
+    features.make_vectors with the stub embedding. Can be given to loader.lines_to_vectors
+    """
+    return features.make_vectors(pairs, features.FeatureMapper(stub_embedding, train_list), allocate=allocate)
+
+
+def make_stub_ranking_vectors(mention_list, pairs, train_list=None):
+    """
+    features.make_ranking_vectors with the stub embedding
+    """
+    return features.make_ranking_vectors(mention_list, pairs, features.FeatureMapper(stub_embedding, train_list))
+
+
+def stub_lines_to_vectors(train_list):
+    """
+    loader.lines_to_vectors with the stubs
+    """
+    return loader.lines_to_vectors(train_list, stub_increment_mention, stub_increment_mention_pair, make_stub_vectors)
+
+
+def read_outputs(path):
+    """
+    :param path: folder
+    :return: dictionary with the name and the content of each file, except the hidden ones (like the journal)
+    """
+    outputs = {}
+    for file_name in os.listdir(path):
+        if not file_name.startswith("."):
+            with open(os.path.join(path, file_name)) as f:
+                outputs[file_name] = f.read()
+    return outputs
+
+
+class CorpusTestCase(unittest.TestCase):
+    """
+    Creates a synthetic corpus in a temporary folder (self.corpus) for each test, with the progress bars disabled.
+    Subclasses change the size with DOCUMENTS and SENTENCES or override write_corpus
+    """
+    DOCUMENTS = 4
+    SENTENCES = 3
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.corpus = os.path.join(self.tmp.name, "corpus")
+        self.write_corpus()
+        instrumentation.set_progress(False)
+
+    def tearDown(self):
+        instrumentation.set_progress(True)
+        self.tmp.cleanup()
+
+    def write_corpus(self):
+        synthetic.write_corpus(self.corpus, documents=self.DOCUMENTS, sentences=self.SENTENCES)
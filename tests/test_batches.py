@@ -0,0 +1,80 @@
+import tempfile
+import unittest
+
+import numpy as np
+
+from boilerplate import batches
+from boilerplate import packed
+
+
+class BatchesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        # 20 rows. Row i has the feature i and pair info [i, i, i, i]. Only rows 0 and 10 are positive
+        with packed.PackedWriter(self.tmp.name) as writer:
+            for doc in range(2):
+                rows = [[i, i, i, i, i] for i in range(doc * 10, doc * 10 + 10)]
+                labels = [[1]] + [[0]] * 9
+                writer.save("doc{}".format(doc), rows, labels, "doc{}".format(doc))
+        self.reader = packed.PackedReader(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_epoch(self):
+        loader = batches.BatchLoader(self.reader, batch_size=6, seed=1)
+        received = list(loader)
+
+        self.assertEqual(4, len(loader))
+        self.assertListEqual([6, 6, 6, 2], [len(x) for x, y, info in received])
+        rows = np.concatenate([x[:, 0] for x, y, info in received])
+        self.assertListEqual(list(range(20)), sorted(rows.astype(int).tolist()))
+        for x, y, info in received:
+            np.testing.assert_array_equal(x[:, 0], info[:, 0])
+            np.testing.assert_array_equal(y, np.isin(info[:, 0], [0, 10]))
+
+    def test_shuffled_order(self):
+        loader = batches.BatchLoader(self.reader, batch_size=20, seed=2, prefetch=0)
+        expected = np.arange(20)
+        np.random.default_rng(2).shuffle(expected)
+
+        x, y, info = next(iter(loader))
+        self.assertListEqual(expected.tolist(), x[:, 0].astype(int).tolist())
+        self.assertListEqual(expected.tolist(), info[:, 0].tolist())
+        self.assertListEqual(np.isin(expected, [0, 10]).tolist(), (y > 0).tolist())
+
+    def test_drop_last(self):
+        loader = batches.BatchLoader(self.reader, batch_size=6, drop_last=True, prefetch=0)
+        self.assertEqual(3, len(loader))
+        self.assertEqual(3, len(list(loader)))
+
+    def test_positive_ratio(self):
+        loader = batches.BatchLoader(self.reader, batch_size=4, positive_ratio=0.5, seed=3)
+        received = list(loader)
+
+        self.assertEqual(9, len(received))  # 18 negatives, 2 per batch
+        for x, y, info in received:
+            self.assertEqual(4, len(y))
+            self.assertEqual(2, y.sum())
+
+    def test_positive_positions(self):
+        loader = batches.BatchLoader(self.reader, batch_size=4, positive_ratio=0.5, seed=3, prefetch=0)
+        positions = set()
+        for x, y, info in loader:
+            positions.add(tuple(np.flatnonzero(y).tolist()))
+            np.testing.assert_array_equal(y, np.isin(info[:, 0], [0, 10]))
+        self.assertGreater(len(positions), 1)  # Positives are not always at the end of the batch
+
+        unshuffled = batches.BatchLoader(self.reader, batch_size=4, positive_ratio=0.5, shuffle=False, prefetch=0)
+        for x, y, info in unshuffled:
+            self.assertListEqual([0, 0, 1, 1], y.tolist())
+
+    def test_same_batches_with_and_without_prefetch(self):
+        with_thread = list(batches.BatchLoader(self.reader, batch_size=3, seed=7, prefetch=2))
+        without_thread = list(batches.BatchLoader(self.reader, batch_size=3, seed=7, prefetch=0))
+        for a, b in zip(with_thread, without_thread):
+            np.testing.assert_array_equal(a[0], b[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,30 @@
+import unittest
+
+from boilerplate import benchmark
+
+
+class BenchmarkTestCase(unittest.TestCase):
+    def test_run(self):
+        results = benchmark.run(sizes=[2], repeat=1)
+
+        self.assertListEqual(list(benchmark.STAGES), [r["stage"] for r in results])
+        for r in results:
+            self.assertEqual(2, r["sentences"])
+            self.assertGreaterEqual(r["seconds"], 0)
+            self.assertGreater(r["peak_bytes"], 0)
+
+    def test_compare(self):
+        baseline = [{"stage": "a", "sentences": 5, "seconds": 1., "peak_bytes": 100},
+                    {"stage": "b", "sentences": 5, "seconds": 1., "peak_bytes": 100}]
+        results = [{"stage": "a", "sentences": 5, "seconds": 1.1, "peak_bytes": 200},
+                   {"stage": "b", "sentences": 5, "seconds": 2., "peak_bytes": 100},
+                   {"stage": "c", "sentences": 5, "seconds": 2., "peak_bytes": 100}]
+
+        regressions = benchmark.compare(results, baseline, tolerance=0.25)
+        self.assertEqual(2, len(regressions))
+        self.assertTrue(regressions[0].startswith("a (5 sentences): peak_bytes"))
+        self.assertTrue(regressions[1].startswith("b (5 sentences): seconds"))
+
+
+if __name__ == '__main__':
+    unittest.main()
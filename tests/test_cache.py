@@ -0,0 +1,100 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from boilerplate import cache
+from boilerplate import features
+from boilerplate import loader
+from boilerplate import mentions
+from boilerplate import outputs
+from boilerplate import testing
+
+ROOT = "tests/"
+
+
+class CacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.lines = loader.train_file_to_list("{}/cnn_0341.gold_conll".format(ROOT))
+        self.mention_list = mentions.build_mention_list(self.lines, testing.stub_increment_mention)
+        self.pairs = mentions.pair_mentions(self.mention_list, self.lines, testing.stub_increment_mention_pair)
+        self.calls = {}
+        self.original = {name: group.compute for name, group in features.FEATURE_GROUPS.items()}
+        for name, group in features.FEATURE_GROUPS.items():
+            group.compute = self._counting(name, group.compute)
+
+    def tearDown(self):
+        for name, compute in self.original.items():
+            features.FEATURE_GROUPS[name].compute = compute
+
+    def _counting(self, name, compute):
+        def wrapper(mapper, item):
+            self.calls[name] = self.calls.get(name, 0) + 1
+            return compute(mapper, item)
+
+        return wrapper
+
+    def _mapper(self, feature_cache):
+        return features.FeatureMapper(testing.stub_embedding, self.lines, cache=feature_cache)
+
+    def test_same_vectors(self):
+        expected = np.array(self._mapper(None).make_input_vector(self.pairs))
+        with tempfile.TemporaryDirectory() as tmp:
+            feature_cache = cache.FeatureCache(tmp, "stub")
+            np.testing.assert_array_equal(expected, np.array(self._mapper(feature_cache).make_input_vector(self.pairs)))
+            np.testing.assert_array_equal(expected, np.array(self._mapper(feature_cache).make_input_vector(self.pairs)))
+
+    def test_only_missing_groups_are_computed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            feature_cache = cache.FeatureCache(tmp, "stub")
+            self._mapper(feature_cache).make_input_vector(self.pairs)
+            self.assertEqual(len(self.pairs), self.calls["overlap"])
+
+            self.calls = {}
+            self._mapper(feature_cache).make_input_vector(self.pairs)
+            self.assertDictEqual({}, self.calls)
+
+            group = features.FEATURE_GROUPS["overlap"]
+            group.version += 1
+            try:
+                self._mapper(feature_cache).make_input_vector(self.pairs)
+            finally:
+                group.version -= 1
+            self.assertDictEqual({"overlap": len(self.pairs)}, self.calls)
+
+            # Other documents/namespaces do not share blocks
+            self.calls = {}
+            self._mapper(cache.FeatureCache(tmp, "other")).make_input_vector(self.pairs[:10])
+            self.assertEqual(10, self.calls["overlap"])
+
+    def test_other_pairs_keep_mention_blocks(self):
+        # A pair whose mentions were already used by the previous pairs: removing it keeps the mention rows
+        seen = set()
+        for k, p in enumerate(self.pairs):
+            if id(p.mention1) in seen and id(p.mention2) in seen:
+                break
+            seen.update((id(p.mention1), id(p.mention2)))
+        other_pairs = self.pairs[:k] + self.pairs[k + 1:]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            feature_cache = cache.FeatureCache(tmp, "stub")
+            self._mapper(feature_cache).make_input_vector(self.pairs)
+            self.calls = {}
+            vectors = self._mapper(feature_cache).make_input_vector(other_pairs)
+            self.assertSetEqual(set(features.PAIR_GROUPS), set(self.calls))
+            np.testing.assert_array_equal(np.array(self._mapper(None).make_input_vector(other_pairs)),
+                                          np.array(vectors))
+
+    def test_ranking_vectors(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            mapper = self._mapper(cache.FeatureCache(tmp))
+            np.testing.assert_array_equal(self._mapper(None).make_mention_vectors(self.mention_list),
+                                          mapper.make_mention_vectors(self.mention_list))
+            np.testing.assert_array_equal(self._mapper(None).make_pair_vectors(self.pairs),
+                                          mapper.make_pair_vectors(self.pairs))
+            self.assertFalse([f for _, _, files in os.walk(tmp) for f in files if f.endswith(outputs.TMP_SUFFIX)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,8 @@ import unittest
 import numpy as np
 
 from boilerplate import features as f
+from boilerplate import mentions
+from boilerplate import testing
 from boilerplate.loader import train_file_to_list
 
 ROOT_PATH = "tests/"
@@ -74,6 +76,63 @@ class FeaturesTestCase(unittest.TestCase):
 
         self.assertDictEqual(expected, f._merge_document_text(docs))
 
+    def test_schema(self):
+        mapper_default = f.FeatureMapper(mapper({}), [])
+        schema = mapper_default.schema()
+        self.assertEqual(slice(0, 50), schema["mention.mention_avg"])
+        self.assertEqual(slice(50, 100), schema["antecedent.mention_avg"])
+        self.assertEqual(slice(100, 150), schema["mention.first_word"])
+        self.assertEqual(2 * 50 + 2 * (11 * 50 + 6) + 25, max(s.stop for s in schema.values()))
+        pair_schema = mapper_default.schema((f.PAIR,))
+        self.assertEqual(slice(0, 10), pair_schema["pair.mention_distance"])
+        self.assertEqual(slice(24, 25), pair_schema["pair.partial_match"])
+
+    def test_selected_groups(self):
+        lines = train_file_to_list(TEST_FILE)
+        pairs = mentions.get_mention_pairs(lines, testing.stub_increment_mention,
+                                           testing.stub_increment_mention_pair)
+        full = np.array(f.FeatureMapper(testing.stub_embedding, lines).make_input_vector(pairs))[:, :, 0]
+        full_schema = f.FeatureMapper(testing.stub_embedding, lines).schema()
+
+        groups = ["last_word", "type", "head_match"]
+        selected_mapper = f.FeatureMapper(testing.stub_embedding, lines, groups)
+        selected = np.array(selected_mapper.make_input_vector(pairs))[:, :, 0]
+        schema = selected_mapper.schema()
+        self.assertListEqual(["mention.last_word", "mention.type", "antecedent.last_word", "antecedent.type",
+                              "pair.head_match"], list(schema))
+        self.assertEqual(2 * 54 + 1, selected.shape[1])
+        for column, columns in schema.items():
+            np.testing.assert_array_equal(full[:, full_schema[column]], selected[:, columns])
+
+        # The document average is never computed when its group is not selected
+        self.assertIsNone(selected_mapper._docs_average)
+
+    def test_groups_of_one_scope(self):
+        lines = train_file_to_list(TEST_FILE)
+        mention_list = mentions.build_mention_list(lines, testing.stub_increment_mention)
+        pairs = mentions.pair_mentions(mention_list, lines, testing.stub_increment_mention_pair)
+
+        # Same groups as select(["overlap"], make_ranking_vectors): no mention group
+        mention_vectors, pair_vectors, labels = f.make_ranking_vectors(
+            mention_list, pairs, f.FeatureMapper(testing.stub_embedding, lines, ["overlap"]))
+        self.assertEqual((len(mention_list), 0), mention_vectors.shape)
+        self.assertEqual(np.float64, mention_vectors.dtype)
+        self.assertEqual((len(pairs), 1), pair_vectors.shape)
+
+        # No pair group
+        mention_vectors, pair_vectors, labels = f.make_ranking_vectors(
+            mention_list, pairs, f.FeatureMapper(testing.stub_embedding, lines, ["type"]))
+        self.assertEqual((len(mention_list), 4), mention_vectors.shape)
+        self.assertEqual((len(pairs), 0), pair_vectors.shape)
+        self.assertEqual(np.float64, pair_vectors.dtype)
+
+    def test_select(self):
+        make = f.select(["first_word", "prev_words_avg"])
+        self.assertEqual({"pre_words"}, make.mention_attributes)
+        self.assertIn("next_words", f.make_vectors.mention_attributes)
+        with self.assertRaises(ValueError):
+            f.select(["not_a_group"])
+
 
 def mapper(word_mapping):
     return lambda x: word_mapping[x]
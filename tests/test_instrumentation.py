@@ -0,0 +1,67 @@
+import json
+import os
+import tempfile
+import unittest
+
+from boilerplate import instrumentation
+from boilerplate import loader as ldr
+from boilerplate import mentions
+
+ROOT = "tests/"
+
+
+def make_vectors(pairs, train_list=None):
+    return [[[1.]] for _ in pairs], [[p.coref + 0] for p in pairs]
+
+
+class InstrumentationTestCase(unittest.TestCase):
+    def test_process_dir(self):
+        sink = instrumentation.MemorySink()
+        with tempfile.TemporaryDirectory() as out:
+            with instrumentation.recording(instrumentation.Recorder(sink)):
+                ldr.process_dir(ROOT, out, lambda p: ldr.trainfile_to_vectors(p, None, None, make_vectors))
+
+        self.assertEqual(1, len(sink.records))
+        record = sink.records[0]
+        self.assertEqual("cnn_0341.gold_conll", record["document"])
+        self.assertEqual(48, record["counters"]["mentions"])
+        self.assertEqual(48 * 47 // 2, record["counters"]["candidate_pairs"])
+        self.assertEqual(339, record["counters"]["kept_pairs"])
+        self.assertGreater(record["counters"]["bytes_written"], 0)
+        self.assertAlmostEqual(record["counters"]["positive_pairs"] / 339, record["positive_ratio"])
+        self.assertSetEqual({"read", "mentions", "pairs", "features", "write"}, set(record["stages"]))
+
+    def test_no_recorder(self):
+        with instrumentation.document("x") as record:
+            with instrumentation.stage("stage"):
+                instrumentation.count("counter", 1)
+        self.assertIsNone(record)
+
+        with open(ROOT + "cnn_0341.gold_conll") as f:
+            self.assertEqual(339, len(mentions.get_mention_pairs(f.readlines())))
+
+    def test_json_lines_sink(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            sink = instrumentation.JsonLinesSink(os.path.join(tmp, "records.jsonl"))
+            with instrumentation.recording(instrumentation.Recorder(sink)):
+                for name in ["a", "b"]:
+                    with instrumentation.document(name):
+                        instrumentation.count("mentions", 2)
+            sink.close()
+
+            with open(os.path.join(tmp, "records.jsonl")) as f:
+                records = [json.loads(line) for line in f]
+        self.assertListEqual(["a", "b"], [r["document"] for r in records])
+        self.assertEqual(2, records[1]["counters"]["mentions"])
+
+    def test_set_progress(self):
+        instrumentation.set_progress(False)
+        try:
+            self.assertTrue(instrumentation.progress(range(3), desc="x").disable)
+        finally:
+            instrumentation.set_progress(True)
+        self.assertFalse(instrumentation.progress(range(3), desc="x").disable)
+
+
+if __name__ == '__main__':
+    unittest.main()
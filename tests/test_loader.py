@@ -1,4 +1,5 @@
 import os
+import tempfile
 import unittest
 
 import numpy as np
@@ -6,6 +7,8 @@ import numpy as np
 from boilerplate import features
 from boilerplate import loader as ldr
 from boilerplate import mentions
+from boilerplate import outputs
+from boilerplate import saver
 from boilerplate.mentions_custom import increment_mention, increment_mention_pair
 
 ROOT_PATH = "tests/"
@@ -43,6 +46,35 @@ class LoaderTestCase(unittest.TestCase):
         os.unlink(TEST_FILE + "_in")
         os.unlink(TEST_FILE + "_out")
 
+    def test_process_dir_resume(self):
+        calls = []
+
+        def callback(path):
+            calls.append(path)
+            return [[1, 2, 3, 4, 0.5]], [[1]], "bn/cnn/03/cnn_0341"
+
+        with tempfile.TemporaryDirectory() as out:
+            ldr.process_dir(ROOT_PATH, out, callback, resume=True)
+            self.assertEqual(1, len(calls))
+            self.assertTrue(os.path.isfile(os.path.join(out, "cnn_0341.gold_conll_in")))
+            self.assertFalse([f for f in os.listdir(out) if f.endswith(outputs.TMP_SUFFIX)])
+
+            # Second run finds the file in the journal and skips it
+            ldr.process_dir(ROOT_PATH, out, callback, resume=True)
+            self.assertEqual(1, len(calls))
+            self.assertIn("cnn_0341.gold_conll", outputs.read_journal(out))
+
+            # Without resume everything is processed again
+            ldr.process_dir(ROOT_PATH, out, callback)
+            self.assertEqual(2, len(calls))
+
+    def test_process_dir_templates(self):
+        with tempfile.TemporaryDirectory() as out:
+            ldr.process_dir(ROOT_PATH, out, lambda p: ([[1, 2, 3, 4, 0.5]], [[1]], "bn/cnn/03/cnn_0341"),
+                            save_templates=True)
+            template = saver.load_template(out, "cnn_0341.gold_conll" + saver.TEMPLATE_SUFFIX)
+            self.assertEqual(356, template["n_lines"])
+
     def test_train_file_to_list(self):
         lines = ldr.train_file_to_list(TEST_FILE)
         self.assertEqual(356, len(lines))
@@ -73,6 +73,91 @@ class MentionsTestCase(unittest.TestCase):
         expected = ["embarrassment", "."]
         self.assertListEqual(expected, m._get_next_words(self.lines, 352))
 
+    def test_compact_mentions(self):
+        def fill(mention):
+            mention.head_word = mention.last_word
+
+        regular = m.build_mention_list(self.lines, fill)
+        compact = m.build_mention_list(self.lines, fill, compact=True)
+        self.assertEqual(len(regular), len(compact))
+        for r, c in zip(regular, compact):
+            self.assertIsInstance(c, m.CompactMention)
+            for attribute in ["words", "mention", "mention_id", "doc_id", "first_word", "last_word", "start_pos",
+                              "end_pos", "mention_start", "mention_end", "pre_words", "next_words",
+                              "mention_sentence", "speaker", "contained", "overlap", "index", "mention_position",
+                              "head_word"]:
+                self.assertEqual(getattr(r, attribute), getattr(c, attribute), attribute)
+
+        c = compact[0]
+        c.set_seq_id("tree", 3)
+        self.assertEqual(3, c.get_seq_id("tree"))
+        self.assertIs(compact[0].tokens, compact[1].tokens)
+        self.assertIs(c.mention_sentence, compact[1].mention_sentence)  # Built once per sentence
+
+    def test_lazy_attributes(self):
+        lazy = m.build_mention_list(self.lines)
+        self.assertNotIn("pre_words", vars(lazy[3]))
+        self.assertListEqual(m._get_preceding_words(self.lines, lazy[3].start_pos), lazy[3].pre_words)
+        self.assertIn("pre_words", vars(lazy[3]))  # Cached
+        self.assertEqual(m._mention_sentence(self.lines, lazy[3].start_pos), lazy[3].mention_sentence)
+
+        eager = m.build_mention_list(self.lines, attributes={"next_words"})
+        self.assertIn("next_words", vars(eager[3]))
+        self.assertNotIn("mention_sentence", vars(eager[3]))
+
+        with self.assertRaises(AttributeError):
+            _ = m.Mention("0_1", ["a"], 1, 1).pre_words
+
+    def test_requires(self):
+        @m.requires("pre_words", "head_word")
+        def make_vectors(pairs, mapper=None, train_list=None):
+            return [], []
+
+        self.assertEqual({"pre_words", "head_word"}, make_vectors.mention_attributes)
+
+    def test_get_mention_pairs_compact(self):
+        pairs = m.get_mention_pairs(self.lines, compact=True)
+        self.assertEqual(339, len(pairs))
+        self.assertListEqual([p.get_info_vector() for p in m.get_mention_pairs(self.lines)],
+                             [p.get_info_vector() for p in pairs])
+
+    def test_batch_hooks(self):
+        calls = []
+
+        @m.batch_hook
+        def increment_mentions(mention_list, train_list):
+            calls.append(len(mention_list))
+            return {"head_word": [x.last_word for x in mention_list]}
+
+        @m.batch_hook
+        def increment_mention_pairs(batch, train_list):
+            index = batch.mention_column("index")
+            return {"distance": index[batch.i] - index[batch.j]}
+
+        def increment_mention(mention):
+            mention.head_word = mention.last_word
+
+        def increment_mention_pair(pair, train_list):
+            pair.distance = pair.mention1.index - pair.mention2.index
+
+        batch = m.get_mention_pairs(self.lines, increment_mentions, increment_mention_pairs)
+        single = m.get_mention_pairs(self.lines, increment_mention, increment_mention_pair)
+        self.assertEqual(1, len(calls))
+        self.assertListEqual([(p.mention1.head_word, p.distance) for p in single],
+                             [(p.mention1.head_word, p.distance) for p in batch])
+        self.assertIsInstance(batch[0].distance, int)
+
+        adapted = m.get_mention_pairs(self.lines, m.batch_mentions(increment_mention),
+                                      m.batch_pairs(increment_mention_pair), compact=True)
+        self.assertListEqual([p.distance for p in single], [p.distance for p in adapted])
+
+        @m.batch_hook
+        def wrong_size(mention_list, train_list):
+            return {"head_word": []}
+
+        with self.assertRaises(ValueError):
+            m.build_mention_list(self.lines, wrong_size)
+
 
 if __name__ == '__main__':
     unittest.main()
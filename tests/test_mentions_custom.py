@@ -1,6 +1,7 @@
 import unittest
 
 import boilerplate.mentions_custom as mc
+from boilerplate import mentions
 
 
 class MyTestCase(unittest.TestCase):
@@ -14,6 +15,18 @@ class MyTestCase(unittest.TestCase):
         tp = mc._mention_type(doc, mention)
         self.assertListEqual([0, 0, 1, 0], list(tp))
 
+    def test_batch_hooks(self):
+        with open("tests/cnn_0341.gold_conll") as f:
+            lines = f.readlines()
+        single = mentions.get_mention_pairs(lines, mc.increment_mention, mc.increment_mention_pair)
+        batch = mentions.get_mention_pairs(lines, mc.increment_mentions, mc.increment_mention_pairs)
+        attributes = ["head_word", "mention_type", "mention_length"]
+        self.assertListEqual([[getattr(p.mention1, a) for a in attributes] for p in single],
+                             [[getattr(p.mention1, a) for a in attributes] for p in batch])
+        attributes = ["sentence_dist_count", "mention_dist_count", "head_match"]
+        self.assertListEqual([[getattr(p, a) for a in attributes] for p in single],
+                             [[getattr(p, a) for a in attributes] for p in batch])
+
 
 if __name__ == '__main__':
     unittest.main()
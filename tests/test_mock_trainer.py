@@ -26,12 +26,31 @@ class MockTrainerTestCase(unittest.TestCase):
         os.unlink("{}/cnn_0341.gold_conll_in".format(ROOT))
         os.unlink("{}/cnn_0341.gold_conll_out".format(ROOT))
 
+    def test_cluster_pairs(self):
+        # Chain A-B, C-B, C-D must end up in a single cluster
+        pair_info = [[1, 1, 2, 2], [3, 3, 2, 2], [3, 3, 4, 4], [5, 5, 6, 6], [7, 7, 8, 8]]
+        predictions = [0.9, 0.8, 0.7, 0.6, 0.1]
+
+        received = mock_trainer.cluster_pairs(pair_info, predictions)
+        self.assertListEqual([[(1, 1), (2, 2), (3, 3), (4, 4)], [(5, 5), (6, 6)]], received)
+
+        received = mock_trainer.cluster_pairs(pair_info, predictions, threshold=0.75)
+        self.assertListEqual([[(1, 1), (2, 2), (3, 3)]], received)
+
+    def test_predict_arrays(self):
+        doc = mock_trainer.predict_arrays("X", [[1, 1, 2, 3], [1, 1, 2, 2]], [1, 1])
+
+        self.assertEqual(1, len(doc.clusters))
+        self.assertDictEqual({1: [1], 2: [2, 3]}, doc.clusters[0])
+
     def test_create_document(self):
-        mapping = {(1, 2): [[(3, 4), (5, 6)]], (7, 8): [[(9, 10), (11, 12)]]}
+        mapping = {(1, 2): [(3, 4), (5, 6)], (7, 8): [(7, 10), (11, 12)]}
         doc = mock_trainer._create_document("X", mapping)
 
         self.assertEqual("X", doc.name)
         self.assertEqual(2, len(doc.clusters))
+        self.assertDictEqual({1: [2], 3: [4], 5: [6]}, doc.clusters[0])
+        self.assertDictEqual({7: [8, 10], 11: [12]}, doc.clusters[1])  # Mentions with the same start are kept
 
 
 if __name__ == '__main__':
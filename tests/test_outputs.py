@@ -0,0 +1,48 @@
+import os
+import tempfile
+import unittest
+
+from boilerplate import outputs
+
+
+class OutputsTestCase(unittest.TestCase):
+    def test_atomic_open(self):
+        with tempfile.TemporaryDirectory() as out:
+            file_path = os.path.join(out, "file")
+            with outputs.atomic_open(file_path) as f:
+                f.write("complete")
+
+            with self.assertRaises(RuntimeError):
+                with outputs.atomic_open(file_path) as f:
+                    f.write("trunc")
+                    raise RuntimeError()
+
+            with open(file_path) as f:
+                self.assertEqual("complete", f.read())
+            self.assertListEqual(["file"], os.listdir(out))
+
+            # Two writers of the same file do not share the temporary file
+            with outputs.atomic_open(file_path) as first:
+                with outputs.atomic_open(file_path) as second:
+                    first.write("first")
+                    second.write("second")
+            with open(file_path) as f:
+                self.assertEqual("first", f.read())
+            self.assertListEqual(["file"], os.listdir(out))
+
+    def test_journal(self):
+        with tempfile.TemporaryDirectory() as out:
+            self.assertDictEqual({}, outputs.read_journal(out))
+            with outputs.open_journal(out) as journal:
+                outputs.write_journal(journal, {"source": "a", "files": ["a_in"]})
+                outputs.write_journal(journal, {"source": "b", "files": []})
+                journal.write('{"source": "c", "fi')  # Crash while writing
+            self.assertListEqual(["a", "b"], list(outputs.read_journal(out)))
+
+            with outputs.open_journal(out, truncate=True):
+                pass
+            self.assertDictEqual({}, outputs.read_journal(out))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from boilerplate import loader as ldr
+from boilerplate import packed
+
+ROOT = "tests/"
+
+
+class PackedTestCase(unittest.TestCase):
+    def test_write_read(self):
+        with tempfile.TemporaryDirectory() as out:
+            with packed.PackedWriter(out) as writer:
+                writer.save("a_conll", [[1, 2, 3, 4, 0.5, 1.5], [5, 6, 7, 8, 2.5, 3.5]], [[1], [0]], "doc_a")
+                writer.save("b_conll", [[9, 9, 9, 9, 4.5, 5.5]], [[1]], "doc_b")
+                writer.save("a_conll", [[0, 0, 0, 0, 0, 0]], [[0]], "doc_a")  # Already written
+
+            reader = packed.PackedReader(out)
+            self.assertEqual(3, len(reader))
+            self.assertListEqual(["doc_a", "doc_b"], reader.names())
+
+            x, y, info = reader.document("doc_b")
+            self.assertListEqual([[4.5, 5.5]], x.tolist())
+            self.assertListEqual([1], y.tolist())
+            self.assertListEqual([[9, 9, 9, 9]], info.tolist())
+
+    def test_recover_after_crash(self):
+        with tempfile.TemporaryDirectory() as out:
+            with packed.PackedWriter(out) as writer:
+                writer.save("a_conll", [[1, 2, 3, 4, 0.5]], [[1]], "doc_a")
+
+            # Simulates a crash while the next document was being written
+            with open(os.path.join(out, packed.FEATURES_FILE_NAME), "ab") as f:
+                f.write(b"garbage")
+            with open(os.path.join(out, packed.INDEX_FILE_NAME), "a") as f:
+                f.write('{"name": "do')
+
+            with packed.PackedWriter(out) as writer:
+                writer.save("b_conll", [[5, 6, 7, 8, 1.5]], [[0]], "doc_b")
+
+            reader = packed.PackedReader(out)
+            self.assertListEqual(["doc_a", "doc_b"], reader.names())
+            np.testing.assert_array_equal([[0.5], [1.5]], reader.features)
+
+    def test_append(self):
+        with tempfile.TemporaryDirectory() as a, tempfile.TemporaryDirectory() as b, \
+                tempfile.TemporaryDirectory() as out:
+            with packed.PackedWriter(a) as writer:
+                writer.save("a_conll", [[1, 2, 3, 4, 0.5, 1.5], [5, 6, 7, 8, 2.5, 3.5]], [[1], [0]], "doc_a")
+            with packed.PackedWriter(b) as writer:
+                writer.save("b_conll", [[9, 9, 9, 9, 4.5, 5.5]], [[1]], "doc_b")
+
+            with packed.PackedWriter(out) as writer:
+                writer.append(a)
+                self.assertListEqual([{"name": "doc_b", "source": "b_conll", "start": 2, "stop": 3}],
+                                     writer.append(b))
+                with self.assertRaises(ValueError):
+                    writer.append(a)  # Already in the dataset
+
+            reader = packed.PackedReader(out)
+            self.assertListEqual(["doc_a", "doc_b"], reader.names())
+            x, y, info = reader.document("doc_b")
+            self.assertListEqual([[4.5, 5.5]], x.tolist())
+            self.assertListEqual([1], y.tolist())
+            self.assertListEqual([[9, 9, 9, 9]], info.tolist())
+
+            with tempfile.TemporaryDirectory() as other:
+                with packed.PackedWriter(other) as writer:
+                    writer.save("d_conll", [[1, 1, 1, 1, 0.5]], [[1]], "doc_d")
+                with packed.PackedWriter(out) as writer, self.assertRaises(ValueError):
+                    writer.append(other)  # Different number of features
+
+    def test_process_dir(self):
+        with tempfile.TemporaryDirectory() as out:
+            with packed.PackedWriter(out) as writer:
+                ldr.process_dir(ROOT, out, lambda p: ([[1, 2, 3, 4, 0.5]], [[1]], "bn/cnn/03/cnn_0341"),
+                                writer=writer)
+
+            self.assertFalse(os.path.isfile(os.path.join(out, "cnn_0341.gold_conll_in")))
+            self.assertListEqual(["bn/cnn/03/cnn_0341"], packed.PackedReader(out).names())
+
+    def test_pack_vectors_dir(self):
+        with tempfile.TemporaryDirectory() as csv_dir, tempfile.TemporaryDirectory() as out:
+            writer = ldr.CsvWriter(csv_dir)
+            writer.save("a_conll", [[1, 2, 3, 4, 0.5, 1.5]], [[1]], "doc_a")
+            packed.pack_vectors_dir(csv_dir, out)
+
+            x, y, info = packed.PackedReader(out).document("doc_a")
+            self.assertListEqual([[0.5, 1.5]], x.tolist())
+            self.assertListEqual([[1, 2, 3, 4]], info.tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import time
+import unittest
+
+from boilerplate import instrumentation
+from boilerplate import loader
+from boilerplate import outputs
+from boilerplate import pipeline
+from boilerplate import testing
+
+
+class SlowWriter(loader.CsvWriter):
+    def save(self, file_name, v_in, v_out, doc_name):
+        time.sleep(0.05)
+        return super().save(file_name, v_in, v_out, doc_name)
+
+
+class PipelineTestCase(testing.CorpusTestCase):
+    DOCUMENTS = 6
+
+    def test_same_output_as_process_dir(self):
+        sequential = os.path.join(self.tmp.name, "sequential")
+        pipelined = os.path.join(self.tmp.name, "pipelined")
+        os.makedirs(sequential)
+        os.makedirs(pipelined)
+        loader.process_dir(self.corpus, sequential,
+                           lambda p: testing.stub_lines_to_vectors(loader.train_file_to_list(p)),
+                           save_templates=True)
+        stats = pipeline.process_dir(self.corpus, pipelined, testing.stub_lines_to_vectors, workers=3, queue_size=2,
+                                     save_templates=True)
+
+        self.assertDictEqual(testing.read_outputs(sequential), testing.read_outputs(pipelined))
+        self.assertEqual(18, len(testing.read_outputs(pipelined)))
+        for stage in pipeline.STAGES:
+            self.assertEqual(6, stats[stage]["items"])
+            self.assertLessEqual(stats[stage]["utilization"], 1.)
+        self.assertEqual(3, stats["work"]["threads"])
+        self.assertEqual(len(pipeline.STAGES), len(pipeline.utilization_report(stats)))
+
+    def test_backpressure_and_records(self):
+        out = os.path.join(self.tmp.name, "out")
+        sink = instrumentation.MemorySink()
+        with instrumentation.recording(instrumentation.Recorder(sink)):
+            stats = pipeline.process_dir(self.corpus, out, testing.stub_lines_to_vectors, workers=2, queue_size=1,
+                                         resume=True, writer=SlowWriter(out))
+        self.assertGreater(stats["write"]["utilization"], stats["read"]["utilization"])
+        self.assertGreater(stats["work"]["blocked_seconds"], 0)
+
+        self.assertEqual(6, len(sink.records))
+        for record in sink.records:
+            self.assertTrue({"read", "mentions", "pairs", "features", "write"} <= set(record["stages"]))
+            self.assertNotIn("_start", record)
+        self.assertEqual(6, len(outputs.read_journal(out)))
+
+        # Everything is in the journal
+        stats = pipeline.process_dir(self.corpus, out, testing.stub_lines_to_vectors, resume=True)
+        self.assertEqual(0, stats["read"]["items"])
+
+    def test_errors_are_raised(self):
+        def failing(train_list):
+            raise RuntimeError("failed")
+
+        with self.assertRaises(RuntimeError):
+            pipeline.process_dir(self.corpus, os.path.join(self.tmp.name, "out"), failing, queue_size=1)
+
+    def test_transform_conll_to_vectors(self):
+        out = os.path.join(self.tmp.name, "out")
+        stats = loader.transform_conll_to_vectors(self.corpus, out, testing.stub_increment_mention,
+                                                  testing.stub_increment_mention_pair, testing.make_stub_vectors,
+                                                  workers=2)
+        self.assertEqual(6, stats["write"]["items"])
+        self.assertEqual(12, len(testing.read_outputs(out)))
+
+
+if __name__ == '__main__':
+    unittest.main()
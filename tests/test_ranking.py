@@ -0,0 +1,81 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from boilerplate import features
+from boilerplate import loader as ldr
+from boilerplate import mentions
+from boilerplate import outputs
+from boilerplate import ranking
+from boilerplate import sampling
+from boilerplate import testing
+
+ROOT = "tests/"
+
+
+class RankingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.lines = ldr.train_file_to_list("{}/cnn_0341.gold_conll".format(ROOT))
+        self.mentions = mentions.build_mention_list(self.lines, testing.stub_increment_mention)
+        self.pairs = mentions.pair_mentions(self.mentions, self.lines, testing.stub_increment_mention_pair)
+
+    def test_build(self):
+        vectors = ranking.build(self.mentions, self.pairs,
+                                *testing.make_stub_ranking_vectors(self.mentions, self.pairs, self.lines))
+        self.assertEqual(len(self.pairs), len(vectors))
+        self.assertEqual(len(self.mentions), len(vectors.mentions))
+        self.assertEqual(len(self.mentions) + 1, len(vectors.offsets))
+        self.assertEqual(0, vectors.offsets[1])  # First mention has no antecedents
+
+        i, j = vectors.pair_indexes()
+        self.assertTrue(np.all(j < i))
+        self.assertListEqual([p.coref + 0 for p in self.pairs], vectors.labels.tolist())
+        self.assertListEqual([p.get_info_vector() for p in self.pairs],
+                             np.hstack([vectors.mention_info[i], vectors.mention_info[j]]).tolist())
+
+        antecedents, _, labels = vectors.candidates(5)
+        self.assertEqual(len(antecedents), vectors.offsets[6] - vectors.offsets[5])
+        self.assertEqual(len(labels), len(antecedents))
+
+    def test_same_features_as_pair_layout(self):
+        mapper = features.FeatureMapper(testing.stub_embedding, self.lines)
+        legacy = np.array(mapper.make_input_vector(self.pairs)).reshape((len(self.pairs), -1))
+        vectors = ranking.build(self.mentions, self.pairs, *features.make_ranking_vectors(self.mentions, self.pairs,
+                                                                                          mapper))
+
+        size = mapper.VECTOR_SIZE
+        width = vectors.mentions.shape[1] - size
+        # Pair layout: mention avg, antecedent avg, mention features, antecedent features, pair features
+        reordered = np.hstack([legacy[:, :size], legacy[:, 2 * size:2 * size + width],
+                               legacy[:, size:2 * size], legacy[:, 2 * size + width:2 * size + 2 * width],
+                               legacy[:, 2 * size + 2 * width:]])
+        np.testing.assert_allclose(reordered, vectors.to_pair_rows())
+        self.assertLess(vectors.mentions.size + vectors.pair_features.size, legacy.size / 5)
+
+    def test_sampler(self):
+        sampler = sampling.Sampler([sampling.ClosestK(3)])
+        pairs = mentions.pair_mentions(self.mentions, self.lines, testing.stub_increment_mention_pair,
+                                       sampler=sampler)
+        vectors = ranking.build(self.mentions, pairs, *testing.make_stub_ranking_vectors(self.mentions, pairs,
+                                                                                         self.lines))
+        self.assertLessEqual(np.diff(vectors.offsets).max(), 3)
+
+    def test_transform_conll_to_ranking(self):
+        with tempfile.TemporaryDirectory() as out:
+            ranking.transform_conll_to_ranking(ROOT, out, testing.stub_increment_mention,
+                                               testing.stub_increment_mention_pair, testing.make_stub_ranking_vectors,
+                                               resume=True)
+            self.assertListEqual(["cnn_0341.gold_conll" + ranking.FILE_SUFFIX],
+                                 [f for f in os.listdir(out) if not f.startswith(".")])
+
+            vectors, doc_name = ranking.load(os.path.join(out, "cnn_0341.gold_conll" + ranking.FILE_SUFFIX))
+            self.assertEqual("bn/cnn/03/cnn_0341", doc_name)
+            self.assertEqual(len(self.pairs), len(vectors))
+            self.assertEqual(np.float32, vectors.mentions.dtype)
+            self.assertEqual(len(self.pairs), outputs.read_journal(out)["cnn_0341.gold_conll"]["rows"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+
+import numpy as np
+
+from boilerplate import mentions
+from boilerplate import sampling
+from boilerplate import testing
+
+ROOT = "tests/"
+
+
+class SamplingTestCase(unittest.TestCase):
+    def setUp(self):
+        with open("{}/cnn_0341.gold_conll".format(ROOT)) as f:
+            self.lines = f.readlines()
+        self.mentions = mentions.build_mention_list(self.lines)
+        self.arrays = sampling.MentionArrays(self.mentions, self.lines)
+
+    def test_all_candidates(self):
+        i, j = sampling.Sampler([])(self.mentions, self.lines)
+        self.assertEqual(48 * 47 // 2, len(i))
+        self.assertTrue(np.all(j < i))
+
+    def test_closest_k(self):
+        i, j = sampling.Sampler([sampling.ClosestK(3)])(self.mentions, self.lines)
+        self.assertEqual(0 + 1 + 2 + 3 * 45, len(i))
+        self.assertTrue(np.all((i - j >= 1) & (i - j <= 3)))
+        self.assertListEqual([(1, 0), (2, 0), (2, 1)], list(zip(i[:3].tolist(), j[:3].tolist())))
+
+        # Same as filtering all candidates
+        filtered = sampling.ClosestK(3)(self.arrays, *sampling.all_candidates(self.arrays))
+        self.assertEqual(len(i), len(filtered[0]))
+
+    def test_sentence_window(self):
+        i, j = sampling.Sampler([sampling.SentenceWindow(0)])(self.mentions, self.lines)
+        self.assertTrue(len(i) > 0)
+        np.testing.assert_array_equal(self.arrays.sentence[i], self.arrays.sentence[j])
+        self.assertEqual(0, self.arrays.sentence[0])
+
+    def test_pronoun_window(self):
+        i, j = sampling.Sampler([sampling.PronounWindow(0)])(self.mentions, self.lines)
+        far = self.arrays.sentence[i] != self.arrays.sentence[j]
+        self.assertFalse(np.any(self.arrays.is_pronoun[i[far]]))
+        self.assertTrue(np.any(self.arrays.is_pronoun))
+
+    def test_random_negatives(self):
+        sampler = sampling.Sampler([sampling.RandomNegatives(2, seed=1)])
+        i, j = sampler(self.mentions, self.lines)
+        positive = self.arrays.cluster[i] == self.arrays.cluster[j]
+        self.assertEqual(2 * positive.sum(), (~positive).sum())
+        self.assertEqual(len(sampling.positive_pairs(self.arrays)[0]), positive.sum())
+
+        i2, j2 = sampler(self.mentions, self.lines)
+        np.testing.assert_array_equal(i, i2)
+        np.testing.assert_array_equal(j, j2)
+
+    def test_keep_positives(self):
+        i, j = sampling.Sampler([sampling.ClosestK(1)], keep_positives=True)(self.mentions, self.lines)
+        positive = self.arrays.cluster[i] == self.arrays.cluster[j]
+        self.assertEqual(len(sampling.positive_pairs(self.arrays)[0]), positive.sum())
+        self.assertEqual(len(set(zip(i.tolist(), j.tolist()))), len(i))
+
+    def test_coarse_pruning(self):
+        pruning = sampling.CoarsePruning(testing.stub_embedding, 3, keep_gold=False)
+        i, j = sampling.Sampler([pruning])(self.mentions, self.lines)
+        self.assertEqual(0 + 1 + 2 + 3 * 45, len(i))
+
+        # The kept antecedents are the best scored ones
+        vectors = pruning.vectors(self.mentions)
+        np.testing.assert_allclose(1., np.linalg.norm(vectors, axis=1))
+        for mention in (3, 20, 47):
+            scores = vectors[:mention] @ vectors[mention]
+            self.assertSetEqual(set(np.argsort(-scores)[:3].tolist()), set(j[i == mention].tolist()))
+
+        # The gold antecedents are kept by default, without keep_positives
+        pruned = set(zip(i.tolist(), j.tolist()))
+        i, j = sampling.Sampler([sampling.CoarsePruning(testing.stub_embedding, 3)])(self.mentions, self.lines)
+        positive = self.arrays.cluster[i] == self.arrays.cluster[j]
+        self.assertEqual(len(sampling.positive_pairs(self.arrays)[0]), positive.sum())
+        self.assertLessEqual(pruned, set(zip(i.tolist(), j.tolist())))
+        self.assertLessEqual(set(zip(i[~positive].tolist(), j[~positive].tolist())), pruned)
+
+        # Words without vectors
+        i, j = sampling.Sampler([sampling.CoarsePruning({}.__getitem__, 2, keep_gold=False)])(self.mentions,
+                                                                                              self.lines)
+        self.assertEqual(1 + 2 * 46, len(i))
+
+    def test_coarse_pruning_normalization(self):
+        words = []
+
+        def word2vec(word):
+            words.append(word)
+            return testing.stub_embedding(word)
+
+        # Same words as features.FeatureMapper: lowercase, without punctuation unless it is a single character
+        sampling.CoarsePruning(word2vec, 3)._average(["U.S.", "Hello", ",", "hello"], {})
+        self.assertListEqual(["us", "hello", ","], words)
+
+    def test_get_mention_pairs(self):
+        pairs = mentions.get_mention_pairs(self.lines, sampler=sampling.Sampler([sampling.ClosestK(2)]))
+        self.assertEqual(1 + 2 * 46, len(pairs))
+        self.assertIs(self.mentions[1].__class__, pairs[0].mention1.__class__)
+        self.assertEqual((pairs[0].mention1.start_pos, pairs[0].mention2.start_pos),
+                         (self.mentions[1].start_pos, self.mentions[0].start_pos))
+
+
+if __name__ == '__main__':
+    unittest.main()
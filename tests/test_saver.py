@@ -1,9 +1,12 @@
+import contextlib
+import io
 import os
+import tempfile
 import unittest
 
 from boilerplate import saver as s
 
-ROOT = "../tests/"
+ROOT = os.path.dirname(os.path.abspath(__file__))
 
 
 class MyTestCase(unittest.TestCase):
@@ -26,13 +29,23 @@ class MyTestCase(unittest.TestCase):
 
         self.assertListEqual(expected, received)
 
+        # Any order gives the same result
+        received = [doc._get_line_operations(i + 1) for i in reversed(range(len(expected)))]
+        self.assertListEqual(list(reversed(expected)), received)
+        self.assertEqual("-", doc._get_line_operations(100))
+
+        # Adding a cluster after a lookup
+        doc.add_cluster({8: [8]})
+        self.assertEqual("(3)", doc._get_line_operations(8))
+
     def test_save_document(self):
         doc = s.Document("cnn_0341", 0)
         doc.add_cluster({1: [2], 4: [4], 5: [10]})
         doc.add_cluster({4: [7]})
         s.save_document("{}/".format(ROOT), "./", doc)
         self.assertTrue(os.path.isfile("./cnn_0341.output"))
-        expected = ["#begin document (bn/cnn/03/cnn_0341); part 000", "cnn_0341 -", "cnn_0341 -", "cnn_0341 (1)|(2",
+        # Line 1 is the #begin line, so only the end of the cluster {1: [2]} is written
+        expected = ["#begin document (bn/cnn/03/cnn_0341); part 000", "cnn_0341 1)", "cnn_0341 -", "cnn_0341 (1)|(2",
                     "cnn_0341 (1", "cnn_0341 -", "cnn_0341 2)", "cnn_0341 -", "cnn_0341 -", "cnn_0341 1)", ]
 
         with open("./cnn_0341.output", "r") as f:
@@ -42,5 +55,79 @@ class MyTestCase(unittest.TestCase):
 
         os.unlink("./cnn_0341.output")
 
+    def test_save_documents(self):
+        original = ["#begin document (a); part 000\n", "a 0 0 x\n", "a 0 1 y\n", "\n", "#end document\n",
+                    "#begin document (b); part 000\n", "b 0 0 z\n", "#end document\n"]
+        doc_a = s.Document("a", 1)
+        doc_a.add_cluster({1: [2]})
+        doc_b = s.Document("b", 6)
+        doc_b.add_cluster({1: [1]})
+
+        calls = []
+        stdout = io.StringIO()
+        with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(stdout):
+            in_file = os.path.join(tmp, "in")
+            out_file = os.path.join(tmp, "out")
+            with open(in_file, "w") as f:
+                f.writelines(original)
+            s.save_documents(in_file, out_file, [doc_a, doc_b], progress=lambda *args: calls.append(args))
+            with open(out_file) as f:
+                lines = f.read().splitlines()
+
+        expected = ["#begin document (a); part 000", "a (1", "a 1)", "", "#end document",
+                    "#begin document (b); part 000", "b (1)", "#end document"]
+        self.assertListEqual(expected, lines)
+        self.assertListEqual([("a", 1), ("b", 2)], calls)
+        self.assertEqual("", stdout.getvalue())
+
+    def test_save_document_batch(self):
+        docs = []
+        for i in range(5):
+            doc = s.Document("cnn_0341", 0)
+            doc.add_cluster({i + 2: [i + 3]})
+            docs.append(doc)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertEqual(5, s.save_document_batch(ROOT, tmp, docs, output_file="all", max_workers=3))
+            with open(os.path.join(tmp, "all")) as f:
+                lines = f.read().splitlines()
+
+        expected = "".join(s.render_document(ROOT, d) for d in docs).splitlines()
+        self.assertListEqual(expected, lines)
+        self.assertEqual(5 * 356, len(lines))
+        self.assertEqual("cnn_0341 (1", lines[1])
+        self.assertEqual("cnn_0341 1)", lines[2])
+        self.assertEqual("cnn_0341 (1", lines[356 + 2])
+
+    def test_render_from_template(self):
+        with open(os.path.join(ROOT, "cnn_0341.gold_conll"), encoding="utf8") as f:
+            template = s.build_template(f.readlines())
+
+        self.assertEqual(356, template["n_lines"])
+        self.assertListEqual([[0, "bn/cnn/03/cnn_0341"]], template["documents"])
+
+        doc = s.Document("cnn_0341", 0)
+        doc.add_cluster({2: [11], 20: [21]})
+        doc.add_cluster({4: [4]})
+        self.assertEqual(s.render_document(ROOT, doc), s.render_from_template(template, [doc]))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            s.save_template(template, tmp, "cnn_0341" + s.TEMPLATE_SUFFIX)
+            self.assertDictEqual(template, s.load_template(tmp, "cnn_0341" + s.TEMPLATE_SUFFIX))
+            self.assertListEqual(["cnn_0341" + s.TEMPLATE_SUFFIX], os.listdir(tmp))
+
+    def test_first_line_idx(self):
+        with open(os.path.join(ROOT, "cnn_0341.gold_conll"), encoding="utf8") as f:
+            template = s.build_template(f.readlines())
+
+        # The lines of the clusters are counted from first_line_idx, with or without the template
+        doc = s.Document("cnn_0341", 1)
+        doc.add_cluster({1: [10]})
+        rendered = s.render_document(ROOT, doc)
+        self.assertEqual(rendered, s.render_from_template(template, [doc]))
+        lines = rendered.splitlines()
+        self.assertEqual("cnn_0341 (1", lines[1])
+        self.assertEqual("cnn_0341 1)", lines[10])
+
     if __name__ == '__main__':
         unittest.main()
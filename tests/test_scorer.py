@@ -0,0 +1,72 @@
+import unittest
+
+import numpy as np
+
+from boilerplate import mock_trainer
+from boilerplate import scorer
+from boilerplate.loader import train_file_to_list
+
+TEST_FILE = "tests/cnn_0341.gold_conll"
+
+
+class ScorerTestCase(unittest.TestCase):
+    def test_example(self):
+        # Example from Pradhan et al. (2014), Scoring Coreference Partitions of Predicted Mentions
+        key = [["a", "b", "c"], ["d", "e", "f", "g"]]
+        response = [["a", "b"], ["c", "d"], ["f", "g", "h", "i"]]
+        scores = scorer.evaluate(key, response)
+
+        self.assertAlmostEqual(0.4, scores["muc"].recall)
+        self.assertAlmostEqual(0.4, scores["muc"].precision)
+        self.assertAlmostEqual(35 / 84, scores["bcub"].recall)
+        self.assertAlmostEqual(0.5, scores["bcub"].precision)
+        self.assertAlmostEqual(0.65, scores["ceafe"].recall)
+        self.assertAlmostEqual(1.3 / 3, scores["ceafe"].precision)
+
+    def test_gold_file(self):
+        key = scorer.clusters_from_lines(train_file_to_list(TEST_FILE))
+        self.assertEqual(13, len(key))
+        self.assertIn((2, 11), key[0])
+
+        doc = mock_trainer._create_document_from_clusters("cnn_0341", key)
+        scores = scorer.evaluate(key, scorer.clusters_from_document(doc))
+        for metric in scorer.METRICS:
+            self.assertAlmostEqual(1., scores[metric].f1)
+        self.assertAlmostEqual(1., scorer.conll_f1(scores))
+
+        # Drops cluster 2 (3 mentions) and merges clusters 4 and 12 (2 mentions each). Expected values follow the
+        # definitions of the reference scorer: 48 key mentions in 13 clusters, 45 response mentions in 11 clusters
+        response = [c for n, c in enumerate(key) if n not in (2, 4, 12)] + [key[4] + key[12]]
+        doc = mock_trainer._create_document_from_clusters("cnn_0341", response)
+        scores = scorer.evaluate(key, scorer.clusters_from_document(doc))
+        expected = {"muc": (33 / 35, 33 / 34, 66 / 69),
+                    "bcub": (45 / 48, 43 / 45, 1290 / 1363),
+                    "ceafe": (32 / 39, 32 / 33, 8 / 9)}  # Similarity 10 + 2 * 2 / (2 + 4) for the merged cluster
+        for metric, (recall, precision, f1) in expected.items():
+            self.assertAlmostEqual(recall, scores[metric].recall, msg=metric)
+            self.assertAlmostEqual(precision, scores[metric].precision, msg=metric)
+            self.assertAlmostEqual(f1, scores[metric].f1, msg=metric)
+        self.assertAlmostEqual((66 / 69 + 1290 / 1363 + 8 / 9) / 3, scorer.conll_f1(scores))
+
+    def test_evaluate_documents(self):
+        key = [[(1, 1), (2, 2)]]
+        per_document, corpus = scorer.evaluate_documents([("a", key, key), ("b", key, [])])
+
+        self.assertAlmostEqual(1., per_document["a"]["muc"].f1)
+        self.assertAlmostEqual(0., per_document["b"]["muc"].recall)
+        self.assertAlmostEqual(0.5, corpus["bcub"].recall)
+        self.assertAlmostEqual(1., corpus["bcub"].precision)
+
+    def test_linear_assignment(self):
+        score = np.array([[1., 5., 0.], [4., 6., 0.]])
+        rows, cols = scorer._linear_assignment(score)
+        self.assertListEqual([0, 1], rows.tolist())
+        self.assertListEqual([1, 0], cols.tolist())
+
+        rows, cols = scorer._linear_assignment(score.T)
+        self.assertListEqual([0, 1], rows.tolist())
+        self.assertListEqual([1, 0], cols.tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import io
+import json
+import os
+import threading
+import time
+import unittest
+
+import numpy as np
+
+from boilerplate import loader
+from boilerplate import service
+from boilerplate import testing
+
+
+class ServiceTestCase(testing.CorpusTestCase):
+    DOCUMENTS = 3
+
+    def setUp(self):
+        super().setUp()
+        self.texts = []
+        for name, file_path, _ in loader._find_conll_files(self.corpus):
+            with open(file_path) as f:
+                self.texts.append(f.read())
+        self.service = service.FeaturizationService(testing.stub_increment_mention,
+                                                    testing.stub_increment_mention_pair,
+                                                    word2vec=testing.stub_embedding)
+
+    def test_featurize(self):
+        train_list = self.texts[0].splitlines(True)
+        v_in, v_out, doc_name = loader.lines_to_vectors(train_list, testing.stub_increment_mention,
+                                                        testing.stub_increment_mention_pair, testing.make_stub_vectors)
+        response = self.service.featurize(self.texts[0])
+
+        self.assertEqual(doc_name, response["document"])
+        self.assertEqual(len(v_in), len(response["pairs"]))
+        for row, (i, j), features_row in zip(v_in, response["pairs"], response["features"]):
+            # The loader adds the positions of both mentions before the features
+            self.assertListEqual(response["mentions"][i] + response["mentions"][j], list(row[:4]))
+            np.testing.assert_allclose(row[4:], features_row)
+        self.assertListEqual([int(v[0]) for v in v_out], response["labels"])
+        self.assertTrue({"mentions", "pairs", "features", "total"} <= set(response["seconds"]))
+
+    def test_serve_stream(self):
+        requests = [json.dumps({"id": n, "text": text}) for n, text in enumerate(self.texts)]
+        requests.append(json.dumps({"id": "bad", "text": None}))
+        f_out = io.StringIO()
+        self.service.serve_stream(io.StringIO("\n".join(requests) + "\n"), f_out, workers=2)
+
+        responses = {r["id"]: r for r in map(json.loads, f_out.getvalue().splitlines())}
+        self.assertEqual(len(self.texts) + 1, len(responses))
+        self.assertIn("error", responses["bad"])
+        for n, text in enumerate(self.texts):
+            expected = self.service.featurize(text)
+            np.testing.assert_allclose(expected["features"], responses[n]["features"])
+        stats = self.service.stats()
+        self.assertEqual(len(self.texts) + 1, stats["requests"])
+        self.assertEqual(1, stats["errors"])
+        self.assertGreater(stats["p50_seconds"], 0)
+
+    def test_requests_in_flight(self):
+        read = []
+        release = threading.Event()
+
+        def lines():
+            for n, text in enumerate(self.texts * 3):
+                read.append(n)
+                yield json.dumps({"id": n, "text": text}) + "\n"
+
+        def handle(line):
+            release.wait()
+            return json.dumps({"id": json.loads(line)["id"]})
+
+        self.service.handle = handle
+        f_out = io.StringIO()
+        thread = threading.Thread(target=self.service.serve_stream, args=(lines(), f_out, 2))
+        thread.start()
+        time.sleep(0.2)
+        self.assertEqual(3, len(read))  # Two requests in flight and one waiting to be submitted
+        release.set()
+        thread.join()
+        self.assertEqual(9, len(f_out.getvalue().splitlines()))
+
+    def test_word_vectors(self):
+        calls = []
+
+        def word2vec(word):
+            calls.append(word)
+            if word == "missing":
+                raise KeyError(word)
+            return len(word)
+
+        vectors = service._WordVectors(word2vec, max_size=2)
+        self.assertEqual(1, vectors("a"))
+        self.assertEqual(2, vectors("bb"))
+        self.assertEqual(1, vectors("a"))  # Kept, and now the most recently used
+        with self.assertRaises(KeyError):
+            vectors("missing")  # Drops bb
+        with self.assertRaises(KeyError):
+            vectors("missing")
+        self.assertListEqual(["a", "missing"], list(vectors.vectors))
+        vectors("bb")
+        self.assertListEqual(["a", "bb", "missing", "bb"], calls)
+
+    def test_unix_socket(self):
+        path = os.path.join(self.tmp.name, "service.sock")
+        responses = {}
+
+        def send(n):
+            with service.Client(path, timeout=30) as client:
+                responses[n] = [client.featurize(text)["document"] for text in self.texts]
+
+        with self.service.unix_server(path) as server:
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            try:
+                clients = [threading.Thread(target=send, args=(n,)) for n in range(3)]
+                for client in clients:
+                    client.start()
+                for client in clients:
+                    client.join()
+                with service.Client(path, timeout=30) as client:
+                    with self.assertRaises(RuntimeError):
+                        client.featurize("not a conll document")
+            finally:
+                server.shutdown()
+
+        expected = [loader.get_document_name(text.splitlines(True)) for text in self.texts]
+        self.assertDictEqual({n: expected for n in range(3)}, responses)
+        self.assertEqual(10, self.service.stats()["requests"])
+
+
+if __name__ == '__main__':
+    unittest.main()
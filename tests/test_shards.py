@@ -0,0 +1,88 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from boilerplate import loader as ldr
+from boilerplate import packed
+from boilerplate import shards
+
+ROOT = "tests/"
+TEST_FILE = ROOT + "cnn_0341.gold_conll"
+
+
+class ShardsTestCase(unittest.TestCase):
+    def test_partition(self):
+        files = [("a", 100), ("b", 60), ("c", 50), ("d", 10), ("e", 40)]
+        received = shards.partition(files, 2)
+
+        self.assertListEqual([["a", "e"], ["b", "c", "d"]], received)
+        # Order of discovery must not matter
+        self.assertListEqual(received, shards.partition(list(reversed(files)), 2))
+
+    def test_select_shard(self):
+        files = [("a", 1), ("b", 1), ("c", 1)]
+        selected = [shards.select_shard(files, i, 3) for i in range(3)]
+        self.assertSetEqual({"a", "b", "c"}, set().union(*selected))
+
+        with self.assertRaises(ValueError):
+            shards.select_shard(files, 3, 3)
+
+    def test_merge_shards(self):
+        def callback(path):
+            return [[1, 2, 3, 4, 0.5]], [[1]], os.path.basename(path)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            corpus = os.path.join(tmp, "corpus")
+            for folder, name in [("a", "x.gold_conll"), ("b", "y.gold_conll"), ("b", "z.gold_conll")]:
+                os.makedirs(os.path.join(corpus, folder), exist_ok=True)
+                shutil.copyfile(TEST_FILE, os.path.join(corpus, folder, name))
+
+            shard_dirs = [os.path.join(tmp, "shard{}".format(i)) for i in range(2)]
+            for i, shard_dir in enumerate(shard_dirs):
+                ldr.process_dir(corpus, shard_dir, callback, shard_index=i, num_shards=2)
+
+            merged = os.path.join(tmp, "merged")
+            index = shards.merge_shards(shard_dirs, merged)
+
+            self.assertEqual(2, index["num_shards"])
+            self.assertListEqual(["a/x.gold_conll", "b/y.gold_conll", "b/z.gold_conll"],
+                                 [e["source"] for e in index["documents"]])
+            self.assertTrue(os.path.isfile(os.path.join(merged, "y.gold_conll_out")))
+            self.assertDictEqual(index, shards.load_index(merged))
+
+    def test_merge_packed_shards(self):
+        def callback(path):
+            return [[1, 2, 3, 4, len(path)], [5, 6, 7, 8, 0.5]], [[1], [0]], os.path.basename(path)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            corpus = os.path.join(tmp, "corpus")
+            os.makedirs(corpus)
+            for name in ["x.gold_conll", "y.gold_conll", "z.gold_conll"]:
+                shutil.copyfile(TEST_FILE, os.path.join(corpus, name))
+
+            shard_dirs = [os.path.join(tmp, "shard{}".format(i)) for i in range(2)]
+            for i, shard_dir in enumerate(shard_dirs):
+                with packed.PackedWriter(shard_dir) as writer:
+                    ldr.process_dir(corpus, shard_dir, callback, shard_index=i, num_shards=2, writer=writer)
+
+            merged = os.path.join(tmp, "merged")
+            index = shards.merge_shards(shard_dirs, merged)
+            self.assertEqual(3, len(index["documents"]))
+
+            reader = packed.PackedReader(merged)
+            self.assertEqual(6, len(reader))
+            self.assertListEqual(["x.gold_conll", "y.gold_conll", "z.gold_conll"], sorted(reader.names()))
+            for name in reader.names():
+                x, y, info = reader.document(name)
+                self.assertListEqual([[len(os.path.join(corpus, name))], [0.5]], x.tolist())
+                self.assertListEqual([1, 0], y.tolist())
+                self.assertListEqual([[1, 2, 3, 4], [5, 6, 7, 8]], info.tolist())
+
+            # Merging into one of the shards keeps its own documents once
+            shards.merge_shards(shard_dirs, shard_dirs[0])
+            self.assertEqual(6, len(packed.PackedReader(shard_dirs[0])))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import functools
+import os
+import pickle
+import unittest
+
+import numpy as np
+
+from boilerplate import instrumentation
+from boilerplate import loader
+from boilerplate import packed
+from boilerplate import shared
+from boilerplate import sources
+from boilerplate import testing
+
+
+def _make_vectors_list(pairs, train_list=None):
+    return testing.make_stub_vectors(pairs, train_list)
+
+
+def _callback(make_vectors):
+    return functools.partial(shared.lines_to_shared, increment_mention=testing.stub_increment_mention,
+                             increment_mention_pair=testing.stub_increment_mention_pair, make_vectors=make_vectors)
+
+
+class SharedTestCase(testing.CorpusTestCase):
+    def test_shared_matrix(self):
+        matrix = shared.SharedMatrix.create((3, 2), np.float32)
+        matrix.array[:] = [[1, 2], [3, 4], [5, 6]]
+        handle = pickle.loads(pickle.dumps(matrix.handle))
+        matrix.close()
+
+        attached = shared.SharedMatrix.attach(handle)
+        np.testing.assert_array_equal([[1, 2], [3, 4], [5, 6]], attached.array)
+        self.assertEqual(np.float32, attached.array.dtype)
+        attached.release()
+        with self.assertRaises(FileNotFoundError):
+            shared.SharedMatrix.attach(handle)
+
+    def test_lines_to_shared(self):
+        file_path = loader._find_conll_files(self.corpus)[0][1]
+        train_list = loader.train_file_to_list(file_path)
+        v_in, v_out, doc_name = loader.lines_to_vectors(train_list, testing.stub_increment_mention,
+                                                        testing.stub_increment_mention_pair, testing.make_stub_vectors)
+        for make_vectors in (testing.make_stub_vectors, _make_vectors_list):
+            handle, shared_out, shared_name = _callback(make_vectors)(train_list)
+            vectors = shared.SharedVectors.attach(handle)
+            try:
+                self.assertEqual(doc_name, shared_name)
+                np.testing.assert_array_equal(v_out, shared_out)
+                self.assertListEqual(v_in, list(vectors))
+                np.testing.assert_array_equal(np.array(v_in), np.asarray(vectors))
+                self.assertEqual(np.int64, vectors.pair_info.dtype)
+            finally:
+                vectors.release()
+
+    def test_process_source(self):
+        sequential = os.path.join(self.tmp.name, "sequential")
+        parallel = os.path.join(self.tmp.name, "parallel")
+        loader.transform_conll_to_vectors(self.corpus, sequential, testing.stub_increment_mention,
+                                          testing.stub_increment_mention_pair, testing.make_stub_vectors,
+                                          save_templates=True)
+        loader.transform_conll_to_vectors(self.corpus, parallel, testing.stub_increment_mention,
+                                          testing.stub_increment_mention_pair, testing.make_stub_vectors,
+                                          save_templates=True, processes=2)
+        self.assertEqual(12, len(testing.read_outputs(parallel)))
+        self.assertDictEqual(testing.read_outputs(sequential), testing.read_outputs(parallel))
+
+        packed_path = os.path.join(self.tmp.name, "packed")
+        with packed.PackedWriter(packed_path) as writer:
+            shared.process_source(sources.DirectorySource(self.corpus), packed_path,
+                                  _callback(testing.make_stub_vectors), writer=writer)
+        reader = packed.PackedReader(packed_path)
+        self.assertEqual(4, len(reader.index))
+        rows = sum(len(v.splitlines()) for n, v in testing.read_outputs(sequential).items() if n.endswith("_out"))
+        self.assertEqual(rows, len(reader))
+
+    def test_records(self):
+        sink = instrumentation.MemorySink()
+        with instrumentation.recording(instrumentation.Recorder(sink)):
+            shared.process_source(sources.DirectorySource(self.corpus), os.path.join(self.tmp.name, "out"),
+                                  _callback(testing.make_stub_vectors), processes=2)
+        self.assertEqual(4, len(sink.records))
+        for record in sink.records:
+            self.assertTrue({"mentions", "pairs", "features", "write"} <= set(record["stages"]))
+            self.assertGreater(record["counters"]["kept_pairs"], 0)
+
+    def test_generate(self):
+        rows = 0
+        for name, locator, train_list, (v_in, v_out, doc_name) in shared.generate(
+                sources.DirectorySource(self.corpus), _callback(testing.make_stub_vectors), processes=2, window=1):
+            self.assertEqual(len(v_out), len(v_in.features))
+            self.assertEqual(loader.get_document_name(train_list), doc_name)
+            rows += len(v_in)
+            handle = v_in.handle
+        self.assertGreater(rows, 0)
+        with self.assertRaises(FileNotFoundError):  # Released after the loop
+            shared.SharedVectors.attach(handle)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import tarfile
+import unittest
+
+from boilerplate import loader
+from boilerplate import outputs
+from boilerplate import pipeline
+from boilerplate import sources
+from boilerplate import synthetic
+from boilerplate import testing
+
+
+def _callback(train_list):
+    return [[1, 2, 3, 4, len(train_list)]], [[1]], loader.get_document_name(train_list)
+
+
+class SourcesTestCase(testing.CorpusTestCase):
+    def write_corpus(self):
+        synthetic.write_corpus(os.path.join(self.corpus, "data", "a"), documents=2, sentences=2)
+        synthetic.write_corpus(os.path.join(self.corpus, "data", "b"), documents=1, sentences=2, seed=1)
+        with open(os.path.join(self.corpus, "README"), "w") as f:
+            f.write("not a conll file")
+        self.archive = os.path.join(self.tmp.name, "corpus.tgz")
+        with tarfile.open(self.archive, "w:gz") as tar:
+            tar.add(self.corpus, arcname=".")
+
+    def test_same_files(self):
+        directory = sources.open_source(self.corpus)
+        archive = sources.open_source(self.archive)
+        self.assertIsInstance(directory, sources.DirectorySource)
+        self.assertIsInstance(archive, sources.TarSource)
+
+        names = [f[0] for f in directory.files()]
+        self.assertListEqual(["data/a/synthetic_0000.gold_conll", "data/a/synthetic_0001.gold_conll",
+                              "data/b/synthetic_0000.gold_conll"], names)
+        self.assertListEqual([(f[0], f[2]) for f in directory.files()], [(f[0], f[2]) for f in archive.files()])
+
+        expected = {name: read() for name, _, read in directory.entries()}
+        self.assertDictEqual(expected, {name: read() for name, _, read in archive.entries()})
+        self.assertListEqual([names[2]], [name for name, _, _ in archive.entries({names[2]})])
+
+        with self.assertRaises(ValueError):
+            sources.open_source(os.path.join(self.corpus, "README"))
+
+    def test_process_source(self):
+        from_dir = os.path.join(self.tmp.name, "from_dir")
+        from_archive = os.path.join(self.tmp.name, "from_archive")
+        loader.process_source(sources.open_source(self.corpus), from_dir, _callback, resume=True,
+                              save_templates=True)
+        loader.process_source(sources.open_source(self.archive), from_archive, _callback, resume=True,
+                              save_templates=True)
+
+        self.assertListEqual(sorted(os.listdir(from_dir)), sorted(os.listdir(from_archive)))
+        for file_name in os.listdir(from_dir):
+            with open(os.path.join(from_dir, file_name)) as a, open(os.path.join(from_archive, file_name)) as b:
+                self.assertEqual(a.read(), b.read(), file_name)
+        self.assertListEqual(sorted(outputs.read_journal(from_dir)), sorted(outputs.read_journal(from_archive)))
+
+    def test_pipeline(self):
+        out = os.path.join(self.tmp.name, "out")
+        stats = pipeline.process_source(sources.open_source(self.archive), out, _callback, num_shards=2,
+                                        shard_index=0)
+        stats_other = pipeline.process_source(sources.open_source(self.archive), out + "1", _callback,
+                                              num_shards=2, shard_index=1)
+        self.assertEqual(3, stats["write"]["items"] + stats_other["write"]["items"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import os
+import random
+import tempfile
+import unittest
+
+from boilerplate import loader as ldr
+from boilerplate import mentions
+from boilerplate import scorer
+from boilerplate import synthetic
+
+
+class SyntheticTestCase(unittest.TestCase):
+    def test_generate_document(self):
+        lines, clusters = synthetic.generate_document("syn/doc", sentences=40, max_depth=3, random=random.Random(5))
+
+        self.assertEqual("syn/doc", ldr.get_document_name(lines))
+        self.assertEqual("#end document\n", lines[-1])
+        self.assertEqual(sum(len(c) for c in clusters), len(mentions.build_mention_list(lines)))
+
+        # The brackets read back give exactly the generated clusters
+        scores = scorer.evaluate(clusters, scorer.clusters_from_lines(lines))
+        self.assertAlmostEqual(1., scorer.conll_f1(scores))
+
+    def test_nesting(self):
+        lines, clusters = synthetic.generate_document("syn/doc", sentences=40, max_depth=1, random=random.Random(5))
+        spans = sorted(m for c in clusters for m in c)
+        for (s1, e1), (s2, e2) in zip(spans, spans[1:]):
+            self.assertGreater(s2, e1)
+
+    def test_write_corpus(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = synthetic.write_corpus(tmp, documents=3, seed=1, sentences=5)
+            self.assertEqual(3, len(paths))
+            with open(paths[0]) as f:
+                first = f.read()
+
+            synthetic.write_corpus(tmp, documents=1, seed=1, sentences=5)
+            with open(os.path.join(tmp, "synthetic_0000.gold_conll")) as f:
+                self.assertEqual(first, f.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
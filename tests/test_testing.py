@@ -0,0 +1,35 @@
+import os
+import unittest
+
+import numpy as np
+
+from boilerplate import loader
+from boilerplate import testing
+
+
+class TestingTestCase(testing.CorpusTestCase):
+    DOCUMENTS = 2
+
+    def test_distance(self):
+        self.assertEqual(5, testing.distance(7).index(1))
+        self.assertEqual(9, testing.distance(100).index(1))
+        self.assertEqual(0, sum(testing.distance(-1)))
+
+    def test_stub_embedding(self):
+        np.testing.assert_array_equal(testing.stub_embedding("word"), testing.stub_embedding("word"))
+        self.assertFalse(np.array_equal(testing.stub_embedding("word"), testing.stub_embedding("other")))
+
+    def test_corpus(self):
+        files = loader._find_conll_files(self.corpus)
+        self.assertEqual(2, len(files))
+        v_in, v_out, doc_name = testing.stub_lines_to_vectors(loader.train_file_to_list(files[0][1]))
+        self.assertEqual(len(v_in), len(v_out))
+
+        out = os.path.join(self.tmp.name, "out")
+        os.makedirs(out)
+        loader.process_dir(self.corpus, out, lambda p: testing.stub_lines_to_vectors(loader.train_file_to_list(p)))
+        self.assertEqual(4, len(testing.read_outputs(out)))  # _in and _out files, without the journal
+
+
+if __name__ == '__main__':
+    unittest.main()